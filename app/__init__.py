@@ -1,61 +1,225 @@
 import os
+from collections.abc import Mapping
+from urllib.parse import quote
 
-import cloudinary
+import click
 from flask import Flask
-from flask_mail import Mail
-from flask_sqlalchemy import SQLAlchemy
-from urllib.parse import quote
 from flask_login import LoginManager
-from flask_dance.contrib.google import make_google_blueprint, google
+from flask_mail import Mail
 from flask_socketio import SocketIO
+from flask_sqlalchemy import SQLAlchemy
+from app.db_routing import RoutingSession, engine_options, replica_binds
+from app.logger import init_logging
+from app.realtime import create_client_manager
 
 
 os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'jikagfvcuyidwsfgdsfhahfadgdhdfhbssgvvudbsjahfduyjfvdguieygvsfuy'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'mysql+pymysql://root:%s@localhost/recruitmentdb?charset=utf8mb4' % quote(
-    "Admin@123")
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = True
-app.config["PAGE_SIZE"] = 8
-
-app.config["GOOGLE_OAUTH_CLIENT_ID"] = os.getenv("GOOGLE_OAUTH_CLIENT_ID")
-app.config["GOOGLE_OAUTH_CLIENT_SECRET"] = os.getenv("GOOGLE_OAUTH_CLIENT_SECRET")
-# app.config["GOOGLE_REDIRECT_URI"] = "http://localhost:5000/login/callback"
-
-google_bp = make_google_blueprint(
-    client_id=app.config["GOOGLE_OAUTH_CLIENT_ID"],
-    client_secret=app.config["GOOGLE_OAUTH_CLIENT_SECRET"],
-    # redirect_to="google_login",
-    redirect_to="google_authorized",
-    scope=[
-        "https://www.googleapis.com/auth/userinfo.profile",
-        "https://www.googleapis.com/auth/userinfo.email",
-        "openid"
-    ]
-)
-
-app.register_blueprint(google_bp, url_prefix="/login")
-
-db = SQLAlchemy(app)
-login = LoginManager(app)
-socketio = SocketIO(app)
-
-cloudinary.config(
-    cloud_name="dqpu49bbo",
-    api_key="743773348627895",
-    api_secret="EF7elKsibuI8JEBqfMNZYYWUYvo",
-    secure=True
-)
-
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USE_SSL'] = False
-app.config['MAIL_USERNAME'] = 'maivo0902@gmail.com'
-app.config['MAIL_PASSWORD'] = 'qzha nhir cldl ypzy'
-app.config['MAIL_DEFAULT_SENDER'] = 'maivo0902@gmail.com'
-
-mail = Mail(app)
-
-# from app import index
+# Extension dùng chung, gắn vào app trong create_app()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+login = LoginManager()
+socketio = SocketIO()
+mail = Mail()
+
+
+def _default_config(app):
+    app.config['SECRET_KEY'] = 'jikagfvcuyidwsfgdsfhahfadgdhdfhbssgvvudbsjahfduyjfvdguieygvsfuy'
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URL") or \
+        'mysql+pymysql://root:%s@localhost/recruitmentdb?charset=utf8mb4' % quote("Admin@123")
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Pool connection cho engine chính và replica, sqlite bỏ qua (xem app/db_routing.py)
+    app.config["DB_POOL_SIZE"] = int(os.getenv("DB_POOL_SIZE", 10))
+    app.config["DB_MAX_OVERFLOW"] = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    app.config["DB_POOL_TIMEOUT"] = 30
+    # Nhỏ hơn wait_timeout của MySQL (mặc định 8 giờ)
+    app.config["DB_POOL_RECYCLE"] = 1800
+    app.config["DB_POOL_PRE_PING"] = True
+    # Read replica, cách nhau bởi dấu phẩy; hàm DAO có @read_replica đọc từ đây
+    app.config["DATABASE_REPLICA_URLS"] = [url for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url]
+    # Sau khi ghi, phiên đăng nhập đó đọc primary thêm bấy nhiêu giây (độ trễ replica), 0 = chỉ trong request
+    app.config["DB_REPLICA_STICKY_SECONDS"] = 5
+    app.config["PAGE_SIZE"] = 8
+    # Cache COUNT(*) của phân trang (giây) và ngưỡng dùng số dòng ước lượng (xem app/pagination.py)
+    app.config["PAGINATION_COUNT_TTL"] = 30
+    app.config["PAGINATION_ESTIMATE_THRESHOLD"] = 10000
+    # Từ trang này trở đi nút "Next" chuyển sang phân trang theo cursor
+    app.config["KEYSET_PAGE_THRESHOLD"] = 5
+    # auto | mysql_fulltext | sqlite_fts | memory | like (xem app/search.py)
+    app.config["SEARCH_BACKEND"] = os.getenv("SEARCH_BACKEND", "auto")
+    # memory:// hoặc redis://host:6379/0 (xem app/cache.py); chạy nhiều worker thì phải dùng redis://
+    app.config["CACHE_URL"] = os.getenv("CACHE_URL", "memory://")
+    app.config["NOTIFICATION_BADGE_TTL"] = 300
+    # Với memory:// badge chỉ cache bấy nhiêu giây: worker khác không nhận được lệnh xóa cache
+    app.config["NOTIFICATION_BADGE_MEMORY_TTL"] = 5
+    # Số người nhận mỗi câu INSERT khi gửi thông báo hàng loạt (NotificationDAO.broadcast)
+    app.config["NOTIFICATION_BROADCAST_CHUNK_SIZE"] = 1000
+    # Đẩy số thông báo chưa đọc tới room Socket.IO của user sau mỗi commit có thông báo thay đổi
+    app.config["NOTIFICATION_PUSH"] = True
+    # Số job/ứng viên/công ty trên trang chủ (giây), bị xóa sớm hơn khi job/user thay đổi
+    app.config["HOMEPAGE_COUNTERS_TTL"] = 300
+    # Socket.IO: tắt ở process không cần (lệnh CLI...); async mode None = tự chọn (eventlet nếu đã cài)
+    app.config["SOCKETIO_ENABLED"] = os.getenv("SOCKETIO_ENABLED", "1") == "1"
+    app.config["SOCKETIO_ASYNC_MODE"] = os.getenv("SOCKETIO_ASYNC_MODE")
+    # Pub/sub cho Socket.IO khi chạy nhiều worker, ví dụ redis://localhost:6379/1 (xem app/realtime.py)
+    app.config["SOCKETIO_MESSAGE_QUEUE"] = os.getenv("SOCKETIO_MESSAGE_QUEUE")
+    app.config["SOCKETIO_CHANNEL"] = os.getenv("SOCKETIO_CHANNEL", "recruitment-socketio")
+    # Số tin nhắn mỗi lần tải lịch sử chat (trang đầu và mỗi lần "load older")
+    app.config["CHAT_PAGE_SIZE"] = 30
+    # Gửi tin nhắn chat trước, ghi DB theo batch ở thread nền (xem app/chat_writer.py)
+    app.config["CHAT_WRITE_BEHIND"] = os.getenv("CHAT_WRITE_BEHIND", "0") == "1"
+    app.config["CHAT_WRITE_BEHIND_BATCH_SIZE"] = 100
+    app.config["CHAT_WRITE_BEHIND_QUEUE_SIZE"] = 10000
+    app.config["CHAT_WRITE_BEHIND_FLUSH_MS"] = 200
+    app.config["CHAT_WRITE_BEHIND_RETRIES"] = 3
+    # Hàng đợi đầy: chờ tối đa chừng này (ms) cho thread ghi nhả chỗ trước khi ghi đồng bộ
+    app.config["CHAT_WRITE_BEHIND_PUT_TIMEOUT_MS"] = 1000
+
+    # Lượt xem job: gom trong memory:// (mỗi worker) hoặc redis:// (dùng chung), ghi DB theo chu kỳ (xem app/job_views.py)
+    app.config["JOB_VIEW_STORE"] = os.getenv("JOB_VIEW_STORE", "memory://")
+    app.config["JOB_VIEW_FLUSH_SECONDS"] = 10
+    app.config["JOB_VIEW_DEDUP"] = True
+
+    # Tác vụ định kỳ: 'thread' | 'external' (python -m app.scheduler) | 'off' (xem app/scheduler.py)
+    app.config["SCHEDULER"] = os.getenv("SCHEDULER", "thread")
+    app.config["JOB_EXPIRATION_SWEEP_SECONDS"] = 300
+    app.config["JOB_EXPIRATION_BATCH_SIZE"] = 500
+
+    # Upload avatar/CV ở thread nền (xem app/uploads.py, app/storage.py)
+    app.config["UPLOAD_STORAGE"] = os.getenv("UPLOAD_STORAGE", "cloudinary")
+    app.config["UPLOAD_STAGING_DIR"] = os.getenv("UPLOAD_STAGING_DIR")
+    app.config["UPLOAD_WORKERS"] = 4
+    app.config["UPLOAD_MAX_ATTEMPTS"] = 3
+    # CV còn PENDING có file staging cũ hơn AFTER giây được đẩy lại, kiểm tra mỗi SECONDS giây (scheduler)
+    app.config["UPLOAD_REQUEUE_SECONDS"] = 300
+    app.config["UPLOAD_REQUEUE_AFTER_SECONDS"] = 600
+
+    # Logging (xem app/logger.py): mặc định chỉ WARNING, không log SQL
+    app.config["LOG_LEVEL"] = os.getenv("LOG_LEVEL", "WARNING")
+    app.config["SQL_LOG_SAMPLE_RATE"] = float(os.getenv("SQL_LOG_SAMPLE_RATE", 0))
+    app.config["SQL_SLOW_QUERY_MS"] = float(os.getenv("SQL_SLOW_QUERY_MS")) if os.getenv("SQL_SLOW_QUERY_MS") else None
+    # Số query/thời gian DB theo request (xem app/query_stats.py): header X-Query-Count và /_debug/queries
+    app.config["QUERY_STATS"] = os.getenv("QUERY_STATS", "0") == "1"
+    app.config["QUERY_STATS_HISTORY"] = 100
+    app.config["QUERY_STATS_WARN_COUNT"] = 50
+    # GET /metrics cho Prometheus (xem app/metrics.py): tắt mặc định; có token thì yêu cầu Bearer token
+    app.config["METRICS"] = os.getenv("METRICS", "0") == "1"
+    app.config["METRICS_TOKEN"] = os.getenv("METRICS_TOKEN")
+
+    app.config["GOOGLE_OAUTH_CLIENT_ID"] = os.getenv("GOOGLE_OAUTH_CLIENT_ID")
+    app.config["GOOGLE_OAUTH_CLIENT_SECRET"] = os.getenv("GOOGLE_OAUTH_CLIENT_SECRET")
+    # app.config["GOOGLE_REDIRECT_URI"] = "http://localhost:5000/login/callback"
+
+    # Cloudinary được cấu hình ở lần upload đầu tiên (xem app/storage.py)
+    app.config["CLOUDINARY_CLOUD_NAME"] = "dqpu49bbo"
+    app.config["CLOUDINARY_API_KEY"] = "743773348627895"
+    app.config["CLOUDINARY_API_SECRET"] = "EF7elKsibuI8JEBqfMNZYYWUYvo"
+
+    app.config['MAIL_SERVER'] = 'smtp.gmail.com'
+    app.config['MAIL_PORT'] = 587
+    app.config['MAIL_USE_TLS'] = True
+    app.config['MAIL_USE_SSL'] = False
+    app.config['MAIL_USERNAME'] = 'maivo0902@gmail.com'
+    app.config['MAIL_PASSWORD'] = 'qzha nhir cldl ypzy'
+    app.config['MAIL_DEFAULT_SENDER'] = 'maivo0902@gmail.com'
+
+    # Outbox email (xem app/mailer.py): 'thread' = worker chạy trong web process (start ở request đầu tiên),
+    # 'external' = python -m app.mailer
+    app.config['MAIL_OUTBOX_WORKER'] = os.getenv("MAIL_OUTBOX_WORKER", "thread")
+    app.config['MAIL_OUTBOX_BATCH_SIZE'] = 50
+    app.config['MAIL_OUTBOX_POLL_SECONDS'] = 10
+    app.config['MAIL_MAX_ATTEMPTS'] = 5
+    app.config['MAIL_RETRY_BASE_SECONDS'] = 30
+    app.config['MAIL_SENDING_LEASE_SECONDS'] = 300
+
+
+def _register_google_login(app):
+    from flask_dance.contrib.google import make_google_blueprint
+
+    google_bp = make_google_blueprint(
+        client_id=app.config["GOOGLE_OAUTH_CLIENT_ID"],
+        client_secret=app.config["GOOGLE_OAUTH_CLIENT_SECRET"],
+        # redirect_to="google_login",
+        redirect_to="google_authorized",
+        scope=[
+            "https://www.googleapis.com/auth/userinfo.profile",
+            "https://www.googleapis.com/auth/userinfo.email",
+            "openid"
+        ]
+    )
+    app.register_blueprint(google_bp, url_prefix="/login")
+
+
+class _LazyGroup(click.Group):
+    """Nhóm lệnh CLI mà nhóm thật chỉ được nạp bằng load() khi chạy tới (flask db ...)."""
+
+    def __init__(self, name, load, **kwargs):
+        super().__init__(name, **kwargs)
+        self._load = load
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        return self._load().make_context(info_name, args, parent=parent, **extra)
+
+
+def _register_migrate(app):
+    def load():
+        from flask_migrate import Migrate
+
+        # Migrate.init_app thay nhóm lệnh 'db' trên app.cli bằng nhóm thật của Flask-Migrate
+        Migrate(app, db)
+        return app.cli.commands['db']
+
+    app.cli.add_command(_LazyGroup('db', load, help='Perform database migrations (Flask-Migrate).'))
+
+
+def create_app(config=None):
+    """
+    Tạo Flask app: config mặc định (biến môi trường) rồi ghi đè bằng `config` (dict, object
+    hoặc tên module như Flask.config.from_object), sau đó gắn db, login, mail.
+
+    Phần nặng chỉ nạp khi cần:
+        Socket.IO      khi SOCKETIO_ENABLED; SOCKETIO_ASYNC_MODE=threading khỏi import eventlet
+        Google OAuth   flask_dance chỉ import khi có GOOGLE_OAUTH_CLIENT_ID
+        Cloudinary     cấu hình ở lần upload đầu tiên (app/storage.py)
+        Flask-Migrate  alembic chỉ import khi chạy `flask db ...`
+        Admin          app/admin.py, chỉ import khi chạy server dev (app/index.py)
+
+    Route và hook (init_app của từng module) được gắn vào app mới tạo; module tính năng đọc
+    config qua current_app và giữ trạng thái (cache, search backend, worker, scheduler,
+    metric...) trong app.extensions, nên mỗi app dùng config và trạng thái của chính nó.
+    Socket.IO handler đăng ký một lần cho instance socketio (app/index.py).
+    App mặc định (`app`) nằm ở app/index.py. Socket.IO chỉ gắn được vào một app mỗi
+    process: app tạo thêm (script, test) nên truyền SOCKETIO_ENABLED=False.
+    """
+    app = Flask(__name__)
+    _default_config(app)
+    if isinstance(config, Mapping):
+        app.config.from_mapping(config)
+    elif config is not None:
+        app.config.from_object(config)
+    # Tính sau khi ghi đè để theo đúng URI/pool của config
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS",
+                          engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config))
+    app.config.setdefault("SQLALCHEMY_BINDS", replica_binds(app.config["DATABASE_REPLICA_URLS"], app.config))
+    init_logging(app)
+
+    if app.config["GOOGLE_OAUTH_CLIENT_ID"]:
+        _register_google_login(app)
+
+    db.init_app(app)
+    # Migration schema: migrations/ (flask --app app.index db upgrade)
+    _register_migrate(app)
+    login.init_app(app)
+    mail.init_app(app)
+    # Import trước socketio.init_app: app.index đăng ký Socket.IO handler (một lần) lúc import,
+    # init_app gắn các handler đó vào server của app này
+    from app import dao, index, mailer, metrics, query_stats, scheduler
+    if app.config["SOCKETIO_ENABLED"]:
+        socketio.init_app(app, async_mode=app.config["SOCKETIO_ASYNC_MODE"],
+                          client_manager=create_client_manager(app.config["SOCKETIO_MESSAGE_QUEUE"],
+                                                               app.config["SOCKETIO_CHANNEL"]))
+
+    # Route và hook; metrics đăng ký trước để đo cả thời gian của các hook sau
+    for module in (metrics, dao, scheduler, mailer, query_stats):
+        module.init_app(app)
+    index.register_routes(app)
+    return app
@@ -1,7 +1,7 @@
 from flask_admin import Admin
 from flask_admin.contrib.sqla import ModelView
 
-from app import app, db
+from app import db
 from app.models import (
     User, Company, Category, Job, CV, Application, Interview, Conversation, Message, Notification,
 )
@@ -10,7 +10,7 @@ class CategoryView(ModelView):
     column_list = ['name', 'jobs']
 
 # ===== Khởi tạo Flask-Admin =====
-admin = Admin(app, template_mode='bootstrap4', name='Recruitment Admin')
+admin = Admin(template_mode='bootstrap4', name='Recruitment Admin')
 
 admin.add_view(ModelView(User, db.session))
 admin.add_view(ModelView(Company, db.session))
@@ -23,3 +23,6 @@ admin.add_view(ModelView(Conversation, db.session))
 admin.add_view(ModelView(Message, db.session))
 admin.add_view(ModelView(Notification, db.session))
 
+
+def init_admin(app):
+    admin.init_app(app)
@@ -0,0 +1,137 @@
+"""
+    Cache key-value dùng chung cho các DAO (badge thông báo, bộ đếm...).
+
+    CACHE_URL:
+        memory://            cache trong process (mặc định, mỗi worker một bản)
+        redis://host:6379/0  dùng chung giữa các worker/process
+
+    Với memory:// việc xóa cache khi ghi chỉ có tác dụng ở worker đã commit, worker khác vẫn
+    trả dữ liệu cũ tới khi hết TTL. Chạy nhiều worker thì phải dùng redis://; nếu vẫn là
+    memory://, dữ liệu cần mới (badge thông báo) chỉ được cache vài giây (cache.shared = False)
+    và app ghi cảnh báo khi tạo cache.
+
+    Lỗi kết nối Redis không làm hỏng request: get() trả về None (coi như miss), set()/delete() bỏ qua.
+"""
+import pickle
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+
+from app import db
+from app.logger import get_logger
+
+log = get_logger(__name__)
+
+
+class MemoryCache:
+    shared = False  # mỗi process một bản
+
+    def __init__(self, default_ttl=300):
+        self.default_ttl = default_ttl
+        self._data = {}  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return entry[1]
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.default_ttl
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl if ttl else None, value)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    shared = True
+
+    def __init__(self, url, default_ttl=300, prefix='recruitment:'):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._errors = redis.RedisError
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            value = self._redis.get(self.prefix + key)
+        except self._errors:
+            log.warning("cache get failed", key=key, exc_info=True)
+            return None
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.default_ttl
+        try:
+            self._redis.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+        except self._errors:
+            log.warning("cache set failed", key=key, exc_info=True)
+
+    def delete(self, *keys):
+        if not keys:
+            return
+        try:
+            self._redis.delete(*[self.prefix + key for key in keys])
+        except self._errors:
+            log.warning("cache delete failed", keys=keys, exc_info=True)
+
+    def clear(self):
+        try:
+            keys = list(self._redis.scan_iter(self.prefix + '*'))
+            if keys:
+                self._redis.delete(*keys)
+        except self._errors:
+            log.warning("cache clear failed", exc_info=True)
+
+
+_cache_lock = threading.Lock()
+
+
+def create_cache(url, default_ttl=300):
+    if url.startswith('redis://') or url.startswith('rediss://'):
+        return RedisCache(url, default_ttl=default_ttl)
+    return MemoryCache(default_ttl=default_ttl)
+
+
+def get_cache():
+    """Cache của app hiện tại (app.extensions['cache']), tạo theo config ở lần gọi đầu tiên."""
+    cache = current_app.extensions.get('cache')
+    if cache is None:
+        with _cache_lock:
+            cache = current_app.extensions.get('cache')
+            if cache is None:
+                cache = current_app.extensions['cache'] = create_cache(
+                    current_app.config.get('CACHE_URL', 'memory://'), current_app.config.get('CACHE_DEFAULT_TTL', 300))
+                if not cache.shared and not (current_app.debug or current_app.testing):
+                    log.warning("CACHE_URL is memory://, cache invalidation only reaches this worker; "
+                                "use redis:// when running several workers")
+    return cache
+
+
+def reset_cache():
+    """Bỏ cache của app hiện tại, lần gọi get_cache() sau sẽ tạo lại theo config."""
+    current_app.extensions.pop('cache', None)
+
+
+@event.listens_for(db.metadata, 'after_drop')
+def _clear_after_drop(target, connection, **kw):
+    # Schema bị xóa (db.drop_all) thì mọi dữ liệu đã cache đều không còn đúng
+    cache = current_app.extensions.get('cache') if has_app_context() else None
+    if cache is not None:
+        cache.clear()
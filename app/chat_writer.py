@@ -0,0 +1,164 @@
+"""
+    Write-behind cho tin nhắn chat (CHAT_WRITE_BEHIND = True).
+
+    handle_message gửi tin nhắn cho room ngay, còn việc lưu DB đi qua một hàng đợi có
+    giới hạn trong process; một thread nền gom tối đa CHAT_WRITE_BEHIND_BATCH_SIZE tin
+    nhắn (hoặc chờ CHAT_WRITE_BEHIND_FLUSH_MS) rồi ghi bằng một câu INSERT nhiều dòng.
+
+    Đảm bảo:
+        - Thứ tự: một thread ghi duy nhất, FIFO, timestamp gán lúc nhận tin nhắn.
+        - Hàng đợi đầy: chờ tối đa CHAT_WRITE_BEHIND_PUT_TIMEOUT_MS cho có chỗ; vẫn đầy thì chờ
+          ghi hết hàng đợi rồi ghi đồng bộ trong request (chậm lại chứ không mất tin nhắn hay
+          đảo thứ tự so với các tin nhắn đã nhận trước đó).
+        - Tắt app bình thường (atexit, SIGTERM của gunicorn): stop() ghi hết hàng đợi.
+        - Lỗi DB: thử lại CHAT_WRITE_BEHIND_RETRIES lần rồi log và bỏ batch (đếm ở `dropped`).
+        - Process bị kill -9 / crash: mất các tin nhắn còn trong hàng đợi (tối đa
+          CHAT_WRITE_BEHIND_QUEUE_SIZE); người nhận đã thấy tin nhắn nhưng lịch sử thì không.
+"""
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert
+
+from app import db
+from app.logger import get_logger
+from app.models import Message
+
+log = get_logger(__name__)
+
+
+class MessageWriter:
+
+    def __init__(self, batch_size=100, max_queue=10000, flush_interval=0.2, max_retries=3, retry_delay=0.1,
+                 put_timeout=1.0, app=None):
+        # Thread ghi mở app context của app này (mặc định: app đang chạy khi tạo writer)
+        self.app = app if app is not None else current_app._get_current_object()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.put_timeout = put_timeout
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='chat-message-writer', daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, conversation_id, sender_id, content):
+        """Nhận tin nhắn để ghi sau; trả về Message chưa lưu (id = None) để broadcast."""
+        row = dict(conversation_id=conversation_id, sender_id=sender_id, content=content,
+                   timestamp=datetime.now(), is_read=False)
+        if self.running:
+            try:
+                self._queue.put(row, timeout=self.put_timeout)
+                return Message(**row)
+            except queue.Full:
+                log.warning("chat write-behind queue full, writing synchronously", conversation_id=conversation_id)
+                # Các tin nhắn cũ hơn phải được ghi trước (id tăng theo thứ tự nhận)
+                self.flush()
+        # Chưa start / đã stop / hàng đợi đầy: ghi luôn để không mất tin nhắn
+        self._write([row])
+        return Message(**row)
+
+    def flush(self):
+        """Chờ tới khi mọi tin nhắn đã nhận đều được ghi (hoặc bị bỏ sau khi hết lượt thử lại)."""
+        if self.running:
+            self._queue.join()
+
+    def stop(self, timeout=None):
+        """Ghi hết hàng đợi rồi dừng thread."""
+        if not self.running:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception:
+                # Không để một batch lỗi làm chết thread ghi
+                log.exception("chat write-behind batch failed", size=len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, rows):
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.app.app_context():
+                    self._insert(rows)
+                return
+            except Exception:
+                if attempt == self.max_retries:
+                    self.dropped += len(rows)
+                    log.error("chat messages dropped", size=len(rows),
+                              conversation_ids=sorted({row['conversation_id'] for row in rows}), exc_info=True)
+                    return
+                log.warning("chat write-behind insert failed, retrying", attempt=attempt + 1, size=len(rows))
+                time.sleep(self.retry_delay * 2 ** attempt)
+
+    def _insert(self, rows):
+        try:
+            # Một câu INSERT ... VALUES (...), (...) cho cả batch
+            db.session.execute(insert(Message), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.remove()
+
+
+_writer_lock = threading.Lock()
+_writers = []  # mọi writer đã tạo trong process, để ghi hết hàng đợi khi tắt
+
+
+def get_writer():
+    """Writer của app hiện tại (app.extensions['chat_writer']), start ở lần gọi đầu tiên."""
+    with _writer_lock:
+        writer = current_app.extensions.get('chat_writer')
+        if writer is None:
+            config = current_app.config
+            writer = MessageWriter(batch_size=config.get('CHAT_WRITE_BEHIND_BATCH_SIZE', 100),
+                                   max_queue=config.get('CHAT_WRITE_BEHIND_QUEUE_SIZE', 10000),
+                                   flush_interval=config.get('CHAT_WRITE_BEHIND_FLUSH_MS', 200) / 1000,
+                                   max_retries=config.get('CHAT_WRITE_BEHIND_RETRIES', 3),
+                                   put_timeout=config.get('CHAT_WRITE_BEHIND_PUT_TIMEOUT_MS', 1000) / 1000)
+            current_app.extensions['chat_writer'] = writer
+            _writers.append(writer)
+        return writer.start()
+
+
+@atexit.register
+def shutdown_writer():
+    for writer in _writers:
+        writer.stop()
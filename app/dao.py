@@ -1,26 +1,40 @@
 import hashlib
 from datetime import datetime
-from itertools import groupby
+from collections import namedtuple
+from itertools import groupby, chain
 
-import cloudinary.uploader
+from flask import current_app, request
 from flask_login import current_user
 from oauthlib.uri_validate import query
 
-from sqlalchemy import or_
-from sqlalchemy.orm import joinedload
+from sqlalchemy import or_, event, inspect, insert, select
+from sqlalchemy.orm import joinedload, selectinload, contains_eager, Session
 
-from app import db, app
+from app import db, socketio, search, uploads, metrics
+from app import stats  # noqa: F401  (gắn listener cập nhật bảng rollup khi ghi Job/Application)
+from app.cache import get_cache
+from app.db_routing import read_replica
+from app.logger import get_logger
+from app.pagination import keyset_paginate, paginate, invalidate_count, COUNT_ESTIMATE, COUNT_CACHED
 from app.models import User, Resume, Company, CV, Job, Application, Interview, Conversation, Message, Notification, \
-    JobStatusEnum, Category, EmploymentEnum, RoleEnum, ApplicationStatusEnum
-from sqlalchemy import func, extract
+    JobStatusEnum, Category, EmploymentEnum, RoleEnum, ApplicationStatusEnum, UploadStatusEnum, conversation_user, \
+    CompanyMonthStat, JobStat
+from sqlalchemy import func, extract, case, and_
 import string, random
 
+log = get_logger(__name__)
+
 
 def load_cate():
     cates = Category.query.order_by("id").all()
     return cates
 
 
+SORT_LATEST = 'latest'
+SORT_POPULAR = 'popular'
+
+
+@read_replica
 def load_jobs(
         page=None,
         per_page=None,
@@ -32,7 +46,12 @@ def load_jobs(
         min_salary=None,
         max_salary=None,
         status=JobStatusEnum.POSTED,
-        exclude_job=None
+        exclude_job=None,
+        keyset=False,
+        after=None,
+        before=None,
+        count=COUNT_ESTIMATE,
+        sort=None
 ):
     """
     Tải danh sách các công việc với chức năng lọc, tìm kiếm và phân trang.
@@ -40,7 +59,7 @@ def load_jobs(
     :param exclude_job:
     :param page: Số trang hiện tại (mặc định 1).
     :param per_page: Số lượng công việc trên mỗi trang (mặc định 10)
-    :param keyword: Từ khóa để tìm kiếm trong tiêu đề, mô tả, yêu cầu.
+    :param keyword: Từ khóa để tìm kiếm trong tiêu đề, mô tả, yêu cầu và tag (xếp theo độ liên quan).
     :param location: Địa điểm công việc.
     :param employment_type: Loại hình việc làm (ví dụ: "Fulltime", "Parttime").
     :param category_id: ID của danh mục công việc.
@@ -48,7 +67,15 @@ def load_jobs(
     :param min_salary: Mức lương tối thiểu.
     :param max_salary: Mức lương tối đa.
     :param status: Trạng thái công việc (mặc định là 'Posted').
-    :return: Đối tượng phân trang (Pagination object) chứa các công việc.
+    :param keyset: Dùng phân trang theo cursor (created_date, id) thay vì số trang.
+    :param after: Cursor lấy trang cũ hơn (bật keyset).
+    :param before: Cursor lấy trang mới hơn (bật keyset).
+    :param count: Cách tính tổng số job cho page-number mode (xem app/pagination.py).
+    :param sort: SORT_POPULAR để xếp theo lượt xem (view_count, xem app/job_views.py), mặc định mới nhất.
+                 Chỉ dùng phân trang theo số trang, cursor luôn theo ngày đăng.
+                 Tìm theo keyword (xếp theo độ liên quan) cũng chỉ dùng phân trang theo số trang.
+    :return: Đối tượng phân trang (Pagination object) chứa các công việc,
+             hoặc KeysetPagination khi dùng cursor (luôn sắp theo ngày đăng).
     """
 
     query = Job.query.filter()
@@ -56,9 +83,6 @@ def load_jobs(
     if status:
         query = query.filter(Job.status == status)
 
-    if keyword:
-        query = query.filter(Job.title.contains(keyword))
-
     if location:
         query = query.filter(Job.location.contains(location))
 
@@ -81,7 +105,6 @@ def load_jobs(
         try:
             # Chuyển string sang enum
             emp_enum = EmploymentEnum[employment_type]  # "FULLTIME" => EmploymentEnum.FULLTIME
-            print(emp_enum.name)
             query = query.filter(Job.employment_type == emp_enum)
         except KeyError:
             pass  # không lọc nếu sai
@@ -89,10 +112,21 @@ def load_jobs(
     if exclude_job:
         query = query.filter(Job.id != exclude_job)
 
-    query = query.order_by(Job.created_date.desc())
-    jobs_pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    print("a", jobs_pagination.items)
-    print(query.statement.compile(compile_kwargs={"literal_binds": True}))
+    if keyword:
+        # Lọc + xếp hạng theo độ liên quan bằng search backend (xem app/search.py)
+        query = search.search_jobs(query, keyword)
+    elif sort == SORT_POPULAR:
+        query = query.order_by(func.coalesce(Job.view_count, 0).desc(), Job.created_date.desc(), Job.id.desc())
+    else:
+        # Cùng thứ tự với khóa cursor (created_date, id) để trang số và trang cursor nối nhau
+        query = query.order_by(Job.created_date.desc(), Job.id.desc())
+
+    # Cursor theo (created_date, id) không giữ được thứ tự độ liên quan/lượt xem
+    if (keyset or after or before) and sort != SORT_POPULAR and not keyword:
+        return keyset_paginate(query, Job.created_date, Job.id, per_page=per_page, after=after, before=before)
+
+    jobs_pagination = paginate(query, page=page, per_page=per_page, count=count)
+    log.debug("load_jobs", page=page, per_page=per_page, keyword=keyword, total=jobs_pagination.total)
 
     return jobs_pagination
 
@@ -130,17 +164,15 @@ def add_job(company_id, **job_data):
         company_id=company_id
 
     )
-    print(category_id)
-    print('jhgvcbuyiodsavbgfihljvbilofaedhgbvlhjsdgbhfilbdgljkfgblkjsdbfjiklhiutgfhijhiugioygouyguyifgvouyfvip')
     try:
         job.company_id = company_id
         db.session.add(job)
         db.session.commit()
-        print(f"Đã thêm công việc: {title} thành công.")
+        log.info("job added", job_id=job.id, company_id=company_id)
         return job
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"Lỗi khi thêm công việc vào DB: {e}")
+        log.exception("add_job failed", company_id=company_id)
         return None
 
 
@@ -166,10 +198,10 @@ def add_user(avatar_file, **user_data):
     is_active = user_data.get('is_active', True)
 
     if User.query.filter_by(username=username).first():
-        print(f"Lỗi: Tên đăng nhập '{username}' đã tồn tại.")
+        log.info("add_user rejected: username exists", username=username)
         return None
     if User.query.filter_by(email=email).first():
-        print(f"Lỗi: Email '{email}' đã tồn tại.")
+        log.info("add_user rejected: email exists", email=email)
         return None
 
     hashed_password = hashlib.md5(password.encode()).hexdigest()
@@ -178,7 +210,7 @@ def add_user(avatar_file, **user_data):
     try:
         role_enum_value = RoleEnum[role_str.upper()]
     except KeyError:
-        print(f"Cảnh báo: Vai trò '{role_str}' không hợp lệ, đặt mặc định là JOBSEEKER.")
+        log.warning("invalid role, defaulting to JOBSEEKER", role=role_str)
 
     new_user = User(
         username=username,
@@ -192,27 +224,30 @@ def add_user(avatar_file, **user_data):
         is_active=is_active
     )
 
+    avatar_key = None
     if avatar_file:
         try:
             if avatar_file.filename and avatar_file.content_type:
-                res = cloudinary.uploader.upload(avatar_file.stream)
-                new_user.avatar = res['secure_url']
-                print(f"Đã upload avatar lên Cloudinary: {res['secure_url']}")
+                # Upload ở thread nền (xem app/uploads.py), tạm dùng avatar mặc định
+                avatar_key = uploads.stage_upload(avatar_file, uploads.KIND_AVATAR)
+                new_user.avatar_upload_status = UploadStatusEnum.PENDING
+                new_user.avatar_upload_key = avatar_key
             else:
-                print("Không có file avatar hợp lệ được gửi.")
                 new_user.avatar = None  # Đặt avatar là None nếu file không hợp lệ
-        except Exception as e:
-            print(f"Lỗi khi upload avatar lên Cloudinary: {e}")
+        except Exception:
+            log.exception("avatar upload failed", username=username)
             new_user.avatar = None
 
     try:
         db.session.add(new_user)
         db.session.commit()
-        print(f"Đã thêm người dùng: {username} ({role_enum_value.value}) thành công.")
+        log.info("user added", user_id=new_user.id, role=role_enum_value.value)
+        if avatar_key:
+            uploads.submit(uploads.KIND_AVATAR, new_user.id, avatar_key)
         return new_user
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"Lỗi khi thêm người dùng vào DB: {e}")
+        log.exception("add_user failed", username=username)
         return None
 
 
@@ -261,11 +296,11 @@ def add_user_google(**user_data):
     try:
         db.session.add(new_user)
         db.session.commit()
-        print(f"Đã thêm người dùng Google: {username} thành công.")
+        log.info("google user added", user_id=new_user.id)
         return new_user
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"Lỗi khi thêm người dùng Google vào DB: {e}")
+        log.exception("add_user_google failed", username=username)
         return None
 
 
@@ -293,9 +328,9 @@ def add_resume(resume):
         db.session.add(resume)
         db.session.commit()
         return True
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"Error adding resume: {e}")
+        log.exception("add_resume failed")
         return False
 
 
@@ -315,15 +350,18 @@ def update_resume(resume, data):
             setattr(resume, key, value)
         db.session.commit()
         return True
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"Error updating resume: {e}")
+        log.exception("update_resume failed", resume_id=resume.id)
         return False
 
 
 def add_cv(title, file, is_default, resume_id=None):
     """
-    Add a CV to the database and upload the file to Cloudinary.
+    Add a CV to the database and upload the file in the background.
+
+    The CV starts with upload_status PENDING and no file_path; the upload worker
+    (app/uploads.py) sets file_path and marks it READY (or FAILED).
 
     Args:
         title (str): The title of the CV.
@@ -335,9 +373,8 @@ def add_cv(title, file, is_default, resume_id=None):
         bool: True if the CV was added successfully, False otherwise.
     """
     try:
-        # Upload file to Cloudinary
-        upload_result = cloudinary.uploader.upload(file.stream)
-        file_path = upload_result['secure_url']
+        # Stage the file to disk, the upload worker pushes it to storage
+        upload_key = uploads.stage_upload(file, uploads.KIND_CV)
 
         # If this CV is set as default, unset others for the same resume
         if is_default and resume_id:
@@ -346,7 +383,8 @@ def add_cv(title, file, is_default, resume_id=None):
         # Create new CV
         cv = CV(
             title=title,
-            file_path=file_path,
+            upload_status=UploadStatusEnum.PENDING,
+            upload_key=upload_key,
             is_default=is_default,
             resume_id=resume_id,
             created_date=datetime.now(),
@@ -354,16 +392,19 @@ def add_cv(title, file, is_default, resume_id=None):
         )
         db.session.add(cv)
         db.session.commit()
+        uploads.submit(uploads.KIND_CV, cv.id, upload_key)
         return True
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"Error adding CV: {e}")
+        log.exception("add_cv failed", resume_id=resume_id)
         return False
 
 
 def update_cv(cv, title, file, is_default, resume_id=None):
     """
-    Update an existing CV in the database and optionally upload a new file to Cloudinary.
+    Update an existing CV in the database and optionally upload a new file in the background.
+
+    The current file stays available until the new upload is READY.
 
     Args:
         cv (CV): The CV object to update.
@@ -379,10 +420,12 @@ def update_cv(cv, title, file, is_default, resume_id=None):
         cv.title = title
         cv.updated_date = datetime.now()
 
-        # If a new file is provided, upload it
+        # If a new file is provided, stage it for the upload worker
+        upload_key = None
         if file:
-            upload_result = cloudinary.uploader.upload(file.stream)
-            cv.file_path = upload_result['secure_url']
+            upload_key = uploads.stage_upload(file, uploads.KIND_CV)
+            cv.upload_key = upload_key
+            cv.upload_status = UploadStatusEnum.PENDING
 
         # If this CV is set as default, unset others for the same resume
         if is_default and resume_id:
@@ -391,10 +434,12 @@ def update_cv(cv, title, file, is_default, resume_id=None):
         cv.is_default = is_default
 
         db.session.commit()
+        if upload_key:
+            uploads.submit(uploads.KIND_CV, cv.id, upload_key)
         return True
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"Error updating CV: {e}")
+        log.exception("update_cv failed", cv_id=cv.id)
         return False
 
 
@@ -412,9 +457,9 @@ def delete_cv(cv):
         db.session.delete(cv)
         db.session.commit()
         return True
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"Error deleting CV: {e}")
+        log.exception("delete_cv failed", cv_id=cv.id)
         return False
 
 
@@ -431,7 +476,6 @@ def add_company(data_company):
 
 def update_company(company, data):
     for key, value in data.items():
-        print(key, value)
         setattr(company, key, value)
     db.session.commit()
     return True
@@ -453,7 +497,6 @@ def add_company(data_company):
 
 def update_company(company, data):
     for key, value in data.items():
-        print(key, value)
         setattr(company, key, value)
     db.session.commit()
     return True
@@ -463,8 +506,11 @@ def load_company_by_id(user_id):
     return Company.query.filter_by(user_id=user_id).first()
 
 
-def get_user_by_id(user_id):
-    return User.query.get(user_id)
+def get_user_by_id(user_id, with_conversations=False):
+    query = User.query
+    if with_conversations:
+        query = query.options(selectinload(User.conversation))
+    return query.get(user_id)
 
 
 def get_user_by_application_id(application_id):
@@ -488,19 +534,77 @@ def auth_user(username, password, role=None):
     return None
 
 
+@read_replica
 def count_jobs():
     return db.session.query(Job).filter(Job.status == JobStatusEnum.POSTED).count()
 
 
+@read_replica
 def count_candidates():
-    print(User.role)
     return db.session.query(User).filter(User.role == RoleEnum.JOBSEEKER, User.is_active == True).count()
 
 
+@read_replica
 def count_companies():
     return db.session.query(User).filter(User.role == RoleEnum.RECRUITER, User.is_active == True).count()
 
 
+# Bộ đếm trang chủ: cache theo TTL (HOMEPAGE_COUNTERS_TTL) và bị xóa khi commit có thay đổi
+# liên quan tới job/user, nên trang chủ không phải COUNT(*) ở mỗi request.
+# query.update()/delete() hàng loạt trên job/user không qua flush: gọi invalidate_homepage_counters().
+HomepageCounters = namedtuple('HomepageCounters', ['jobs', 'candidates', 'companies'])
+HOMEPAGE_COUNTERS_KEY = 'homepage_counters'
+_HOMEPAGE_STALE = 'homepage_counters_stale'
+
+
+@read_replica
+def get_homepage_counters():
+    cache = get_cache()
+    counters = cache.get(HOMEPAGE_COUNTERS_KEY)
+    if counters is None:
+        # Ứng viên và công ty đếm chung một lượt quét bảng user
+        candidates, companies = db.session.query(
+            func.coalesce(func.sum(case((User.role == RoleEnum.JOBSEEKER, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((User.role == RoleEnum.RECRUITER, 1), else_=0)), 0)
+        ).filter(User.is_active == True).one()
+        counters = HomepageCounters(jobs=count_jobs(), candidates=int(candidates), companies=int(companies))
+        cache.set(HOMEPAGE_COUNTERS_KEY, counters, ttl=current_app.config.get('HOMEPAGE_COUNTERS_TTL', 60))
+    return counters
+
+
+def invalidate_homepage_counters():
+    get_cache().delete(HOMEPAGE_COUNTERS_KEY)
+
+
+def _affects_homepage_counters(obj, is_new_or_deleted):
+    if isinstance(obj, Job):
+        return is_new_or_deleted or inspect(obj).attrs.status.history.has_changes()
+    if isinstance(obj, User):
+        state = inspect(obj)
+        return is_new_or_deleted or state.attrs.role.history.has_changes() \
+            or state.attrs.is_active.history.has_changes()
+    return False
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_homepage_counters_stale(session, flush_context):
+    if any(_affects_homepage_counters(obj, True) for obj in chain(session.new, session.deleted)) \
+            or any(_affects_homepage_counters(obj, False) for obj in session.dirty):
+        session.info[_HOMEPAGE_STALE] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_homepage_counters_on_commit(session):
+    # Xóa sau commit (không phải sau flush) để request khác không cache lại số liệu cũ
+    if session.info.pop(_HOMEPAGE_STALE, False):
+        invalidate_homepage_counters()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_homepage_counters_stale(session):
+    session.info.pop(_HOMEPAGE_STALE, None)
+
+
 def load_cv_by_id(user_id):
     resume = Resume.query.filter_by(user_id=user_id).first()
     if not resume:
@@ -521,21 +625,44 @@ def get_applications_by_cv_ids(cv_ids):
     return Application.query.filter(Application.cv_id.in_(cv_ids))
 
 
+def with_application_details(query, job_joined=False):
+    """
+    Eager-load mọi thứ trang /applications (cardapply.html) cần: job, company, category,
+    cv -> resume -> user (JOIN, quan hệ many-to-one) và interviews (thêm 1 query SELECT IN).
+
+    job_joined=True khi query đã JOIN sẵn Job và Company (feed của nhà tuyển dụng): dùng lại
+    các JOIN đó thay vì JOIN thêm một lần nữa.
+    """
+    if job_joined:
+        job_options = (contains_eager(Application.job).contains_eager(Job.company),
+                       contains_eager(Application.job).joinedload(Job.category))
+    else:
+        job_options = (joinedload(Application.job).joinedload(Job.company),
+                       joinedload(Application.job).joinedload(Job.category))
+    return query.options(
+        *job_options,
+        joinedload(Application.cv).joinedload(CV.resume).joinedload(Resume.user),
+        selectinload(Application.interviews)
+    ).order_by(Application.applied_date.desc(), Application.id.desc())
+
+
+def get_interview_map(applications):
+    """{application_id: Interview} từ interviews đã được eager-load, không query thêm."""
+    return {a.id: a.interviews[0] for a in applications if a.interviews}
+
+
 # Load cac don ung tuyen cua nguoi dung
 def load_applications_for_user(current_user, page=None, per_page=None, status=None):
     if page and per_page:
-        resume = get_resume_by_user(current_user.id)
-        if not resume:
-            return Application.query.filter(False).paginate(page=page, per_page=per_page)
-
-        cv_ids = get_cv_ids_by_resume(resume.id)
-        if not cv_ids:
-            return Application.query.filter(False).paginate(page=page, per_page=per_page)
-
-        applications = get_applications_by_cv_ids(cv_ids)
+        # Join thẳng Application -> CV -> Resume thay vì lấy resume rồi danh sách cv_id
+        applications = Application.query \
+            .join(CV, CV.id == Application.cv_id) \
+            .join(Resume, Resume.id == CV.resume_id) \
+            .filter(Resume.user_id == current_user.id)
         if status:
-            applications = applications.filter_by(status=status)
-        return applications.paginate(page=page, per_page=per_page)
+            applications = applications.filter(Application.status == status)
+        return paginate(with_application_details(applications), page=page, per_page=per_page, error_out=True,
+                        count=COUNT_CACHED, count_key=('application', 'user', current_user.id, str(status)))
     return None
 
 
@@ -559,25 +686,34 @@ def get_applications_by_job_ids(job_ids):
     return Application.query.filter(Application.job_id.in_(job_ids))
 
 
+def company_applications_query(user_id, status=None, applied_from=None, applied_to=None):
+    """
+    Đơn ứng tuyển vào mọi job của công ty do user_id sở hữu, trong một câu query:
+    application JOIN job JOIN company WHERE company.user_id = ... (không lấy danh sách job_id
+    rồi IN (...) như trước). Dùng index ix_job_company_id và ix_application_job_status_applied.
+    """
+    query = Application.query \
+        .join(Job, Job.id == Application.job_id) \
+        .join(Company, Company.id == Job.company_id) \
+        .filter(Company.user_id == user_id)
+    if status:
+        query = query.filter(Application.status == status)
+    if applied_from:
+        query = query.filter(Application.applied_date >= applied_from)
+    if applied_to:
+        query = query.filter(Application.applied_date < applied_to)
+    return query
+
+
 # load danh sach cac don ung tuyen cua mot cong ty (tat ca job)
-def load_applications_for_company(user_id=None, page=None, per_page=None, status=None):
+def load_applications_for_company(user_id=None, page=None, per_page=None, status=None,
+                                  applied_from=None, applied_to=None):
     if page and per_page:
-        # lay thong tin cong ty
-        company = load_company_by_id(user_id)
-        if not company:
-            return Application.query.filter(False).paginate(page=page, per_page=per_page)
-
-        # lat job cua cong ty
-        jobs = get_job_by_company_id(company.id)
-        print(jobs)
-        if not jobs:
-            return Application.query.filter(False).paginate(page=page, per_page=per_page)
-
-        applications = get_applications_by_job_ids(job_ids=jobs)
-        if status:
-            applications = applications.filter_by(status=status)
-        print(applications)
-        return applications.paginate(page=page, per_page=per_page)
+        applications = company_applications_query(user_id, status=status,
+                                                  applied_from=applied_from, applied_to=applied_to)
+        return paginate(with_application_details(applications, job_joined=True), page=page, per_page=per_page,
+                        error_out=True, count=COUNT_CACHED,
+                        count_key=('application', 'company', user_id, str(status), str(applied_from), str(applied_to)))
     return None
 
 
@@ -585,7 +721,55 @@ def get_application_by_id(apply_id):
     return Application.query.get(apply_id)
 
 
+# Dữ liệu thông báo gọn nhẹ để cache (không giữ ORM object giữa các request)
+NotificationSummary = namedtuple('NotificationSummary', ['id', 'content', 'is_read', 'created_date'])
+NotificationBadge = namedtuple('NotificationBadge', ['unread', 'recent'])
+
+
 class NotificationDAO:
+    BADGE_SIZE = 5
+
+    @staticmethod
+    def _badge_key(user_id):
+        return f"notification_badge:{user_id}"
+
+    @staticmethod
+    def user_room(user_id: int) -> str:
+        """Room Socket.IO riêng của user, client tự vào khi kết nối (index.on_connect)."""
+        return f"user_{user_id}"
+
+    @staticmethod
+    def invalidate_badge(user_id: int) -> None:
+        get_cache().delete(NotificationDAO._badge_key(user_id))
+
+    @staticmethod
+    def get_badge(user_id: int) -> NotificationBadge:
+        """
+        Số thông báo chưa đọc + các thông báo mới nhất cho header, cache theo user.
+        Cache bị xóa ở mọi thao tác ghi của NotificationDAO nên phần lớn các trang không tốn query nào.
+        """
+        cache = get_cache()
+        key = NotificationDAO._badge_key(user_id)
+        badge = cache.get(key)
+        if badge is None:
+            recent = db.session.query(Notification.id, Notification.content, Notification.is_read,
+                                      Notification.created_date) \
+                .filter(Notification.user_id == user_id) \
+                .order_by(Notification.created_date.desc(), Notification.id.desc()) \
+                .limit(NotificationDAO.BADGE_SIZE).all()
+            badge = NotificationBadge(unread=NotificationDAO.get_unread(user_id),
+                                      recent=[NotificationSummary(*row) for row in recent])
+            cache.set(key, badge, ttl=NotificationDAO._badge_ttl(cache))
+        return badge
+
+    @staticmethod
+    def _badge_ttl(cache):
+        ttl = current_app.config.get('NOTIFICATION_BADGE_TTL')
+        if cache.shared:
+            return ttl
+        # Cache riêng từng worker: worker khác không thấy lệnh xóa khi có thông báo mới
+        return min(ttl, current_app.config.get('NOTIFICATION_BADGE_MEMORY_TTL', 5))
+
     @staticmethod
     def create(user_id: int, content: str) -> Notification:
         new_notification = Notification(
@@ -594,14 +778,67 @@ class NotificationDAO:
             created_date=datetime.now()
         )
         db.session.add(new_notification)
+        _notifications_changed(db.session(), [user_id], {user_id: (content, new_notification.created_date)})
         db.session.commit()
         return new_notification
 
     @staticmethod
-    def get_all(user_id: int, page: int = 1, per_page: int = 10):
-        return Notification.query.filter_by(user_id=user_id) \
-            .order_by(Notification.created_date.desc()) \
-            .paginate(page=page, per_page=per_page, error_out=False)
+    def queue(user_id: int, content: str) -> None:
+        """
+        Đưa thông báo vào hàng đợi của session hiện tại thay vì INSERT + commit ngay: mọi
+        thông báo trong request được ghi bằng một câu INSERT nhiều dòng ở lần commit kế tiếp
+        (cùng transaction với thao tác chính).
+        Quy tắc: view nào queue thông báo thì commit trước khi render/redirect/trả JSON.
+        Teardown _write_unsaved_notifications chỉ là lưới an toàn cho view quên commit: nó ghi
+        các thông báo này trên transaction riêng sau khi response đã render và log cảnh báo.
+        Rollback hay request lỗi thì bỏ luôn các thông báo đang chờ.
+        Ngoài request (script, scheduler) caller phải tự commit.
+        """
+        db.session.info.setdefault(_QUEUED_NOTIFICATIONS, []).append((user_id, content))
+
+    @staticmethod
+    def create_many(notifications, commit=True) -> int:
+        """
+        Thêm nhiều thông báo [(user_id, content), ...] bằng một câu INSERT nhiều dòng.
+        commit=False để ghi chung transaction với thao tác đang làm (caller tự commit).
+        Cache badge/count của người nhận bị xóa sau khi commit.
+        """
+        count = _insert_notifications(db.session(), list(notifications))
+        if count and commit:
+            db.session.commit()
+        return count
+
+    @staticmethod
+    def broadcast(content: str, user_ids, chunk_size: int = None) -> int:
+        """
+        Gửi cùng một thông báo cho mọi user trong `user_ids` (câu SELECT một cột user id, ví dụ
+        job_seeker_ids_in_category()). Đi theo từng chunk id tăng dần: mỗi chunk một SELECT id,
+        một INSERT nhiều dòng và một commit; không load User vào ORM.
+        """
+        chunk_size = chunk_size or current_app.config.get('NOTIFICATION_BROADCAST_CHUNK_SIZE', 1000)
+        ids = user_ids.subquery()
+        user_id = list(ids.c)[0]
+        last_id, total = None, 0
+        while True:
+            query = select(user_id).distinct().order_by(user_id).limit(chunk_size)
+            if last_id is not None:
+                query = query.where(user_id > last_id)
+            chunk = db.session.scalars(query).all()
+            if not chunk:
+                break
+            total += NotificationDAO.create_many([(uid, content) for uid in chunk])
+            last_id = chunk[-1]
+            if len(chunk) < chunk_size:
+                break
+        log.info("notification broadcast", recipients=total)
+        return total
+
+    @staticmethod
+    @read_replica
+    def get_all(user_id: int, page: int = 1, per_page: int = 10, count: str = COUNT_CACHED):
+        query = Notification.query.filter_by(user_id=user_id) \
+            .order_by(Notification.created_date.desc())
+        return paginate(query, page=page, per_page=per_page, count=count, count_key=('notification', user_id))
 
     @staticmethod
     def get_by_id(notification_id):
@@ -616,6 +853,7 @@ class NotificationDAO:
         Notification.query.filter_by(user_id=user_id, is_read=False).update({
             "is_read": True
         })
+        _notifications_changed(db.session(), [user_id])
         db.session.commit()
 
     @staticmethod
@@ -623,6 +861,7 @@ class NotificationDAO:
         noti = Notification.query.get(notification_id)
         if noti:
             db.session.delete(noti)
+            _notifications_changed(db.session(), [noti.user_id])
             db.session.commit()
             return True
         return False
@@ -630,6 +869,7 @@ class NotificationDAO:
     @staticmethod
     def delete_all_by_user(user_id: int) -> int:
         count = Notification.query.filter_by(user_id=user_id).delete()
+        _notifications_changed(db.session(), [user_id])
         db.session.commit()
         return count
 
@@ -638,27 +878,212 @@ class NotificationDAO:
         notify = Notification.query.filter_by(id=notification_id, user_id=user_id).first()
         if notify and not notify.is_read:
             notify.is_read = True
+            _notifications_changed(db.session(), [user_id])
+            db.session.commit()
+
+
+_QUEUED_NOTIFICATIONS = 'queued_notifications'
+_NOTIFIED_USERS = 'notified_user_ids'       # user có thông báo thêm/đọc/xóa trong transaction
+_NEW_NOTIFICATIONS = 'new_notifications'    # user_id -> (content, created_date) thông báo mới nhất
+_NOTIFICATION_PUSHES = 'notification_pushes'
+
+
+def _notifications_changed(session, user_ids, new=None):
+    session.info.setdefault(_NOTIFIED_USERS, set()).update(user_ids)
+    if new:
+        session.info.setdefault(_NEW_NOTIFICATIONS, {}).update(new)
+
+
+def _notification_rows(notifications):
+    now = datetime.now()
+    return [dict(user_id=user_id, content=content, is_read=False, created_date=now)
+            for user_id, content in notifications]
+
+
+def _latest(rows):
+    return {row['user_id']: (row['content'], row['created_date']) for row in rows}
+
+
+def _insert_notifications(session, notifications):
+    rows = _notification_rows(notifications)
+    if not rows:
+        return 0
+    session.execute(insert(Notification), rows)
+    _notifications_changed(session, [row['user_id'] for row in rows], _latest(rows))
+    return len(rows)
+
+
+def _unread_counts(session, user_ids):
+    """Số thông báo chưa đọc của nhiều user bằng một câu GROUP BY (trong transaction hiện tại)."""
+    counts = dict.fromkeys(user_ids, 0)
+    rows = session.execute(select(Notification.user_id, func.count())
+                           .where(Notification.user_id.in_(list(user_ids)), Notification.is_read.is_(False))
+                           .group_by(Notification.user_id))
+    counts.update(rows.all())
+    return counts
+
+
+def _push_notifications(unread, new):
+    """
+    Gửi sự kiện 'notification' {unread, notification?} tới room của từng user. Khi có
+    SOCKETIO_MESSAGE_QUEUE, socketio.emit() publish qua message queue nên client ở worker
+    khác (và từ scheduler/script) vẫn nhận được (xem app/realtime.py).
+    """
+    for user_id, count in unread.items():
+        data = dict(unread=count)
+        if user_id in new:
+            content, created_date = new[user_id]
+            data['notification'] = dict(content=content, created_date=created_date.strftime('%d/%m/%Y %H:%M'))
+        try:
+            socketio.emit('notification', data, to=NotificationDAO.user_room(user_id), namespace='/')
+            metrics.current().socketio_messages.labels('notification').inc()
+        except Exception:
+            # Message queue lỗi: badge vẫn đúng ở lần render trang sau
+            log.warning("notification push failed", users=len(unread), exc_info=True)
+            return
+
+
+@event.listens_for(Session, 'before_commit')
+def _write_queued_notifications(session):
+    queued = session.info.pop(_QUEUED_NOTIFICATIONS, None)
+    if queued:
+        _insert_notifications(session, queued)
+    user_ids = session.info.get(_NOTIFIED_USERS)
+    if user_ids and _push_enabled():
+        # Đếm trong transaction sắp commit; chỉ gửi sau khi commit thành công
+        session.info[_NOTIFICATION_PUSHES] = _unread_counts(session, user_ids)
+
+
+def _push_enabled():
+    return current_app.config.get('NOTIFICATION_PUSH', True) and socketio.server is not None
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_notified_users(session):
+    _notifications_written(session.info.pop(_NOTIFIED_USERS, None), session.info.pop(_NEW_NOTIFICATIONS, {}),
+                           session.info.pop(_NOTIFICATION_PUSHES, None))
+
+
+def _notifications_written(user_ids, new, unread):
+    """Sau khi thông báo đã commit: xóa cache badge/COUNT của người nhận và push số chưa đọc."""
+    if user_ids:
+        get_cache().delete(*[NotificationDAO._badge_key(user_id) for user_id in user_ids])
+        for user_id in user_ids:
+            invalidate_count('notification', user_id)
+    if unread:
+        _push_notifications(unread, new)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_queued_notifications(session):
+    for key in (_QUEUED_NOTIFICATIONS, _NOTIFIED_USERS, _NEW_NOTIFICATIONS, _NOTIFICATION_PUSHES):
+        session.info.pop(key, None)
+
+
+def _write_unsaved_notifications(exc):
+    """
+    Teardown (lưới an toàn): view đã NotificationDAO.queue() nhưng không commit, trái quy tắc
+    của queue(). Chỉ ghi các thông báo đó, trên transaction riêng; không commit session nên
+    thay đổi khác chưa commit của request vẫn bị bỏ như khi không có thông báo.
+    """
+    queued = db.session.info.pop(_QUEUED_NOTIFICATIONS, None)
+    if exc is not None or not queued:
+        return
+    log.warning("queued notifications were not committed by the view",
+                endpoint=request.endpoint, count=len(queued))
+    # Rollback trước để nhả lock của request (MySQL) mà câu INSERT có thể phải chờ
+    db.session.rollback()
+    try:
+        rows = _notification_rows(queued)
+        user_ids = {row['user_id'] for row in rows}
+        with db.engine.begin() as connection:
+            connection.execute(insert(Notification), rows)
+            unread = _unread_counts(connection, user_ids) if _push_enabled() else None
+        _notifications_written(user_ids, _latest(rows), unread)
+    except Exception:
+        log.exception("writing queued notifications failed", count=len(queued))
+
+
+def job_seeker_ids_in_category(category_id):
+    """SELECT id các ứng viên đã ứng tuyển job thuộc category (dùng cho NotificationDAO.broadcast)."""
+    return select(Resume.user_id) \
+        .join(CV, CV.resume_id == Resume.id) \
+        .join(Application, Application.cv_id == CV.id) \
+        .join(Job, Job.id == Application.job_id) \
+        .where(Job.category_id == category_id, Resume.user_id.isnot(None))
+
+
+def active_user_ids(role=None):
+    """SELECT id các user đang hoạt động (theo role nếu có), dùng cho NotificationDAO.broadcast."""
+    query = select(User.id).where(User.is_active == True)
+    if role:
+        query = query.where(User.role == role)
+    return query
+
+
+def expire_jobs(batch_size=None, now=None):
+    """
+    Chuyển các job POSTED đã quá expiration_date sang EXPIRED theo batch (index
+    ix_job_status_expiration): mỗi batch một SELECT ... FOR UPDATE SKIP LOCKED, một UPDATE
+    theo danh sách id và một INSERT nhiều dòng thông báo cho nhà tuyển dụng, cùng một commit.
+    Nhiều process chạy cùng lúc không xử lý (và không báo) trùng job. Trả về số job đã chuyển.
+    """
+    batch_size = batch_size or current_app.config.get('JOB_EXPIRATION_BATCH_SIZE', 500)
+    now = now or datetime.now()
+    total = 0
+    while True:
+        rows = db.session.query(Job.id, Job.title, Company.user_id) \
+            .outerjoin(Company, Company.id == Job.company_id) \
+            .filter(Job.status == JobStatusEnum.POSTED, Job.expiration_date <= now) \
+            .order_by(Job.expiration_date, Job.id) \
+            .limit(batch_size) \
+            .with_for_update(skip_locked=True, of=Job) \
+            .all()
+        if not rows:
+            break
+        try:
+            Job.query.filter(Job.id.in_([row.id for row in rows])) \
+                .update({Job.status: JobStatusEnum.EXPIRED, Job.updated_date: now}, synchronize_session=False)
+            NotificationDAO.create_many([(user_id, f"Your job posting '{title}' has expired.")
+                                         for _, title, user_id in rows if user_id], commit=False)
             db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+
+    if total:
+        # UPDATE hàng loạt không qua flush: tự xóa bộ đếm trang chủ và COUNT phân trang job
+        invalidate_homepage_counters()
+        invalidate_count('job')
+        log.info("jobs expired", count=total)
+    return total
 
 
 def get_list_recruiter(page=None, per_page=None):
     query = User.query.filter_by(role=RoleEnum.RECRUITER, is_active=True)
-    print("query:", query)
-    listRecruiter_pagination = query.paginate(page=page, per_page=per_page)
-    print(listRecruiter_pagination)
+    listRecruiter_pagination = paginate(query, page=page, per_page=per_page, error_out=True, count=COUNT_CACHED,
+                                        count_key=('user', 'recruiter'))
     return listRecruiter_pagination
 
 
 def get_conversations_for_user(user_id):
-    """Lấy tất cả các cuộc trò chuyện của một người dùng."""
-    user = User.query.get(user_id)
-    if user:
-        return user.conversation
-    return []
+    """Lấy tất cả các cuộc trò chuyện của một người dùng (kèm danh sách người tham gia, 2 query)."""
+    return Conversation.query \
+        .join(conversation_user, conversation_user.c.conversation_id == Conversation.id) \
+        .filter(conversation_user.c.user_id == user_id) \
+        .options(selectinload(Conversation.users)) \
+        .order_by(Conversation.created_date.desc(), Conversation.id.desc()) \
+        .all()
 
 
-def get_conversation_by_id(conversation_id):
-    return Conversation.query.get(conversation_id)
+def get_conversation_by_id(conversation_id, with_users=False):
+    query = Conversation.query
+    if with_users:
+        query = query.options(selectinload(Conversation.users))
+    return query.get(conversation_id)
 
 
 def get_or_create_conversation(user1_id, user2_id):
@@ -682,6 +1107,73 @@ def get_or_create_conversation(user1_id, user2_id):
     return None
 
 
+ConversationSummary = namedtuple('ConversationSummary', ['conversation', 'recipient', 'last_message', 'unread'])
+
+
+def get_conversation_summaries(user_id):
+    """
+    Hộp thư: mỗi cuộc trò chuyện kèm người còn lại, tin nhắn cuối và số tin chưa đọc.
+    Số query cố định (3) dù lịch sử dài bao nhiêu, sắp theo hoạt động gần nhất.
+    """
+    convs = get_conversations_for_user(user_id)
+    if not convs:
+        return []
+
+    per_conversation = db.session.query(
+        Message.conversation_id.label('conversation_id'),
+        func.max(Message.id).label('last_message_id'),
+        func.sum(case((and_(Message.is_read == False, Message.sender_id != user_id), 1), else_=0)).label('unread')
+    ).filter(Message.conversation_id.in_([conv.id for conv in convs])) \
+        .group_by(Message.conversation_id) \
+        .subquery()
+    rows = db.session.query(per_conversation.c.conversation_id, per_conversation.c.unread, Message) \
+        .join(Message, Message.id == per_conversation.c.last_message_id) \
+        .all()
+    last = {conversation_id: (message, int(unread or 0)) for conversation_id, unread, message in rows}
+
+    summaries = []
+    for conv in convs:
+        message, unread = last.get(conv.id, (None, 0))
+        recipient = next((user for user in conv.users if user.id != user_id), None)
+        summaries.append(ConversationSummary(conv, recipient, message, unread))
+    summaries.sort(key=lambda summary: summary.last_message.timestamp if summary.last_message
+                   else summary.conversation.created_date or datetime.min, reverse=True)
+    return summaries
+
+
+def mark_conversation_read(conversation_id, user_id):
+    """Đánh dấu đã đọc mọi tin nhắn người khác gửi cho user trong cuộc trò chuyện."""
+    updated = Message.query.filter(Message.conversation_id == conversation_id,
+                                   Message.sender_id != user_id,
+                                   Message.is_read == False) \
+        .update({Message.is_read: True}, synchronize_session=False)
+    if updated:
+        db.session.commit()
+    return updated
+
+
+def is_conversation_member(conversation_id, user_id):
+    return db.session.query(
+        db.session.query(conversation_user)
+        .filter(conversation_user.c.conversation_id == conversation_id,
+                conversation_user.c.user_id == user_id)
+        .exists()
+    ).scalar()
+
+
+def get_messages(conversation_id, before=None, per_page=None):
+    """
+    Lịch sử chat theo keyset trên (timestamp, id), kèm sender (không N+1).
+
+    :param before: Cursor next_cursor của lần tải trước -> lấy các tin nhắn cũ hơn.
+    :return: KeysetPagination, items sắp từ mới tới cũ; next_cursor dùng cho "load older".
+    """
+    query = Message.query.filter(Message.conversation_id == conversation_id) \
+        .options(joinedload(Message.sender))
+    return keyset_paginate(query, Message.timestamp, Message.id,
+                           per_page=per_page or current_app.config.get('CHAT_PAGE_SIZE', 30), after=before)
+
+
 def add_message(conversation_id, sender_id, content):
     message = Message(
         conversation_id=conversation_id,
@@ -693,26 +1185,35 @@ def add_message(conversation_id, sender_id, content):
     return message
 
 
-def stats_job_by_recruiter(company_id, time='month', year=datetime.now().year):
-    return (
-        db.session.query(
-            func.extract(time, Job.created_date).label("month"),
-            func.count(Job.id).label("count"),
-            func.extract("year", Job.created_date).label("year")
-        )
-        .join(Company, Company.id == Job.company_id)
-        .filter(Company.id == company_id)
-        .filter(func.extract("year", Job.created_date) == year)
-        .group_by(func.extract(time, Job.created_date), func.extract("year", Job.created_date))
-        .order_by(func.extract(time, Job.created_date))
+@read_replica
+def stats_job_by_recruiter(company_id, year=None):
+    """
+    Số job đăng và số đơn ứng tuyển theo tháng trong năm, đọc từ bảng rollup (app/stats.py).
+    Tháng có đơn nhưng không đăng job vẫn được trả về; dòng đã về 0 hết (job/đơn bị xóa) thì bỏ.
+    """
+    year = year or datetime.now().year
+    rows = CompanyMonthStat.query \
+        .filter(CompanyMonthStat.company_id == company_id, CompanyMonthStat.year == year,
+                or_(CompanyMonthStat.jobs != 0, CompanyMonthStat.applications != 0)) \
+        .order_by(CompanyMonthStat.month) \
         .all()
-    )
-
-
-def stats_application_by_recruiter(job_id):
-    job = db.session.query(Job).filter(Job.id == job_id).first()
-    query = db.session.query(Application).filter(Application.job_id == job_id).count()
-    return {"job_id": job.id, "title": job.title, "count": query}
+    return [dict(month=r.month, year=r.year, count=r.jobs, applications=r.applications, pending=r.pending,
+                 confirmed=r.confirmed, accepted=r.accepted, rejected=r.rejected) for r in rows]
+
+
+@read_replica
+def stats_application_by_recruiter(company_id, year=None):
+    """Số đơn ứng tuyển của từng job đăng trong năm của công ty, một query (job LEFT JOIN job_stat)."""
+    year = year or datetime.now().year
+    rows = db.session.query(Job.id, Job.title, JobStat) \
+        .outerjoin(JobStat, JobStat.job_id == Job.id) \
+        .filter(Job.company_id == company_id, extract('year', Job.created_date) == year) \
+        .order_by(Job.id) \
+        .all()
+    return [dict(job_id=job_id, title=title, count=stat.applications if stat else 0,
+                 pending=stat.pending if stat else 0, confirmed=stat.confirmed if stat else 0,
+                 accepted=stat.accepted if stat else 0, rejected=stat.rejected if stat else 0)
+            for job_id, title, stat in rows]
 
 
 def render_interview_link(application_id, prefix="application"):
@@ -758,8 +1259,14 @@ def get_list_interview_by_owner_company(user_id):
 def get_company_by_id(company_id):
     return db.session.query(Company).filter(Company.id==company_id).first()
 
+def init_app(app):
+    app.teardown_request(_write_unsaved_notifications)
+
+
 if __name__ == "__main__":
-    with app.app_context():
+    from app import create_app
+
+    with create_app().app_context():
         # u = load_jobs(location="Ha Noi City",employment_type=EmploymentEnum.FULLTIME)
         # for i in u:
         #     print(i.title)
@@ -0,0 +1,145 @@
+"""
+    Cấu hình engine (pool) và đọc từ read replica.
+
+    Pool (DB_POOL_*): áp dụng cho engine chính và replica, trừ sqlite (Flask-SQLAlchemy tự
+    chọn pool cho sqlite). pool_recycle phải nhỏ hơn wait_timeout của MySQL để không nhận
+    connection đã bị server đóng; pool_pre_ping kiểm tra connection trước khi dùng.
+
+    Replica: DATABASE_REPLICA_URLS="mysql+pymysql://...@replica1/db,mysql+pymysql://...@replica2/db"
+    tạo các bind replica_0, replica_1... RoutingSession gửi câu SELECT chạy trong
+    `with replica():` (hoặc trong hàm có @read_replica) tới một replica, mỗi transaction
+    một replica theo vòng tròn. Vẫn đọc primary khi:
+        - transaction hiện tại đã ghi (flush, UPDATE/DELETE/INSERT) hoặc có thay đổi chờ flush
+        - request đã commit ghi, và DB_REPLICA_STICKY_SECONDS giây sau đó cho cùng phiên
+          đăng nhập (replica có thể trễ hơn primary): người dùng luôn thấy dữ liệu mình vừa ghi.
+          Mốc thời gian lưu trong session cookie chỉ khi người dùng đã đăng nhập, để request
+          ẩn danh có ghi (đếm lượt xem...) không làm Flask gửi lại cookie session
+        - SELECT ... FOR UPDATE, câu text() và mọi câu không phải SELECT
+        - trong `with primary():`, kể cả khi hàm ngoài có @read_replica
+    Không cấu hình replica thì replica()/@read_replica không làm gì.
+
+    Dữ liệu đọc từ replica rồi đưa vào cache (bộ đếm trang chủ, COUNT phân trang) có thể cũ
+    bằng độ trễ replication cho tới khi cache hết hạn; badge thông báo vì vậy vẫn đọc primary.
+"""
+import functools
+import itertools
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+REPLICA_PREFIX = 'replica_'
+_PRIMARY_UNTIL = '_db_primary_until'
+
+# Khóa trong Session.info
+_REPLICA_DEPTH = 'replica_depth'
+_PRIMARY_DEPTH = 'primary_depth'
+_WROTE = 'replica_wrote'
+_REPLICA = 'replica_engine'
+
+_round_robin = itertools.count()
+
+
+def engine_options(uri, config):
+    """Tham số create_engine cho `uri` theo DB_POOL_*; sqlite dùng mặc định."""
+    if make_url(uri).get_backend_name() == 'sqlite':
+        return {}
+    return dict(pool_size=config['DB_POOL_SIZE'], max_overflow=config['DB_MAX_OVERFLOW'],
+                pool_timeout=config['DB_POOL_TIMEOUT'], pool_recycle=config['DB_POOL_RECYCLE'],
+                pool_pre_ping=config['DB_POOL_PRE_PING'])
+
+
+def replica_binds(urls, config):
+    """SQLALCHEMY_BINDS cho danh sách URL replica: {'replica_0': {'url': ..., pool...}, ...}."""
+    return {f'{REPLICA_PREFIX}{i}': dict(url=url, **engine_options(url, config)) for i, url in enumerate(urls)}
+
+
+class RoutingSession(Session):
+    """Session của db: chọn engine replica cho câu SELECT trong replica(), còn lại như Session gốc."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica(clause):
+            engine = self._replica()
+            if engine is not None:
+                return engine
+        if self._flushing or getattr(clause, 'is_dml', False):
+            self.info[_WROTE] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        info = self.info
+        if not info.get(_REPLICA_DEPTH) or info.get(_PRIMARY_DEPTH) or info.get(_WROTE) or self._flushing:
+            return False
+        if not getattr(clause, 'is_select', False) or getattr(clause, '_for_update_arg', None) is not None:
+            return False
+        if self.new or self.dirty or self.deleted:
+            return False
+        return not _recently_wrote()
+
+    def _replica(self):
+        engine = self.info.get(_REPLICA)
+        if engine is None:
+            replicas = [engine for key, engine in sorted(self._db.engines.items(), key=lambda item: item[0] or '')
+                        if key and key.startswith(REPLICA_PREFIX)]
+            if not replicas:
+                return None
+            engine = self.info[_REPLICA] = replicas[next(_round_robin) % len(replicas)]
+        return engine
+
+
+def _recently_wrote():
+    if not has_request_context():
+        return False
+    return g.get('db_wrote', False) or flask_session.get(_PRIMARY_UNTIL, 0) > time.time()
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(session):
+    if session.info.get(_WROTE) and has_request_context():
+        g.db_wrote = True
+        sticky = current_app.config.get('DB_REPLICA_STICKY_SECONDS')
+        # '_user_id' là khóa Flask-Login đặt khi đăng nhập; current_user có thể phải query
+        # (user_loader) mà session vừa commit không chạy được câu nào trong hook này
+        if sticky and '_user_id' in flask_session:
+            flask_session[_PRIMARY_UNTIL] = time.time() + sticky
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _reset_transaction(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_WROTE, None)
+        session.info.pop(_REPLICA, None)
+
+
+@contextmanager
+def _nested(key):
+    from app import db
+
+    info = db.session.info
+    info[key] = info.get(key, 0) + 1
+    try:
+        yield
+    finally:
+        info[key] -= 1
+
+
+def replica():
+    """with replica(): ... -> câu SELECT trong khối đọc từ replica (nếu được, xem docstring module)."""
+    return _nested(_REPLICA_DEPTH)
+
+
+def primary():
+    """with primary(): ... -> luôn đọc primary, kể cả khi nằm trong replica()."""
+    return _nested(_PRIMARY_DEPTH)
+
+
+def read_replica(fn):
+    """Decorator cho hàm DAO chỉ đọc: chạy fn trong replica()."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with replica():
+            return fn(*args, **kwargs)
+    return wrapper
@@ -1,27 +1,28 @@
 from flask import redirect, url_for, flash, abort
-from flask import render_template, request, jsonify
-from flask_dance.contrib.google import google
+from flask import render_template, request, jsonify, current_app
 from flask_login import login_user, logout_user, current_user, login_required
 from flask_socketio import join_room, leave_room, send
 from app import socketio
 from app.models import Conversation, Message, EmploymentEnum, RoleEnum, JobStatusEnum, ApplicationStatusEnum, Resume, CV, Job, Application, Interview
 from pyexpat.errors import messages
 
-from app import app, dao, login, mail, db
-from datetime import datetime
-from flask_mail import Message as MailMessage
+from app import create_app, dao, login, db
+from app.chat_writer import get_writer
+from app.job_views import record_view
+from app import metrics
+from app.logger import get_logger
+from app.mailer import queue_mail
+from app.pagination import encode_cursor
+from datetime import datetime, timedelta
+
+log = get_logger(__name__)
 
 
 def send_email(email, title, content):
-    msg = MailMessage(
-        subject=title,
-        recipients=[email],
-        body=content
-    )
-    mail.send(msg)
-    return 'Email sent successfully!'
-
-@app.context_processor
+    # Chỉ đưa vào outbox (người gọi commit), worker gửi sau (xem app/mailer.py)
+    queue_mail(email, title, content)
+    return 'Email queued successfully!'
+
 def inject_user():
     is_recruiter = current_user.is_authenticated and current_user.role == RoleEnum.RECRUITER
     is_jobSeeker = current_user.is_authenticated and current_user.role == RoleEnum.JOBSEEKER
@@ -31,41 +32,37 @@ def inject_user():
     return dict(is_recruiter=is_recruiter, is_jobSeeker=is_jobSeeker, is_admin=is_admin, is_verified_recruiter=is_verified_recruiter)
 
 
-@app.context_processor
 def inject_enums():
     return dict(ApplicationStatusEnum=ApplicationStatusEnum)
 
 
-@app.context_processor
-def inject_notifications():
-    if current_user.is_authenticated:
-        page = int(request.args.get('page', 1))
-        per_page = 5
+def inject_pagination():
+    return dict(keyset_page_threshold=current_app.config["KEYSET_PAGE_THRESHOLD"])
+
+
+def job_cursor(job):
+    return encode_cursor(job.created_date, job.id)
 
-        pagination = dao.NotificationDAO.get_all(current_user.id, page=page, per_page=per_page)
-        notis = pagination.items
-        unread_notifications = dao.NotificationDAO.get_unread(current_user.id)
 
-        return dict(notifications=notis,
-                    unread_notifications=unread_notifications,
-                    notification_pagination=pagination)
+def inject_notifications():
+    # Badge trên header đọc từ cache theo user, không query DB ở hầu hết các trang
+    if current_user.is_authenticated:
+        badge = dao.NotificationDAO.get_badge(current_user.id)
+        return dict(notifications=badge.recent,
+                    unread_notifications=badge.unread)
     return {}
 
 
-@app.route('/')
 def index():
-    total_jobs = dao.count_jobs()
-    total_candidates = dao.count_candidates()
-    total_companies = dao.count_companies()
+    counters = dao.get_homepage_counters()
 
     return render_template('index.html',
-                           total_jobs=total_jobs,
-                           total_candidates=total_candidates,
-                           total_companies=total_companies,
+                           total_jobs=counters.jobs,
+                           total_candidates=counters.candidates,
+                           total_companies=counters.companies,
                            )
 
 
-@app.route('/profile', methods=['POST', 'GET'])
 @login_required
 def profile_process():
     if current_user.is_authenticated:
@@ -84,14 +81,16 @@ def profile_process():
                 if data_company:
                     dao.update_company(data_company, form_data)
                     flash('Company was successfully updated', 'success')
-                    dao.NotificationDAO.create(user_id=current_user.id,
-                                               content="Your company profile has been updated.")
+                    dao.NotificationDAO.queue(user_id=current_user.id,
+                                              content="Your company profile has been updated.")
                 else:
                     form_data['user_id'] = current_user.id
                     dao.add_company(form_data)
                     flash('Company was successfully added', 'success')
-                    dao.NotificationDAO.create(user_id=current_user.id,
-                                               content="You have successfully created your company profile.")
+                    dao.NotificationDAO.queue(user_id=current_user.id,
+                                              content="You have successfully created your company profile.")
+                # Commit thông báo vừa queue trước khi render để badge của trang có thông báo mới
+                db.session.commit()
 
             data_company = dao.load_company_by_id(current_user.id)
 
@@ -107,7 +106,6 @@ def profile_process():
 
             title = "Company Profile"
             subtitle = "Edit your company profile"
-            print(current_user.company)
             return render_template('profile/company.html',
                                    data_company=data_company,
                                    title=title,
@@ -142,14 +140,14 @@ def profile_process():
                             # Update existing resume
                             dao.update_resume(resume, resume_data)
                             flash('Resume was successfully updated', 'success')
-                            dao.NotificationDAO.create(user_id=current_user.id, content="Your resume has been updated.")
+                            dao.NotificationDAO.queue(user_id=current_user.id, content="Your resume has been updated.")
                         else:
                             # Create new resume
                             resume = Resume(**resume_data)
                             dao.add_resume(resume)
                             flash('Resume was successfully added', 'success')
-                            dao.NotificationDAO.create(user_id=current_user.id,
-                                                       content="You have successfully created your resume.")
+                            dao.NotificationDAO.queue(user_id=current_user.id,
+                                                      content="You have successfully created your resume.")
 
                 elif 'cv_form' in request.form:  # Handle CV form submission
                     title = request.form['title']
@@ -173,8 +171,8 @@ def profile_process():
                             )
                             if success:
                                 flash('CV was successfully uploaded', 'success')
-                                dao.NotificationDAO.create(user_id=current_user.id,
-                                                           content=f'Your CV "{title}" has been uploaded.')
+                                dao.NotificationDAO.queue(user_id=current_user.id,
+                                                          content=f'Your CV "{title}" has been uploaded.')
                             else:
                                 flash('Error uploading CV', 'danger')
 
@@ -205,18 +203,19 @@ def profile_process():
                                 )
                                 if success:
                                     flash('CV was successfully updated', 'success')
-                                    dao.NotificationDAO.create(user_id=current_user.id,
-                                                               content=f'Your CV "{title}" has been updated.')
+                                    dao.NotificationDAO.queue(user_id=current_user.id,
+                                                              content=f'Your CV "{title}" has been updated.')
 
                                 else:
                                     flash('Error updating CV', 'danger')
 
+                # Commit thông báo vừa queue (nếu có) trước khi trả về
+                db.session.commit()
                 return redirect(url_for('profile_process'))
 
     return render_template('profile/profile.html', title=title, subtitle=subtitle, resume=resume, rows=cv_list)
 
 
-@app.route('/delete_cv', methods=['POST'])
 def delete_cv():
     cv_id = request.form.get('cv_id')
     if not cv_id:
@@ -236,16 +235,16 @@ def delete_cv():
     success = dao.delete_cv(cv)
     if success:
         flash('CV was successfully deleted', 'success')
-        dao.NotificationDAO.create(
+        dao.NotificationDAO.queue(
             user_id=current_user.id,
             content=f'Your CV "{cv.title}" was successfully deleted.'
         )
+        db.session.commit()
     else:
         flash('Error deleting CV', 'danger')
     return redirect(url_for('profile_process'))
 
 
-@app.route("/register", methods=['GET', 'POST'])
 def register_process():
     err_msg = None
     if request.method == 'POST':
@@ -265,7 +264,6 @@ def register_process():
     return render_template('register.html', err_msg=err_msg, title=title, subtitle=subtitle)
 
 
-@app.route("/login", methods=['GET', 'POST'])
 def login_process():
     if request.method.__eq__('POST'):
         username = request.form.get('username')
@@ -282,17 +280,28 @@ def login_process():
     return render_template('login.html', title=title, subtitle=subtitle)
 
 
-@app.route("/login/google")
+def _google():
+    """Session OAuth của flask_dance, None khi chưa cấu hình GOOGLE_OAUTH_CLIENT_ID (xem create_app)."""
+    if 'google' not in current_app.blueprints:
+        return None
+    from flask_dance.contrib.google import google
+    return google
+
+
 def google_initiate_login():
+    google = _google()
+    if google is None:
+        flash("Đăng nhập bằng Google chưa được cấu hình.", "danger")
+        return redirect(url_for("login_process"))
     if not google.authorized:
         return redirect(url_for("google.login"))
     # Nếu đã được ủy quyền (authorized) rồi, chuyển hướng về trang chính.
     return redirect(url_for("index"))
 
 
-@app.route("/login/google/callback")
 def google_authorized():
-    if not google.authorized:
+    google = _google()
+    if google is None or not google.authorized:
         flash("Đăng nhập bằng Google thất bại: Người dùng chưa cấp quyền.", "danger")
         return redirect(url_for("login_process"))
 
@@ -338,7 +347,6 @@ def google_authorized():
     return redirect(url_for("login_process"))
 
 
-@app.route("/logout")
 def logout_process():
     logout_user()
     return redirect(url_for('login_process'))
@@ -349,7 +357,6 @@ def get_user_by_id(user_id):
     return dao.get_user_by_id(user_id)
 
 
-@app.route('/about')
 def about():
     title = "About Us"
     subtitle = "Learn more about our company and our services."
@@ -358,7 +365,6 @@ def about():
                            subtitle=subtitle)
 
 
-@app.route('/contact')
 def contact():
     title = "Contact Us"
     subtitle = "Get in touch with us for any questions or inquiries."
@@ -367,7 +373,6 @@ def contact():
                            subtitle=subtitle)
 
 
-@app.route("/jobs", methods=["GET"])
 def job():
     title = "JOB"
     subtitle = "Welcome to Job"
@@ -392,17 +397,24 @@ def job():
         try:
             job_type_enum = EmploymentEnum[jobType]  # vi du "FULLTIME" -> EmploymentEnum.FULLTIME
         except KeyError:
-            print(f"[!] jobType không hợp lệ: {jobType}")
+            log.info("invalid jobType filter", job_type=jobType)
+    # Có after/before -> phân trang theo cursor (trang sâu không cần OFFSET)
+    after = request.args.get('after')
+    before = request.args.get('before')
+    sort = dao.SORT_POPULAR if request.args.get('sort') == dao.SORT_POPULAR else dao.SORT_LATEST
     jobs = dao.load_jobs(page=page, per_page=page_size, keyword=keyword, location=locate, employment_type=job_type_enum,
-                         category_id=category)
+                         category_id=category, after=after, before=before, sort=sort)
     locations = [loc[0] for loc in db.session.query(Job.location).distinct().all()]
     return render_template("jobs.html", title=title, subtitle=subtitle, cates=cates, jobs=jobs, locations=locations,
-                           EmploymentEnum=EmploymentEnum, selected_job_type=jobType)
+                           EmploymentEnum=EmploymentEnum, selected_job_type=jobType, sort=sort)
 
 
-@app.route("/job-detail/<int:job_id>", methods=["get"])
 def job_detail(job_id):
     job = Job.query.get(job_id)
+    if not job:
+        abort(404)
+    # Lượt xem được gom lại và ghi theo batch (xem app/job_views.py)
+    record_view(job.id)
     page = int(request.args.get('page', 1))
     page_size = 3
     jobs = dao.load_jobs(page=page, per_page=page_size, location=job.location, exclude_job=job.id)
@@ -413,17 +425,15 @@ def job_detail(job_id):
     applications = []
     if current_user.is_authenticated and current_user.role == RoleEnum.RECRUITER and job.company_id == current_user.company.id:
         applications = dao.load_applications_for_company(current_user.id, page=page, per_page=page_size)
-        print(applications)
         content = f"Nhà tuyển dụng đã xem hồ sơ của bạn cho công việc '{job.title}'."
-        # dao.NotificationDAO.create(user_id=applications.jobseeker_id, content=content)
+        # dao.NotificationDAO.queue(user_id=applications.jobseeker_id, content=content)
         # for app in applications.items:
-        #     dao.NotificationDAO.create(user_id=app.jobseeker_id, content=content)
+        #     dao.NotificationDAO.queue(user_id=app.jobseeker_id, content=content)
 
     return render_template("job_detail.html", jobDetail=job, jobs=jobs, cvs=cvs, RoleEnum=RoleEnum,
                            applies=applications, now = datetime.utcnow())
 
 
-@app.route("/api/apply/<int:job_id>", methods=["POST"])
 @login_required
 def apply_job(job_id):
     if current_user.role == RoleEnum.JOBSEEKER:
@@ -434,6 +444,8 @@ def apply_job(job_id):
         cv_obj = CV.query.get(cv)
         if not cv_obj or cv_obj.resume.user_id != current_user.id:
             return jsonify({"message": "Invalid CV"}), 400
+        if not cv_obj.file_path:
+            return jsonify({"message": "Your CV is still being uploaded, please try again shortly"}), 400
 
         job = Job.query.get(job_id)
         if not job or job.status != JobStatusEnum.POSTED:
@@ -447,19 +459,27 @@ def apply_job(job_id):
                                   job_id=job.id)
         db.session.add(applycation)
         db.session.commit()
-        print(applycation)
+        log.info("application submitted", application_id=applycation.id, job_id=job.id)
 
         recruiter_id = job.company.user_id
         content = f"{current_user.username} has just applied for your job: {job.title}"
-        dao.NotificationDAO.create(user_id=current_user.id, content=content)
-        dao.NotificationDAO.create(user_id=recruiter_id, content=content)
+        dao.NotificationDAO.queue(user_id=current_user.id, content=content)
+        dao.NotificationDAO.queue(user_id=recruiter_id, content=content)
+        db.session.commit()
 
         return jsonify({"message": "You have successfully applied"}), 200
     else:
         return jsonify({"message": "You are not a job seeker!"}), 403
 
 
-@app.route("/applications")
+def parse_date_arg(value):
+    """'YYYY-MM-DD' từ query string -> datetime, sai định dạng hoặc rỗng thì bỏ qua (None)."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d") if value else None
+    except ValueError:
+        return None
+
+
 @login_required
 def application():
     page = max(1, int(request.args.get("page", 1)))
@@ -470,33 +490,25 @@ def application():
         if status == "All" or status == "Choose Status":
             status = None
         applies = dao.load_applications_for_user(current_user, page=page, per_page=per_page, status=status)
-        list_interview = []
-        for a in applies:
-            interview = dao.get_interview(a.id)
-            if interview:
-                list_interview.append(interview)
-        interview_map = {i.application_id: i for i in list_interview}
         return render_template("applications.html", title="Applications",
-                               subtitle="List of your applications", applies=applies, interview_map=interview_map)
+                               subtitle="List of your applications", applies=applies,
+                               interview_map=dao.get_interview_map(applies.items))
     elif current_user.role == RoleEnum.RECRUITER:
         if status == "All" or status == "Choose Status":
             status = None
-        applies = dao.load_applications_for_company(current_user.id, page=page, per_page=per_page, status=status)
-        list_interview = []
-        for a in applies:
-            interview = dao.get_interview(a.id)
-            if interview:
-                list_interview.append(interview)
-        interview_map = {i.application_id: i for i in list_interview}
-        print("interview_map", interview_map)
+        applied_from = parse_date_arg(request.args.get("applied_from"))
+        applied_to = parse_date_arg(request.args.get("applied_to"))
+        applies = dao.load_applications_for_company(current_user.id, page=page, per_page=per_page, status=status,
+                                                    applied_from=applied_from,
+                                                    applied_to=applied_to + timedelta(days=1) if applied_to else None)
         return render_template("applications.html", title="Applications",
-                               subtitle="List of applications for your company", applies=applies, interview_map=interview_map)
+                               subtitle="List of applications for your company", applies=applies,
+                               interview_map=dao.get_interview_map(applies.items))
     return render_template("applications.html", title="Applications",
                            subtitle="List of applications for your company")
 
 
 # Recruiter
-@app.route('/job-posting', methods=['GET', 'POST'])
 def job_posting():
     title = "Job Posting"
     subtitle = "Post your job here"
@@ -506,14 +518,12 @@ def job_posting():
     company = dao.load_company_by_id(current_user.id)
     # if not company:
     #     return jsonify({"message": "You don't have a company yet"})
-    print("company id", company.id)
-    jobs = dao.load_jobs(company_id=company.id, page=page, per_page=page_size, status=None)
+    jobs = dao.load_jobs(company_id=company.id, page=page, per_page=page_size, status=None,
+                         after=request.args.get('after'), before=request.args.get('before'))
 
     cates = dao.load_cate()
 
-    print(dao.load_company_by_id(current_user.id).id)
     employment_enum = EmploymentEnum
-    print(employment_enum.FULLTIME)
     if request.method == 'POST':
         title = request.form.get('title')
         description = request.form.get('description')
@@ -524,7 +534,6 @@ def job_posting():
         status = request.form.get('status')
         expiration_date = request.form.get('expiration_date')
         category_id = request.form.get('category_id')
-        print(category_id)
 
         if 'save_draft' in request.form:
             status = 'DRAFT'
@@ -543,10 +552,11 @@ def job_posting():
             expiration_date=expiration_date,
             category_id=category_id,
         )
-        dao.NotificationDAO.create(
+        dao.NotificationDAO.queue(
             user_id=current_user.id,
             content=f"You successfully {'saved a draft' if status == 'DRAFT' else 'posted'} the job: {title}"
         )
+        db.session.commit()
 
         flash('Job was successfully added', 'success')
         return redirect(url_for('job_posting'))
@@ -559,7 +569,6 @@ def job_posting():
                            employment_types=employment_enum, )
 
 
-@app.route("/api/verified-apply/<int:apply_id>", methods=['POST'])
 @login_required
 def verified_apply(apply_id):
     if not current_user.is_recruiter:
@@ -568,23 +577,23 @@ def verified_apply(apply_id):
     if not apply:
         return jsonify({"error": "Application not found"}), 404
     if apply.job.company_id != current_user.company.id:
-        print(apply.job.company_id, current_user.company.id, current_user.username)
+        log.warning("verified_apply denied: not job owner", application_id=apply_id, user_id=current_user.id)
         return jsonify({"message": "You are not the owner of this job posting"}), 403
 
     med = request.form.get("med")
     if med == "Confirm":
         apply.status = ApplicationStatusEnum.CONFIRMED
         # con xu ly tao lich phong van
-        dao.NotificationDAO.create(user_id=apply.cv.resume.user_id,
-                                   content=f"Your application for {apply.job.title} has been confirmed.")
+        dao.NotificationDAO.queue(user_id=apply.cv.resume.user_id,
+                                  content=f"Your application for {apply.job.title} has been confirmed.")
     elif med == "Reject":
         apply.status = ApplicationStatusEnum.REJECTED
-        dao.NotificationDAO.create(user_id=apply.cv.resume.user_id,
-                                   content=f"Your application for {apply.job.title} has been rejected.")
+        dao.NotificationDAO.queue(user_id=apply.cv.resume.user_id,
+                                  content=f"Your application for {apply.job.title} has been rejected.")
     elif med == "Accept":
         apply.status = ApplicationStatusEnum.ACCEPTED
-        dao.NotificationDAO.create(user_id=apply.cv.resume.user_id,
-                                   content=f"Your application for {apply.job.title} has been accepted.")
+        dao.NotificationDAO.queue(user_id=apply.cv.resume.user_id,
+                                  content=f"Your application for {apply.job.title} has been accepted.")
     else:
         return jsonify({"error": "Invalid value for med"}), 400
 
@@ -592,26 +601,27 @@ def verified_apply(apply_id):
     return jsonify({"message": f"{med} successfully"}), 200
 
 
-@app.route("/notifications")
 @login_required
 def notifications():
     title = 'Your notifications'
     subtitle = 'All your important updates appear here'
+    page = int(request.args.get('page', 1))
+    per_page = 5
 
+    pagination = dao.NotificationDAO.get_all(current_user.id, page=page, per_page=per_page)
     return render_template('notifications.html',
                            title=title,
                            subtitle=subtitle,
-                           )
+                           notifications=pagination.items,
+                           notification_pagination=pagination)
 
 
-@app.route('/notifications/mark-all-read', methods=['POST'])
 @login_required
 def mark_all_notifications_read():
     dao.NotificationDAO.mark_all_as_read(current_user.id)
     return redirect(request.referrer or url_for('index'))
 
 
-@app.route('/notifications/<int:notification_id>')
 @login_required
 def notification_detail(notification_id):
     notification = dao.NotificationDAO.get_by_id(notification_id)
@@ -625,13 +635,11 @@ def notification_detail(notification_id):
     return render_template('notification_detail.html', notification=notification)
 
 
-@app.route('/notification/<int:notification_id>/mark-read', methods=['POST'])
 def mark_notification_as_read(notification_id):
     # Example: mark notification as read in the database
     dao.NotificationDAO.mark_as_read(notification_id, current_user.id)
     return redirect(url_for('notifications'))
 
-@app.route("/verified", methods=['get'])
 @login_required
 def verified_user():
     if current_user.role != RoleEnum.ADMIN:
@@ -640,11 +648,9 @@ def verified_user():
         page = int(request.args.get("page", 1))
         per_page = 2
         listRecruiter = dao.get_list_recruiter(page=page, per_page=per_page)
-        print("listUser", listRecruiter)
         return render_template("verified_user.html", title="Verified recruiter", subtitle="Welcome admin", listRecruiter=listRecruiter)
 
 
-@app.route("/api/verified-recruiter/<int:user_id>", methods=["POST"])
 @login_required
 def verified_recruiter(user_id):
     if current_user.role != RoleEnum.ADMIN:
@@ -653,17 +659,15 @@ def verified_recruiter(user_id):
     if user.role == RoleEnum.RECRUITER:
         user.is_recruiter = True
         db.session.commit()
-        print("success")
+        log.info("recruiter verified", user_id=user_id, admin_id=current_user.id)
         return jsonify({"status": 200})
     else:
         return jsonify({"status": 400})
 
 
 
-@app.route("/api/cancel-recruiter/<int:user_id>", methods=["POST"])
 @login_required
 def cancel_recruiter(user_id):
-    print("hello")
     if current_user.role != RoleEnum.ADMIN:
         jsonify({"status": 403})
     user = dao.get_user_by_id(user_id)
@@ -675,54 +679,78 @@ def cancel_recruiter(user_id):
         return jsonify({"status": 400})
 
 
-@app.route("/webhook", methods=["POST"])
 def webhook():
     try:
         data = request.get_json(force=True)
-        print("Webhook received:", data)
+        ref = data.get("ref")
 
-        if data.get("ref") == "refs/heads/develop":
-            print("Đúng nhánh develop - bắt đầu xử lý...")
+        if ref == "refs/heads/develop":
+            log.info("webhook received for develop", ref=ref)
             # Gọi script hoặc hành động CICD ở đây
         else:
-            print("Webhook không đến từ nhánh develop")
+            log.info("webhook ignored: not develop", ref=ref)
 
         return "", 204
 
     except Exception as e:
-        print("Error in webhook:", str(e))
+        log.exception("webhook failed")
         return jsonify({"error": str(e)}), 400
 
 
 # Chat
-@app.route('/conversations')
 @login_required
 def conversations_list():
-    convs = dao.get_conversations_for_user(current_user.id)
     return render_template('conversations.html',
                            title="Your Conversations",
                            subtitle="All your chats are here",
-                           conversations=convs)
+                           conversations=dao.get_conversation_summaries(current_user.id))
 
 
-@app.route('/chat/<int:conversation_id>')
 @login_required
 def chat_room(conversation_id):
     """Vào phòng chat cụ thể."""
-    conv = dao.get_conversation_by_id(conversation_id)
-    if not conv or current_user not in conv.users:
+    conv = dao.get_conversation_by_id(conversation_id, with_users=True)
+    if not conv or current_user.id not in {user.id for user in conv.users}:
         abort(403) # Không có quyền truy cập
 
     # Lấy người nhận (người còn lại trong cuộc trò chuyện)
     recipient = next((user for user in conv.users if user.id != current_user.id), None)
+    # Đánh dấu đã đọc trước khi tải lịch sử: commit sau khi tải sẽ expire mọi tin nhắn
+    # và message_to_dict() phải load lại từng tin một
+    dao.mark_conversation_read(conv.id, current_user.id)
+    history = dao.get_messages(conv.id)
 
     return render_template('chat.html',
                            conversation=conv,
                            recipient=recipient,
-                           messages=conv.messages)
+                           messages=[message_to_dict(msg) for msg in reversed(history.items)],
+                           older_cursor=history.next_cursor if history.has_next else None)
+
+
+@login_required
+def conversation_messages(conversation_id):
+    """Tải tin nhắn cũ hơn cursor ?before=... (dùng khi cuộn lên đầu khung chat)."""
+    if not dao.is_conversation_member(conversation_id, current_user.id):
+        return jsonify({"message": "You are not in this conversation"}), 403
+
+    history = dao.get_messages(conversation_id, before=request.args.get('before'))
+    return jsonify({
+        "messages": [message_to_dict(msg) for msg in reversed(history.items)],
+        "older_cursor": history.next_cursor if history.has_next else None
+    })
+
+
+def message_to_dict(msg, sender=None):
+    sender = sender or msg.sender
+    return {
+        "id": msg.id,
+        "sender": sender.username,
+        "avatar": sender.avatar,
+        "message": msg.content,
+        "timestamp": msg.timestamp.strftime("%b %d, %I:%M %p")
+    }
 
 
-@app.route('/start_chat/<int:recruiter_id>')
 @login_required
 def start_chat(recruiter_id):
     if current_user.role != RoleEnum.JOBSEEKER:
@@ -741,37 +769,42 @@ def start_chat(recruiter_id):
         flash("Could not start conversation.", "danger")
         return redirect(url_for('index'))
 
-@socketio.on('join')
+def on_connect():
+    # Room riêng của user để nhận thông báo realtime (xem dao.NotificationDAO.user_room)
+    if current_user.is_authenticated:
+        join_room(dao.NotificationDAO.user_room(current_user.id))
+
+
 def on_join(data):
     room = data['room']
+    if str(room).startswith(dao.NotificationDAO.user_room('')):
+        # Không cho vào room thông báo của user khác
+        return
     join_room(room)
-    print(f"{current_user.username} has entered the room: {room}")
+    log.debug("joined room", user_id=current_user.id, room=room)
 
 
-@socketio.on('message')
 def handle_message(data):
     room = data['room']
     content = data['data']
     conversation_id = int(room)
 
-    # Lưu tin nhắn vào DB
-    msg = dao.add_message(
-        conversation_id=conversation_id,
-        sender_id=current_user.id,
-        content=content
-    )
+    if current_app.config.get('CHAT_WRITE_BEHIND'):
+        # Gửi trước, lưu DB theo batch ở thread nền (xem app/chat_writer.py)
+        msg = get_writer().submit(conversation_id=conversation_id, sender_id=current_user.id, content=content)
+    else:
+        # Lưu tin nhắn vào DB
+        msg = dao.add_message(
+            conversation_id=conversation_id,
+            sender_id=current_user.id,
+            content=content
+        )
 
     # Gửi tin nhắn đến tất cả client trong phòng
-    response = {
-        "sender": current_user.username,
-        "avatar": current_user.avatar,
-        "message": msg.content,
-        "timestamp": msg.timestamp.strftime("%b %d, %I:%M %p")
-    }
-    send(response, to=room)
-    print(f"Message from {current_user.username} to room {room}: {content}")
+    send(message_to_dict(msg, sender=current_user), to=room)
+    metrics.current().socketio_messages.labels('message').inc()
+    log.debug("message sent", user_id=current_user.id, room=room, message_id=msg.id)
 
-@app.route('/recruiter/start_chat/<int:jobseeker_id>')
 @login_required
 def recruiter_start_chat(jobseeker_id):
     if current_user.role != RoleEnum.RECRUITER:
@@ -787,7 +820,8 @@ def recruiter_start_chat(jobseeker_id):
     if conv:
         # Tạo thông báo cho người tìm việc
         notification_content = f"Recruiter '{current_user.username}' from '{current_user.company.company_name}' has started a conversation with you."
-        dao.NotificationDAO.create(user_id=jobseeker_id, content=notification_content)
+        dao.NotificationDAO.queue(user_id=jobseeker_id, content=notification_content)
+        db.session.commit()
 
         return redirect(url_for('chat_room', conversation_id=conv.id))
     else:
@@ -799,35 +833,26 @@ def recruiter_start_chat(jobseeker_id):
     Thống kê số lượng don ung tuyen cua cong ty theo thang quy nam
     
 """
-@app.route("/stats-by-recruiter")
 @login_required
 def stats_by_recruiter():
     if current_user.role != RoleEnum.RECRUITER:
         return jsonify({"status": 403})
-    check_company = dao.is_company_exist(current_user.id)
-    if not check_company:
+    company = dao.load_company_by_id(current_user.id)
+    if not company:
         return jsonify({"message": "Bạn chưa có công ty hoặc không phải chủ công ty này", "status": 404})
-    company=dao.load_company_by_id(current_user.id)
-    stats = dao.stats_job_by_recruiter(company_id=company.id)
-    stats = [dict(row._mapping) for row in stats]
-    print("stats", stats)
-
-    list_job = dao.get_job_by_company_id(company_id=company.id, year=datetime.now().year)
-    if not list_job:
+    year = datetime.now().year
+    # Đọc bộ đếm đã tổng hợp sẵn (app/stats.py): số query không phụ thuộc số job
+    stats = dao.stats_job_by_recruiter(company_id=company.id, year=year)
+    stats_application = dao.stats_application_by_recruiter(company_id=company.id, year=year)
+    if not stats_application:
         return jsonify({"message": "Bạn chưa có job nào", "status": 400})
 
-    stats_application = []
-    for job in list_job:
-        stats_application.append(dao.stats_application_by_recruiter(job_id=job))
-
-    print("application-stats",stats_application)
     title = 'statistics and reports'
     subtitle = ''
     return render_template("recruiter/stats_for_recruiter.html", title=title,
-                           subtitle=subtitle, stats=stats, stast_applies = stats_application, year=datetime.now().year)
+                           subtitle=subtitle, stats=stats, stast_applies = stats_application, year=year)
 
 
-@app.route("/api/<int:application_id>/create_link", methods=["post"])
 @login_required
 def create_interview_link(application_id):
     if current_user.role != RoleEnum.RECRUITER:
@@ -843,37 +868,96 @@ def create_interview_link(application_id):
     application=dao.get_application_by_id(application_id)
     job = application.job
     user = dao.get_user_by_application_id(application_id)
-    print("email", user.id, user.email)
     link = dao.create_interview_link(application_id, interview_date)
     title="Xác nhận trúng tuyển"
     content=(f"Chúc mừng {user.username} đã trúng tuyển cho công việc {job.title} \n Bạn vui lòng tham gia phỏng vấn vào thời gian và địa điểm theo thông báo bên dưới \n"
              f"Thời gian: {interview_date} \n"
              f"Link phỏng vấn online (vòng 1): {link}")
     send_email(user.email, title, content)
+    db.session.commit()
     return jsonify({"link": link, "status": 201})
 
 
 
-@app.route("/<int:user_id>/interview")
 def list_interview(user_id):
     list_interview = dao.get_list_interview_by_owner_company(user_id)
     title="List interview for your company"
     return render_template("list_interview.html", title=title , list_interview=list_interview )
 
 
-@app.route("/company/<int:company_id>")
 def view_company(company_id):
     company = dao.get_company_by_id(company_id=company_id)
     return render_template("view_company.html", title="View Company", company=company)
 
 
-@app.route("/settings")
 def setting():
     return render_template("setting.html", title="Setting")
 
+
+def register_routes(app):
+    """Gắn route và context processor của module này vào `app` (gọi từ create_app)."""
+    app.context_processor(inject_user)
+    app.context_processor(inject_enums)
+    app.context_processor(inject_pagination)
+    app.context_processor(inject_notifications)
+    app.add_template_global(job_cursor)
+
+    app.add_url_rule('/', 'index', index)
+    app.add_url_rule('/profile', 'profile_process', profile_process, methods=['POST', 'GET'])
+    app.add_url_rule('/delete_cv', 'delete_cv', delete_cv, methods=['POST'])
+    app.add_url_rule('/register', 'register_process', register_process, methods=['GET', 'POST'])
+    app.add_url_rule('/login', 'login_process', login_process, methods=['GET', 'POST'])
+    app.add_url_rule('/login/google', 'google_initiate_login', google_initiate_login)
+    app.add_url_rule('/login/google/callback', 'google_authorized', google_authorized)
+    app.add_url_rule('/logout', 'logout_process', logout_process)
+    app.add_url_rule('/about', 'about', about)
+    app.add_url_rule('/contact', 'contact', contact)
+    app.add_url_rule('/jobs', 'job', job, methods=['GET'])
+    app.add_url_rule('/job-detail/<int:job_id>', 'job_detail', job_detail, methods=['get'])
+    app.add_url_rule('/api/apply/<int:job_id>', 'apply_job', apply_job, methods=['POST'])
+    app.add_url_rule('/applications', 'application', application)
+    app.add_url_rule('/job-posting', 'job_posting', job_posting, methods=['GET', 'POST'])
+    app.add_url_rule('/api/verified-apply/<int:apply_id>', 'verified_apply', verified_apply, methods=['POST'])
+    app.add_url_rule('/notifications', 'notifications', notifications)
+    app.add_url_rule('/notifications/mark-all-read',
+                     'mark_all_notifications_read', mark_all_notifications_read, methods=['POST'])
+    app.add_url_rule('/notifications/<int:notification_id>', 'notification_detail', notification_detail)
+    app.add_url_rule('/notification/<int:notification_id>/mark-read',
+                     'mark_notification_as_read', mark_notification_as_read, methods=['POST'])
+    app.add_url_rule('/verified', 'verified_user', verified_user, methods=['get'])
+    app.add_url_rule('/api/verified-recruiter/<int:user_id>',
+                     'verified_recruiter', verified_recruiter, methods=['POST'])
+    app.add_url_rule('/api/cancel-recruiter/<int:user_id>', 'cancel_recruiter', cancel_recruiter, methods=['POST'])
+    app.add_url_rule('/webhook', 'webhook', webhook, methods=['POST'])
+    app.add_url_rule('/conversations', 'conversations_list', conversations_list)
+    app.add_url_rule('/chat/<int:conversation_id>', 'chat_room', chat_room)
+    app.add_url_rule('/api/conversations/<int:conversation_id>/messages',
+                     'conversation_messages', conversation_messages)
+    app.add_url_rule('/start_chat/<int:recruiter_id>', 'start_chat', start_chat)
+    app.add_url_rule('/recruiter/start_chat/<int:jobseeker_id>', 'recruiter_start_chat', recruiter_start_chat)
+    app.add_url_rule('/stats-by-recruiter', 'stats_by_recruiter', stats_by_recruiter)
+    app.add_url_rule('/api/<int:application_id>/create_link',
+                     'create_interview_link', create_interview_link, methods=['post'])
+    app.add_url_rule('/<int:user_id>/interview', 'list_interview', list_interview)
+    app.add_url_rule('/company/<int:company_id>', 'view_company', view_company)
+    app.add_url_rule('/settings', 'setting', setting)
+
+
+# Socket.IO handler: đăng ký một lần cho instance socketio dùng chung (lúc import module này),
+# socketio.init_app của mỗi app tự gắn chúng vào server của app đó
+socketio.on_event('connect', on_connect)
+socketio.on_event('join', on_join)
+socketio.on_event('message', handle_message)
+
+
+# App mặc định: flask --app app.index, WSGI server (app.index:app), test
+app = create_app()
+
 if __name__ == '__main__':
     with app.app_context():
-        from app.admin import *
+        from app.admin import init_admin
+
+        init_admin(app)
 
         socketio.run(app, host="0.0.0.0", port=5000, debug=True)
         # app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,213 @@
+"""
+    Đếm lượt xem job (Job.view_count) mà không UPDATE dòng job ở mỗi request.
+
+    job_detail gọi record_view(): lượt xem được cộng vào một store, một thread nền cứ
+    JOB_VIEW_FLUSH_SECONDS giây lấy hết bộ đếm ra và ghi bằng MỘT câu UPDATE:
+        UPDATE job SET view_count = view_count + CASE id WHEN 1 THEN 5 WHEN 7 THEN 2 END
+        WHERE id IN (1, 7)
+
+    JOB_VIEW_STORE:
+        memory://            bộ đếm trong process (mặc định), mỗi worker tự flush phần của mình
+        redis://host:6379/0  HINCRBY vào một hash dùng chung, worker nào flush cũng lấy hết
+    JOB_VIEW_DEDUP: mỗi session chỉ tính một lượt xem cho một job (nhớ JOB_VIEW_DEDUP_SIZE job gần nhất).
+
+    Ghi DB lỗi thì bộ đếm được trả lại store để lần flush sau ghi tiếp. Process bị kill -9
+    với store memory:// mất tối đa lượt xem của một chu kỳ flush.
+"""
+import atexit
+import threading
+import uuid
+from collections import Counter
+
+from flask import current_app, has_app_context, session
+from sqlalchemy import case, event, func, update
+
+from app import db
+from app.logger import get_logger
+from app.models import Job
+
+log = get_logger(__name__)
+
+_SESSION_KEY = 'viewed_jobs'
+
+
+class MemoryViewStore:
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def incr(self, job_id, n=1):
+        with self._lock:
+            self._counts[job_id] += n
+
+    def drain(self):
+        """Lấy và xóa toàn bộ bộ đếm hiện có."""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        return dict(counts)
+
+    def restore(self, counts):
+        with self._lock:
+            self._counts.update(counts)
+
+
+class RedisViewStore:
+    def __init__(self, url, key='recruitment:job_views'):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._errors = redis.RedisError
+        self._response_error = redis.ResponseError
+        self.key = key
+
+    def incr(self, job_id, n=1):
+        try:
+            self._redis.hincrby(self.key, job_id, n)
+        except self._errors:
+            # Mất một lượt xem còn hơn làm hỏng trang chi tiết job
+            log.warning("job view incr failed", job_id=job_id, exc_info=True)
+
+    def drain(self):
+        # RENAME là nguyên tử: HINCRBY tới sau đó đi vào hash mới, không bị mất hay đếm hai lần
+        flushing = f"{self.key}:flush:{uuid.uuid4().hex}"
+        try:
+            self._redis.rename(self.key, flushing)
+        except self._response_error:
+            return {}  # chưa có lượt xem nào
+        pipe = self._redis.pipeline()
+        pipe.hgetall(flushing)
+        pipe.delete(flushing)
+        counts, _ = pipe.execute()
+        return {int(job_id): int(n) for job_id, n in counts.items()}
+
+    def restore(self, counts):
+        pipe = self._redis.pipeline()
+        for job_id, n in counts.items():
+            pipe.hincrby(self.key, job_id, n)
+        pipe.execute()
+
+
+def create_store(url):
+    if url.startswith('redis://') or url.startswith('rediss://'):
+        return RedisViewStore(url)
+    return MemoryViewStore()
+
+
+def apply_view_counts(counts):
+    """Cộng {job_id: số lượt xem} vào job.view_count bằng một câu UPDATE."""
+    if not counts:
+        return 0
+    stmt = update(Job) \
+        .where(Job.id.in_(list(counts))) \
+        .values(view_count=func.coalesce(Job.view_count, 0) + case(counts, value=Job.id, else_=0)) \
+        .execution_options(synchronize_session=False)
+    try:
+        db.session.execute(stmt)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(counts)
+
+
+class JobViewCounter:
+    """Gom lượt xem vào store, thread nền flush định kỳ (giống MailWorker: Event + chu kỳ chờ)."""
+
+    def __init__(self, store, flush_interval=10, app=None):
+        # Flush mở app context của app này (mặc định: app đang chạy khi tạo bộ đếm)
+        self.app = app if app is not None else current_app._get_current_object()
+        self.store = store
+        self.flush_interval = flush_interval
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def record(self, job_id):
+        self.store.incr(job_id)
+
+    def flush(self):
+        """Ghi toàn bộ lượt xem đang chờ xuống DB. Trả về số job được cập nhật."""
+        counts = self.store.drain()
+        if not counts:
+            return 0
+        try:
+            with self.app.app_context():
+                updated = apply_view_counts(counts)
+        except Exception:
+            self.store.restore(counts)
+            log.exception("job view flush failed, will retry", jobs=len(counts))
+            return 0
+        log.info("job views flushed", jobs=updated, views=sum(counts.values()))
+        return updated
+
+    def start(self):
+        if not self.running:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='job-view-flusher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Dừng thread và flush lần cuối."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                # Store (Redis) lỗi: thử lại ở chu kỳ sau, không để thread chết
+                log.exception("job view flush failed")
+
+
+_counter_lock = threading.Lock()
+_counters = []  # mọi bộ đếm đã tạo trong process, để ghi nốt khi tắt
+
+
+def get_counter():
+    """
+    Bộ đếm của app hiện tại (app.extensions['job_views']); thread flush không chạy khi
+    TESTING (test tự gọi flush()).
+    """
+    with _counter_lock:
+        counter = current_app.extensions.get('job_views')
+        if counter is None:
+            counter = JobViewCounter(create_store(current_app.config.get('JOB_VIEW_STORE', 'memory://')),
+                                     flush_interval=current_app.config.get('JOB_VIEW_FLUSH_SECONDS', 10))
+            current_app.extensions['job_views'] = counter
+            _counters.append(counter)
+        if not current_app.testing:
+            counter.start()
+        return counter
+
+
+def record_view(job_id):
+    """Tính một lượt xem cho job; trả về False nếu session này đã xem job đó rồi."""
+    if current_app.config.get('JOB_VIEW_DEDUP', True):
+        viewed = session.get(_SESSION_KEY, [])
+        if job_id in viewed:
+            return False
+        session[_SESSION_KEY] = (viewed + [job_id])[-current_app.config.get('JOB_VIEW_DEDUP_SIZE', 50):]
+    get_counter().record(job_id)
+    return True
+
+
+@event.listens_for(db.metadata, 'after_drop')
+def _discard_after_drop(target, connection, **kw):
+    # Schema bị xóa (db.drop_all): lượt xem đang chờ không còn job nào để ghi vào
+    counter = current_app.extensions.get('job_views') if has_app_context() else None
+    if counter is not None:
+        counter.store.drain()
+
+
+@atexit.register
+def shutdown_counter():
+    for counter in _counters:
+        counter.stop()
@@ -0,0 +1,100 @@
+"""
+    Logging có cấu trúc (key=value) cho app.
+
+    log = get_logger(__name__)
+    log.info("job added", job_id=job.id, company_id=company_id)
+
+    Cấu hình:
+        LOG_LEVEL:            mức log của logger 'app' (mặc định WARNING, nên debug/info trên hot path không tốn gì)
+        SQL_LOG_SAMPLE_RATE:  tỉ lệ (0..1) câu SQL được log kèm thời gian chạy, 0 = tắt
+        SQL_SLOW_QUERY_MS:    luôn log câu SQL chạy lâu hơn ngưỡng này (ms), None = tắt
+"""
+import logging
+import random
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+ROOT_LOGGER = 'app'
+
+
+class KeyValueFormatter(logging.Formatter):
+    def format(self, record):
+        line = f"{self.formatTime(record)} level={record.levelname} logger={record.name} msg={record.getMessage()!r}"
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value!r}" for key, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """Nhận các field dạng keyword: log.info("msg", user_id=1). Field chỉ được xử lý khi level đang bật."""
+    _RESERVED = ('exc_info', 'stack_info', 'stacklevel', 'extra')
+
+    def process(self, msg, kwargs):
+        fields = {k: kwargs.pop(k) for k in list(kwargs) if k not in self._RESERVED}
+        kwargs.setdefault('extra', {})['fields'] = fields
+        return msg, kwargs
+
+
+def get_logger(name):
+    return StructuredLogger(logging.getLogger(name), {})
+
+
+sql_log = get_logger(f'{ROOT_LOGGER}.sql')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _make_after_cursor_execute(sample_rate, slow_ms):
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('query_start_time')
+        if not starts:
+            return
+        duration_ms = (time.perf_counter() - starts.pop()) * 1000
+        if slow_ms is not None and duration_ms >= slow_ms:
+            sql_log.warning("slow query", duration_ms=round(duration_ms, 2), statement=statement)
+        elif sample_rate and random.random() < sample_rate:
+            sql_log.info("query", duration_ms=round(duration_ms, 2), statement=statement)
+    return _after_cursor_execute
+
+
+_query_listeners = []
+
+
+def init_query_logging(sample_rate=0.0, slow_ms=None):
+    """Gắn event timing vào mọi Engine; không gắn gì nếu cả hai đều tắt. Gọi lại để đổi cấu hình."""
+    disable_query_logging()
+    if not sample_rate and slow_ms is None:
+        return
+    # Query được chọn mẫu luôn được ghi, không phụ thuộc LOG_LEVEL của app
+    logging.getLogger(sql_log.logger.name).setLevel(logging.INFO)
+    _query_listeners.extend([
+        ('before_cursor_execute', _before_cursor_execute),
+        ('after_cursor_execute', _make_after_cursor_execute(sample_rate, slow_ms)),
+    ])
+    for identifier, fn in _query_listeners:
+        event.listen(Engine, identifier, fn)
+
+
+def disable_query_logging():
+    while _query_listeners:
+        identifier, fn = _query_listeners.pop()
+        event.remove(Engine, identifier, fn)
+
+
+def init_logging(app):
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(app.config.get('LOG_LEVEL', 'WARNING'))
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(KeyValueFormatter())
+        logger.addHandler(handler)
+        logger.propagate = False
+
+    init_query_logging(app.config.get('SQL_LOG_SAMPLE_RATE', 0.0), app.config.get('SQL_SLOW_QUERY_MS'))
@@ -0,0 +1,233 @@
+"""
+    Gửi email qua outbox (bảng outbox_mail) thay vì gọi mail.send() trong request.
+
+    queue_mail() chỉ thêm dòng outbox vào session (flush) rồi trả về ngay; dòng được lưu cùng
+    commit của request (rollback thì email cũng bị hủy), sau commit worker được đánh thức.
+    Worker lấy các email đến hạn theo batch, gửi cả batch qua một kết nối SMTP, lỗi thì thử
+    lại với backoff lũy thừa. Ở chế độ 'thread' worker start ở request đầu tiên, nên email
+    còn PENDING từ trước khi restart cũng được gửi.
+
+    Cấu hình:
+        MAIL_OUTBOX_WORKER:        'thread'   thread nền trong web process (mặc định)
+                                   'external' chạy process riêng: python -m app.mailer
+        MAIL_OUTBOX_BATCH_SIZE:    số email mỗi batch / mỗi kết nối SMTP
+        MAIL_OUTBOX_POLL_SECONDS:  chu kỳ quét outbox khi rảnh
+        MAIL_MAX_ATTEMPTS:         quá số lần này thì chuyển FAILED
+        MAIL_RETRY_BASE_SECONDS:   lần thử lại thứ n chờ base * 2^(n-1) giây (tối đa 1 giờ)
+        MAIL_SENDING_LEASE_SECONDS: email SENDING quá hạn này (worker chết giữa chừng) được gửi lại
+
+    Gửi ít nhất một lần: worker chết sau khi SMTP đã nhận nhưng trước khi commit thì email
+    đó sẽ được gửi lại khi hết lease.
+"""
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from flask_mail import Message as MailMessage
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db, mail
+from app.logger import get_logger
+from app.models import OutboxMail, MailStatusEnum
+
+log = get_logger(__name__)
+
+MAX_RETRY_DELAY = 3600
+
+# Khóa trong Session.info: transaction hiện tại có email mới
+_MAIL_QUEUED = 'mail_queued'
+
+
+def queue_mail(recipients, subject, body, sender=None):
+    """
+    Đưa email vào outbox (mỗi người nhận một dòng), chưa commit: người gọi commit cùng phần
+    còn lại của request. Trả về danh sách OutboxMail.
+    """
+    if isinstance(recipients, str):
+        recipients = [recipients]
+    rows = [OutboxMail(recipient=recipient, sender=sender, subject=subject, body=body,
+                       status=MailStatusEnum.PENDING, next_attempt_at=datetime.now())
+            for recipient in recipients if recipient]
+    if not rows:
+        return []
+    db.session.add_all(rows)
+    db.session.flush()
+    db.session.info[_MAIL_QUEUED] = True
+    return rows
+
+
+def _uses_thread_worker():
+    return current_app.config.get('MAIL_OUTBOX_WORKER', 'thread') == 'thread' and not current_app.testing
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_worker_on_commit(session):
+    # Chỉ đánh thức sau commit: worker (session khác) mới thấy các dòng vừa thêm
+    if session.info.pop(_MAIL_QUEUED, False) and has_app_context() and _uses_thread_worker():
+        get_worker().wake()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_mail_queued(session):
+    session.info.pop(_MAIL_QUEUED, None)
+
+
+def retry_delay(attempts):
+    base = current_app.config.get('MAIL_RETRY_BASE_SECONDS', 30)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY))
+
+
+def _claim(batch_size):
+    """Giữ chỗ các email đến hạn (PENDING hoặc SENDING đã hết lease) cho worker này."""
+    now = datetime.now()
+    rows = OutboxMail.query \
+        .filter(OutboxMail.status.in_([MailStatusEnum.PENDING, MailStatusEnum.SENDING]),
+                OutboxMail.next_attempt_at <= now) \
+        .order_by(OutboxMail.next_attempt_at, OutboxMail.id) \
+        .limit(batch_size) \
+        .with_for_update(skip_locked=True) \
+        .all()
+    lease = now + timedelta(seconds=current_app.config.get('MAIL_SENDING_LEASE_SECONDS', 300))
+    for row in rows:
+        row.status = MailStatusEnum.SENDING
+        row.next_attempt_at = lease
+    db.session.commit()
+    return rows
+
+
+def _mark_sent(row):
+    row.status = MailStatusEnum.SENT
+    row.attempts += 1
+    row.sent_date = datetime.now()
+    row.last_error = None
+
+
+def _mark_failed_attempt(row, error):
+    row.attempts += 1
+    row.last_error = f"{type(error).__name__}: {error}"[:1000]
+    if row.attempts >= current_app.config.get('MAIL_MAX_ATTEMPTS', 5):
+        row.status = MailStatusEnum.FAILED
+        log.error("mail failed permanently", outbox_id=row.id, attempts=row.attempts, error=row.last_error)
+    else:
+        row.status = MailStatusEnum.PENDING
+        row.next_attempt_at = datetime.now() + retry_delay(row.attempts)
+        log.warning("mail send failed, will retry", outbox_id=row.id, attempts=row.attempts, error=row.last_error)
+
+
+def _to_message(row):
+    return MailMessage(subject=row.subject, recipients=[row.recipient], body=row.body,
+                       sender=row.sender or current_app.config.get('MAIL_DEFAULT_SENDER'))
+
+
+def dispatch_pending(batch_size=None):
+    """Gửi một batch email đến hạn qua một kết nối SMTP. Trả về số email được lấy ra xử lý."""
+    rows = _claim(batch_size or current_app.config.get('MAIL_OUTBOX_BATCH_SIZE', 50))
+    if not rows:
+        return 0
+
+    try:
+        with mail.connect() as connection:
+            for row in rows:
+                try:
+                    connection.send(_to_message(row))
+                    _mark_sent(row)
+                except Exception as e:
+                    # Lỗi riêng email này (địa chỉ sai, server từ chối...): các email khác vẫn gửi tiếp
+                    _mark_failed_attempt(row, e)
+    except Exception as e:
+        # Không kết nối được (hoặc lỗi khi đóng kết nối): email nào chưa gửi thì thử lại sau
+        for row in rows:
+            if row.status == MailStatusEnum.SENDING:
+                _mark_failed_attempt(row, e)
+    db.session.commit()
+
+    log.info("mail batch dispatched", size=len(rows),
+             sent=sum(1 for row in rows if row.status == MailStatusEnum.SENT))
+    return len(rows)
+
+
+class MailWorker:
+    """Thread nền quét outbox; queue_mail() gọi wake() để gửi ngay không chờ tới chu kỳ sau."""
+
+    def __init__(self, poll_interval=10, batch_size=50, app=None):
+        # Thread gửi mở app context của app này (mặc định: app đang chạy khi tạo worker)
+        self.app = app if app is not None else current_app._get_current_object()
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self.run, name='mail-outbox-worker', daemon=True)
+            self._thread.start()
+        return self
+
+    def wake(self):
+        self._wakeup.set()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run(self):
+        while not self._stopping.is_set():
+            processed = 0
+            try:
+                with self.app.app_context():
+                    processed = dispatch_pending(self.batch_size)
+            except Exception:
+                log.exception("mail outbox dispatch failed")
+            if processed < self.batch_size:
+                # Hết việc: chờ email mới hoặc tới chu kỳ quét kế tiếp
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    """Worker của app hiện tại (app.extensions['mail_outbox']), start ở lần gọi đầu tiên."""
+    with _worker_lock:
+        worker = current_app.extensions.get('mail_outbox')
+        if worker is None:
+            worker = current_app.extensions['mail_outbox'] = MailWorker(
+                poll_interval=current_app.config.get('MAIL_OUTBOX_POLL_SECONDS', 10),
+                batch_size=current_app.config.get('MAIL_OUTBOX_BATCH_SIZE', 50))
+        return worker.start()
+
+
+def _start_worker():
+    worker = current_app.extensions.get('mail_outbox')
+    if worker is not None and worker.running:
+        return
+    if _uses_thread_worker():
+        get_worker()
+
+
+def init_app(app):
+    app.before_request(_start_worker)
+
+
+if __name__ == '__main__':
+    from app import create_app
+
+    app = create_app()
+    worker = MailWorker(poll_interval=app.config.get('MAIL_OUTBOX_POLL_SECONDS', 10),
+                        batch_size=app.config.get('MAIL_OUTBOX_BATCH_SIZE', 50), app=app)
+    log.warning("mail outbox worker started")
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        pass
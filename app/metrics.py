@@ -0,0 +1,406 @@
+"""
+    Metric cho Prometheus: GET /metrics (text exposition format 0.0.4).
+
+    Counter/Histogram ghi không cần lock: mỗi thread cộng vào mảng riêng của nó (shard, giữ
+    trong threading.local), /metrics cộng các shard lại khi scrape. Lock chỉ dùng khi một thread
+    ghi lần đầu vào một metric/bộ label và khi thread kết thúc (shard được gộp vào tổng đã
+    retire). Dưới eventlet threading.local là theo greenlet nên mỗi greenlet một shard.
+    Gauge tính lúc scrape từ một hàm (pool, số client Socket.IO, outbox...).
+
+    Mỗi app có bộ metric riêng (AppMetrics trong app.extensions['metrics'], lấy bằng current()):
+        http_requests_total{endpoint,method,status}
+        http_request_duration_seconds{endpoint,method}      histogram
+        db_pool_checkout_seconds{engine}                    histogram thời gian lấy connection từ pool
+        db_pool_checkout_timeouts_total{engine}
+        db_pool_connections{engine,state}                   checked_out / idle / overflow
+        socketio_messages_total{event}                      chat 'message', 'notification' đã gửi
+        socketio_connected_clients, socketio_rooms          của worker này
+        mail_outbox_messages{status}                        số email trong outbox theo trạng thái
+        chat_write_queue_depth                              tin nhắn chờ ghi DB (CHAT_WRITE_BEHIND)
+
+    /metrics tắt mặc định (404), bật bằng METRICS=1. Nếu đặt METRICS_TOKEN thì Prometheus phải
+    gửi header "Authorization: Bearer <token>" (cấu hình authorization của scrape job), sai/thiếu
+    token trả 404 như khi tắt. Không đặt token thì chỉ mở cho mạng nội bộ (chặn ở reverse proxy).
+
+    Thời gian chờ pool: SQLAlchemy không có event trước khi lấy connection (checkout/connect chỉ
+    chạy sau khi đã có connection), nên instrument_pool bọc Pool._do_get của các pool kiểu
+    QueuePool. Pool khác (hoặc phiên bản SQLAlchemy không còn _do_get) thì bỏ qua metric này và
+    ghi một cảnh báo, app vẫn chạy bình thường.
+"""
+import hmac
+import itertools
+import math
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+from flask import Response, abort, current_app, g, request
+from sqlalchemy import exc, func
+from sqlalchemy.pool import QueuePool
+
+from app import db, socketio
+from app.logger import get_logger
+from app.models import OutboxMail, MailStatusEnum
+
+log = get_logger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+class _ShardHolder:
+    """Giữ shard trong threading.local; bị thu hồi khi thread kết thúc (kích hoạt retire)."""
+    __slots__ = ('shard', '__weakref__')
+
+    def __init__(self, shard):
+        self.shard = shard
+
+
+class _Shards:
+    """
+    Mảng `width` số của từng thread; chỉ thread sở hữu ghi vào mảng của nó. Khi thread
+    kết thúc, shard được cộng vào `_retired` và bỏ khỏi danh sách, nên server tạo thread
+    mới cho mỗi request không làm danh sách tăng mãi và thread mới không nhận số của thread cũ.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self._shards = {}  # id -> shard của thread còn sống
+        self._retired = [0] * width
+        self._ids = itertools.count()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def local(self):
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            holder = self._local.holder = _ShardHolder([0] * self.width)
+            shard_id = next(self._ids)
+            with self._lock:
+                self._shards[shard_id] = holder.shard
+            weakref.finalize(holder, self._retire, shard_id)
+        return holder.shard
+
+    def _retire(self, shard_id):
+        with self._lock:
+            shard = self._shards.pop(shard_id, None)
+            if shard is not None:
+                for i, value in enumerate(shard):
+                    self._retired[i] += value
+
+    def totals(self):
+        with self._lock:
+            totals = list(self._retired)
+            shards = list(self._shards.values())
+        for shard in shards:
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.append(self)
+
+    def labels(self, *values):
+        """labels('jobs', 'GET'): metric con theo giá trị label (đúng thứ tự labelnames)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, values, extra=()):
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+    def _items(self):
+        if not self.labelnames:
+            return [((), self.labels())]
+        return sorted(self._children.items())
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for values, child in self._items():
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount=1):
+        self._shards.local()[0] += amount
+
+    @property
+    def value(self):
+        return self._shards.totals()[0]
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _render_child(self, values, child):
+        return [f'{self.name}{self._label_text(values)} {_number(child.value)}']
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # [bucket 0..n-1, +Inf, sum]
+        self._shards = _Shards(len(buckets) + 2)
+
+    def observe(self, value):
+        shard = self._shards.local()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self):
+        """(số quan sát tích lũy theo từng bucket gồm +Inf, tổng giá trị)."""
+        totals = self._shards.totals()
+        cumulative, running = [], 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, totals[-1]
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def _render_child(self, values, child):
+        cumulative, total = child.snapshot()
+        lines = [f'{self.name}_bucket{self._label_text(values, [("le", _number(bound))])} {count}'
+                 for bound, count in zip(self.buckets + (math.inf,), cumulative)]
+        lines.append(f'{self.name}_sum{self._label_text(values)} {_number(total)}')
+        lines.append(f'{self.name}_count{self._label_text(values)} {cumulative[-1]}')
+        return lines
+
+
+class Gauge(_Metric):
+    """Giá trị đọc lúc scrape: fn() trả về một số, hoặc {tuple giá trị label: số} khi có labelnames."""
+    type = 'gauge'
+
+    def __init__(self, name, documentation, fn, labelnames=(), registry=None):
+        self.fn = fn
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _items(self):
+        value = self.fn()
+        if not self.labelnames:
+            return [] if value is None else [((), value)]
+        return sorted(value.items())
+
+    def _render_child(self, values, value):
+        return [f'{self.name}{self._label_text(values)} {_number(value)}']
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _number(value):
+    return '+Inf' if value == math.inf else str(value)
+
+
+def render(registry=None):
+    """Trang /metrics cho các metric trong registry (mặc định của app hiện tại)."""
+    if registry is None:
+        registry = current().registry
+    lines = []
+    for metric in registry:
+        try:
+            lines.extend(metric.render())
+        except Exception:
+            # Một gauge lỗi (DB không kết nối được...) không làm hỏng cả trang metric
+            log.warning("metric collection failed", metric=metric.name, exc_info=True)
+    return '\n'.join(lines) + '\n'
+
+
+class AppMetrics:
+    """Các metric của một app; gauge đọc app hiện tại (db, socketio, app.extensions) lúc scrape."""
+
+    def __init__(self):
+        self.registry = registry = []
+        # HTTP
+        self.http_requests = Counter('http_requests_total', 'HTTP requests by endpoint, method and status.',
+                                     ('endpoint', 'method', 'status'), registry=registry)
+        self.http_latency = Histogram('http_request_duration_seconds', 'HTTP request latency by endpoint.',
+                                      ('endpoint', 'method'), registry=registry)
+        # Connection pool
+        self.pool_wait = Histogram('db_pool_checkout_seconds', 'Time spent getting a connection from the pool.',
+                                   ('engine',), buckets=POOL_WAIT_BUCKETS, registry=registry)
+        self.pool_timeouts = Counter('db_pool_checkout_timeouts_total', 'Pool checkouts that timed out.',
+                                     ('engine',), registry=registry)
+        Gauge('db_pool_connections', 'Pooled connections by state.', _pool_connections, ('engine', 'state'),
+              registry=registry)
+        # Socket.IO
+        self.socketio_messages = Counter('socketio_messages_total', 'Socket.IO events emitted by the app.',
+                                         ('event',), registry=registry)
+        Gauge('socketio_connected_clients', 'Socket.IO clients connected to this worker.', _socketio_clients,
+              registry=registry)
+        Gauge('socketio_rooms', 'Socket.IO rooms on this worker, excluding per-client rooms.', _socketio_room_count,
+              registry=registry)
+        # Hàng đợi
+        Gauge('mail_outbox_messages', 'Emails in the outbox by status.', _mail_outbox, ('status',),
+              registry=registry)
+        Gauge('chat_write_queue_depth', 'Chat messages waiting for the write-behind writer.', _chat_write_queue,
+              registry=registry)
+
+
+def current():
+    """AppMetrics của app hiện tại."""
+    return current_app.extensions['metrics']
+
+
+# ---------- HTTP ----------
+def _start_timer():
+    g.metrics_started = time.perf_counter()
+    _instrument_pools()
+
+
+def _record_request(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        app_metrics = current()
+        app_metrics.http_latency.labels(endpoint, request.method).observe(time.perf_counter() - started)
+        app_metrics.http_requests.labels(endpoint, request.method, str(response.status_code)).inc()
+    return response
+
+
+# ---------- Connection pool ----------
+def _engines():
+    return {key or 'default': engine for key, engine in db.engines.items()}
+
+
+def instrument_pool(pool, name, app_metrics=None):
+    """
+    Đo thời gian lấy connection (Pool._do_get) của một pool vào app_metrics (mặc định của app
+    hiện tại); pool mới sau dispose() được đo lại. Trả về False nếu không đo được pool này
+    (xem docstring module).
+    """
+    if getattr(pool, '_metrics_instrumented', False):
+        return True
+    pool._metrics_instrumented = True
+    if not isinstance(pool, QueuePool) or not callable(getattr(pool, '_do_get', None)):
+        log.warning("pool checkout metrics not supported", engine=name, pool=type(pool).__name__)
+        return False
+    app_metrics = app_metrics or current()
+    do_get, wait, timeouts = pool._do_get, app_metrics.pool_wait.labels(name), app_metrics.pool_timeouts.labels(name)
+
+    def _timed_do_get(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return do_get(*args, **kwargs)
+        except exc.TimeoutError:
+            timeouts.inc()
+            raise
+        finally:
+            wait.observe(time.perf_counter() - started)
+
+    pool._do_get = _timed_do_get
+    return True
+
+
+def _instrument_pools():
+    for name, engine in _engines().items():
+        if not getattr(engine.pool, '_metrics_instrumented', False):
+            instrument_pool(engine.pool, name)
+
+
+def _pool_connections():
+    values = {}
+    for name, engine in _engines().items():
+        pool = engine.pool
+        if not hasattr(pool, 'checkedout'):
+            continue  # StaticPool/NullPool không có số liệu
+        values[(name, 'checked_out')] = pool.checkedout()
+        values[(name, 'idle')] = pool.checkedin()
+        values[(name, 'overflow')] = max(0, pool.overflow())
+    return values
+
+
+# ---------- Socket.IO ----------
+def _socketio_rooms():
+    rooms = getattr(socketio.server.manager, 'rooms', {}) if socketio.server else {}
+    return rooms.get('/', {})
+
+
+def _socketio_clients():
+    # Room None chứa mọi client kết nối vào namespace
+    return len(_socketio_rooms().get(None, ()))
+
+
+def _socketio_room_count():
+    # Bỏ room None và room riêng trùng sid mà mỗi client tự có
+    rooms = _socketio_rooms()
+    sids = rooms.get(None, {})
+    return sum(1 for room in rooms if room is not None and room not in sids)
+
+
+# ---------- Queues ----------
+def _mail_outbox():
+    counts = {(status.name,): 0 for status in MailStatusEnum}
+    rows = db.session.query(OutboxMail.status, func.count()).group_by(OutboxMail.status).all()
+    counts.update({(status.name,): n for status, n in rows})
+    return counts
+
+
+def _chat_write_queue():
+    writer = current_app.extensions.get('chat_writer')
+    return writer._queue.qsize() if writer is not None else 0
+
+
+def _authorized():
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        return True
+    return hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode())
+
+
+def metrics():
+    # 404 (không phải 401/403) để không lộ là endpoint có tồn tại
+    if not current_app.config.get('METRICS', False) or not _authorized():
+        abort(404)
+    return Response(render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_app(app):
+    app.extensions['metrics'] = AppMetrics()
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics)
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, ForeignKey, String, Enum, DateTime, Boolean, Text, Float
+from sqlalchemy import Column, Integer, ForeignKey, String, Enum, DateTime, Boolean, Text, Float, DDL, event, \
+    Index
 from sqlalchemy.orm import relationship, backref
-from app import db, app
+from app import db, create_app
 from datetime import datetime, timedelta
 from enum import Enum as MyEnum
 from flask_login import UserMixin
@@ -23,6 +24,11 @@ class JobStatusEnum(MyEnum):
     DELETED = "Deleted"
     EXPIRED = "Expired"
 
+class UploadStatusEnum(MyEnum):
+    PENDING = "Pending"
+    READY = "Ready"
+    FAILED = "Failed"
+
 class ApplicationStatusEnum(MyEnum):
     DRAFT = "Draft"
     PENDING = "Pending"
@@ -50,13 +56,17 @@ class User(BaseModel, UserMixin):
     email = Column(String(100), unique=True, nullable=False)
     role = Column(Enum(RoleEnum), default=RoleEnum.JOBSEEKER.value)
     avatar = Column(Text, default='https://res.cloudinary.com/dqpu49bbo/image/upload/v1748718255/avatars/ecy9awxxse7npwq2sqwj.jpg')
+    # Upload avatar ở thread nền như CV (xem app/uploads.py): avatar giữ giá trị cũ tới khi READY
+    avatar_upload_status = Column(Enum(UploadStatusEnum), default=UploadStatusEnum.READY, nullable=False)
+    avatar_upload_key = Column(String(255))
     joined_date = Column(DateTime, default=datetime.now())
     phone = Column(String(20))
     last_login = Column(DateTime)
     is_active = Column(Boolean, default=True)
     is_recruiter = Column(Boolean, default=False)
 
-    conversation = relationship("Conversation", secondary='conversation_user', lazy='subquery', backref=backref('users', lazy=True))
+    # lazy=True: chỉ load khi cần, query nào cần thì tự selectinload (xem dao.get_conversations_for_user)
+    conversation = relationship("Conversation", secondary='conversation_user', lazy=True, backref=backref('users', lazy=True))
 
 
 class Resume(BaseModel):
@@ -69,6 +79,10 @@ class Resume(BaseModel):
     linkedin_url = Column(String(255))
     user = relationship("User", backref=backref("resume", uselist=False))
 
+    __table_args__ = (
+        Index('ix_resume_user_id', 'user_id'),
+    )
+
 class Company(BaseModel):
     user_id = Column(Integer, ForeignKey('user.id'), unique=True)
     website = Column(String(255))
@@ -108,7 +122,14 @@ class Job(BaseModel):
     company_id = Column(Integer, ForeignKey('company.id'))
     category_id = Column(Integer, ForeignKey("category.id"))
 
-
+    # Feed đơn ứng tuyển của nhà tuyển dụng: JOIN application -> job theo company_id
+    __table_args__ = (
+        Index('ix_job_company_id', 'company_id', 'id'),
+        # Sweeper chuyển job hết hạn sang EXPIRED (dao.expire_jobs)
+        Index('ix_job_status_expiration', 'status', 'expiration_date'),
+        # Danh sách job đang đăng, mới nhất trước (dao.load_jobs, keyset theo created_date)
+        Index('ix_job_status_created', 'status', 'created_date'),
+    )
 
     def __str__(self):
         return self.title
@@ -116,7 +137,11 @@ class Job(BaseModel):
 class CV(BaseModel):
     __tablename__ = 'cv'
     title = Column(String(100), nullable=False)
-    file_path = Column(String(255), nullable=False)
+    # None khi file đang được upload lần đầu (xem app/uploads.py)
+    file_path = Column(String(255))
+    upload_status = Column(Enum(UploadStatusEnum), default=UploadStatusEnum.READY, nullable=False)
+    # Key của lần upload đang chờ; chỉ lần upload mới nhất được ghi vào file_path
+    upload_key = Column(String(255))
     is_default = Column(Boolean, default=False)
     created_date = Column(DateTime, default=datetime.now())
     updated_date = Column(DateTime)
@@ -124,6 +149,10 @@ class CV(BaseModel):
 
     resume = relationship("Resume", backref="cvs", lazy=True)
 
+    __table_args__ = (
+        Index('ix_cv_resume_id', 'resume_id'),
+    )
+
 class Application(BaseModel):
     cover_letter = Column(Text)
     status = Column(Enum(ApplicationStatusEnum), default=ApplicationStatusEnum.DRAFT.value)
@@ -136,19 +165,29 @@ class Application(BaseModel):
     cv = relationship("CV", backref="applications", lazy=True)
     job = relationship("Job", backref="applications", lazy=True)
 
+    __table_args__ = (
+        Index('ix_application_job_status_applied', 'job_id', 'status', 'applied_date'),
+        # Đơn ứng tuyển của người tìm việc: application JOIN cv
+        Index('ix_application_cv_id', 'cv_id'),
+    )
+
 class Interview(BaseModel):
     dateTime = Column(DateTime)
     url = Column(String(255))
     application_id = Column(Integer, ForeignKey('application.id'))
     application = relationship("Application", backref="interviews", lazy=True)
 
+    __table_args__ = (
+        Index('ix_interview_application_id', 'application_id'),
+    )
+
 # ========== CHAT ==========
 class Conversation(BaseModel):
     created_date = Column(DateTime, default=datetime.now())
 
 class Message(BaseModel):
     content = Column(Text)
-    timestamp = Column(DateTime, default=datetime.now())
+    timestamp = Column(DateTime, default=datetime.now)
     is_read = Column(Boolean, default=False)
     conversation_id = Column(Integer, ForeignKey('conversation.id'))
     sender_id = Column(Integer, ForeignKey('user.id'))
@@ -156,11 +195,19 @@ class Message(BaseModel):
     conversation = relationship("Conversation", backref="messages", lazy=True)
     sender = relationship("User", backref="messages", lazy=True)
 
+    # Lịch sử chat theo keyset (timestamp, id) trong một cuộc trò chuyện (dao.get_messages)
+    __table_args__ = (
+        Index('ix_message_conversation_timestamp', 'conversation_id', 'timestamp'),
+    )
+
 # ========== MIDDLE TABLE ==========
 conversation_user = db.Table(
     'conversation_user',
     Column('user_id', Integer, ForeignKey('user.id')),
-    Column('conversation_id', Integer, ForeignKey('conversation.id'))
+    Column('conversation_id', Integer, ForeignKey('conversation.id')),
+    # Hộp thư của user và kiểm tra thành viên / danh sách người trong cuộc trò chuyện
+    Index('ix_conversation_user_user', 'user_id', 'conversation_id'),
+    Index('ix_conversation_user_conversation', 'conversation_id', 'user_id'),
 )
 
 tag_job = db.Table("tag_job",
@@ -176,6 +223,62 @@ class Notification(BaseModel):
 
     user = relationship("User", backref="notifications", lazy=True)
 
+    # Badge/số chưa đọc và danh sách thông báo mới nhất của user
+    __table_args__ = (
+        Index('ix_notification_user_read_created', 'user_id', 'is_read', 'created_date'),
+    )
+
+
+# ========== MAIL OUTBOX ==========
+class MailStatusEnum(MyEnum):
+    PENDING = "Pending"
+    SENDING = "Sending"
+    SENT = "Sent"
+    FAILED = "Failed"
+
+
+class OutboxMail(BaseModel):
+    """Email chờ gửi, được worker trong app/mailer.py gửi theo batch."""
+    recipient = Column(String(255), nullable=False)
+    sender = Column(String(255))
+    subject = Column(String(255))
+    body = Column(Text)
+    status = Column(Enum(MailStatusEnum), default=MailStatusEnum.PENDING, nullable=False, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text)
+    # Lần gửi kế tiếp; khi đang SENDING là hạn "giữ chỗ" của worker
+    next_attempt_at = Column(DateTime, default=datetime.now, nullable=False, index=True)
+    created_date = Column(DateTime, default=datetime.now)
+    sent_date = Column(DateTime)
+
+
+# ========== THỐNG KÊ ==========
+# Bộ đếm được cập nhật cùng transaction với thao tác ghi Job/Application (xem app/stats.py),
+# dashboard nhà tuyển dụng chỉ đọc các bảng này.
+class CompanyMonthStat(db.Model):
+    """Số job đăng và số đơn ứng tuyển (theo trạng thái) của một công ty trong một tháng."""
+    __tablename__ = 'company_month_stat'
+    company_id = Column(Integer, ForeignKey('company.id', ondelete='CASCADE'), primary_key=True)
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    month = Column(Integer, primary_key=True, autoincrement=False)
+    jobs = Column(Integer, default=0, nullable=False)
+    applications = Column(Integer, default=0, nullable=False)
+    pending = Column(Integer, default=0, nullable=False)
+    confirmed = Column(Integer, default=0, nullable=False)
+    accepted = Column(Integer, default=0, nullable=False)
+    rejected = Column(Integer, default=0, nullable=False)
+
+
+class JobStat(db.Model):
+    """Số đơn ứng tuyển (theo trạng thái) của một job."""
+    __tablename__ = 'job_stat'
+    job_id = Column(Integer, ForeignKey('job.id', ondelete='CASCADE'), primary_key=True, autoincrement=False)
+    applications = Column(Integer, default=0, nullable=False)
+    pending = Column(Integer, default=0, nullable=False)
+    confirmed = Column(Integer, default=0, nullable=False)
+    accepted = Column(Integer, default=0, nullable=False)
+    rejected = Column(Integer, default=0, nullable=False)
+
 
 class Tag(BaseModel):
     name = Column(String(50))
@@ -184,9 +287,52 @@ class Tag(BaseModel):
         return self.name
 
 
+# ========== FULL-TEXT SEARCH ==========
+# SQLite: bảng ảo FTS5 job_fts (rowid = job.id) được đồng bộ bằng trigger,
+# nên mọi worker/process đều thấy cùng một chỉ mục.
+# MySQL: chỉ mục FULLTEXT trên job(title, description, requirements) và tag(name).
+# DDL dưới đây chạy khi db.create_all(); DB có sẵn nhận các chỉ mục này từ migration 3f6d2a8e9c41.
+event.listen(Job.__table__, 'after_create', DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS job_fts USING fts5(title, description, requirements, tags)"
+).execute_if(dialect='sqlite'))
+
+event.listen(Job.__table__, 'before_drop', DDL(
+    "DROP TABLE IF EXISTS job_fts"
+).execute_if(dialect='sqlite'))
+
+_JOB_FTS_TAGS = ("(SELECT group_concat(tag.name, ' ') FROM tag JOIN tag_job ON tag_job.tag_id = tag.id "
+                 "WHERE tag_job.job_id = {job_id})")
+
+for _ddl in (
+        "CREATE TRIGGER IF NOT EXISTS job_fts_ai AFTER INSERT ON job BEGIN "
+        "INSERT INTO job_fts(rowid, title, description, requirements, tags) "
+        "VALUES (new.id, new.title, new.description, new.requirements, ''); END",
+        "CREATE TRIGGER IF NOT EXISTS job_fts_au AFTER UPDATE OF title, description, requirements ON job BEGIN "
+        "UPDATE job_fts SET title = new.title, description = new.description, requirements = new.requirements "
+        "WHERE rowid = new.id; END",
+        "CREATE TRIGGER IF NOT EXISTS job_fts_ad AFTER DELETE ON job BEGIN "
+        "DELETE FROM job_fts WHERE rowid = old.id; END",
+        "CREATE TRIGGER IF NOT EXISTS job_fts_tag_ai AFTER INSERT ON tag_job BEGIN "
+        "UPDATE job_fts SET tags = " + _JOB_FTS_TAGS.format(job_id='new.job_id') + " WHERE rowid = new.job_id; END",
+        "CREATE TRIGGER IF NOT EXISTS job_fts_tag_ad AFTER DELETE ON tag_job BEGIN "
+        "UPDATE job_fts SET tags = " + _JOB_FTS_TAGS.format(job_id='old.job_id') + " WHERE rowid = old.job_id; END",
+        "CREATE TRIGGER IF NOT EXISTS job_fts_tag_au AFTER UPDATE OF name ON tag BEGIN "
+        "UPDATE job_fts SET tags = " + _JOB_FTS_TAGS.format(job_id='job_fts.rowid') +
+        " WHERE rowid IN (SELECT job_id FROM tag_job WHERE tag_id = new.id); END",
+):
+    event.listen(tag_job, 'after_create', DDL(_ddl).execute_if(dialect='sqlite'))
+
+event.listen(Job.__table__, 'after_create', DDL(
+    "ALTER TABLE job ADD FULLTEXT INDEX ft_job_search (title, description, requirements)"
+).execute_if(dialect='mysql'))
+
+event.listen(Tag.__table__, 'after_create', DDL(
+    "ALTER TABLE tag ADD FULLTEXT INDEX ft_tag_name (name)"
+).execute_if(dialect='mysql'))
+
 
 if __name__ == '__main__':
-    with app.app_context():
+    with create_app().app_context():
         db.drop_all()
         db.create_all()
         # c1 = Category(name="Front-end")
@@ -0,0 +1,309 @@
+"""
+    Phân trang cho các DAO.
+
+    Page-number pagination: paginate() thay cho Query.paginate() và cho phép chọn cách
+    tính tổng số dòng (COUNT):
+        - 'exact':    COUNT(*) mỗi lần như Flask-SQLAlchemy
+        - 'skip':     không COUNT, lấy dư 1 dòng để biết còn trang sau hay không
+        - 'cached':   COUNT rồi cache theo count_key trong PAGINATION_COUNT_TTL giây
+        - 'estimate': dùng số dòng ước lượng của EXPLAIN (MySQL) khi bảng lớn hơn
+                      PAGINATION_ESTIMATE_THRESHOLD, nhỏ hơn thì COUNT chính xác; kết quả
+                      (ước lượng hoặc COUNT) cũng được cache như 'cached', nên EXPLAIN và
+                      COUNT chạy nhiều nhất một lần mỗi TTL cho mỗi câu query
+    Key cache mặc định bắt đầu bằng tên bảng của entity chính, nên ghi qua ORM vào bảng đó
+    xóa luôn cache của app này trong process.
+
+    Keyset (cursor) pagination: thay vì OFFSET + COUNT(*), trang kế tiếp được lấy bằng
+    điều kiện WHERE (created_date, id) < (cursor) trên chính cột sắp xếp, nên trang
+    sâu cũng nhanh như trang đầu. Cursor là chuỗi base64 mờ (opaque) để đặt vào URL.
+"""
+import base64
+import binascii
+import threading
+import time
+from datetime import datetime
+
+from itertools import chain
+
+from flask import current_app, has_app_context
+from flask_sqlalchemy.pagination import QueryPagination
+from sqlalchemy import and_, or_, event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app import db
+
+COUNT_EXACT = 'exact'
+COUNT_SKIP = 'skip'
+COUNT_CACHED = 'cached'
+COUNT_ESTIMATE = 'estimate'
+
+_count_cache_lock = threading.Lock()
+_COUNT_CACHE_MAX_SIZE = 10000
+
+
+class explain(Executable, ClauseElement):
+    """EXPLAIN <statement>, đi qua compiler của SQLAlchemy nên bind param được xử lý đúng."""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(explain)
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN " + compiler.process(element.statement, **kw)
+
+
+@compiles(explain, 'sqlite')
+def _compile_explain_sqlite(element, compiler, **kw):
+    # EXPLAIN của SQLite trả về bytecode, plan nằm ở EXPLAIN QUERY PLAN
+    return "EXPLAIN QUERY PLAN " + compiler.process(element.statement, **kw)
+
+
+def _count_cache():
+    """Cache COUNT của app hiện tại: count_key -> (expires_at, total); {} nếu ngoài app context."""
+    if not has_app_context():
+        return {}
+    counts = current_app.extensions.get('pagination_counts')
+    if counts is None:
+        counts = current_app.extensions.setdefault('pagination_counts', {})
+    return counts
+
+
+def _cache_get(key):
+    entry = _count_cache().get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
+def _cache_set(key, total):
+    counts = _count_cache()
+    with _count_cache_lock:
+        if len(counts) >= _COUNT_CACHE_MAX_SIZE:
+            now = time.monotonic()
+            for k in [k for k, (expires, _) in counts.items() if expires <= now]:
+                del counts[k]
+            if len(counts) >= _COUNT_CACHE_MAX_SIZE:
+                counts.clear()
+        counts[key] = (time.monotonic() + current_app.config.get('PAGINATION_COUNT_TTL', 30), total)
+
+
+def invalidate_count(*key_prefix):
+    """Xóa các count đã cache có key (tuple) bắt đầu bằng key_prefix, ví dụ ('notification', user_id)."""
+    counts = _count_cache()
+    n = len(key_prefix)
+    with _count_cache_lock:
+        for key in [k for k in counts if isinstance(k, tuple) and k[:n] == key_prefix]:
+            del counts[key]
+
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_flushed_tables(session, flush_context):
+    # count_key bắt đầu bằng tên bảng nên mọi insert/update/delete qua ORM trên bảng đó
+    # đều làm mất cache của app này; các process khác dựa vào TTL.
+    # query.update()/delete() hàng loạt không qua flush, DAO phải tự gọi invalidate_count.
+    if not _count_cache():
+        return
+    tables = {obj.__table__.name for obj in chain(session.new, session.dirty, session.deleted)
+              if hasattr(obj, '__table__')}
+    for table in tables:
+        invalidate_count(table)
+
+
+@event.listens_for(db.metadata, 'after_drop')
+def _clear_count_cache(target, connection, **kw):
+    with _count_cache_lock:
+        _count_cache().clear()
+
+
+def estimate_count(query):
+    """Số dòng ước lượng từ EXPLAIN (chỉ MySQL), None nếu DB không hỗ trợ."""
+    session = query.session
+    if session.get_bind().dialect.name != 'mysql':
+        return None
+    plan = session.execute(explain(query.order_by(None).statement)).mappings().first()
+    if not plan or plan.get('rows') is None:
+        return None
+    return int(plan['rows'] * float(plan.get('filtered') or 100) / 100)
+
+
+class CountingPagination(QueryPagination):
+    """QueryPagination với chiến lược COUNT tùy chọn (xem đầu file)."""
+
+    def __init__(self, count=True, **kwargs):
+        self._has_more = None
+        super().__init__(count=count and kwargs.get('count_mode') != COUNT_SKIP, **kwargs)
+
+    @property
+    def total_is_estimate(self):
+        return getattr(self, '_estimated', False)
+
+    def _query_items(self):
+        if self._query_args.get('count_mode') != COUNT_SKIP:
+            return super()._query_items()
+        query = self._query_args['query']
+        items = query.limit(self.per_page + 1).offset(self._query_offset).all()
+        self._has_more = len(items) > self.per_page
+        return items[:self.per_page]
+
+    def _query_count(self):
+        mode = self._query_args.get('count_mode')
+        query = self._query_args['query']
+
+        if mode == COUNT_CACHED:
+            key = self._query_args.get('count_key') or _statement_key(query)
+            total = _cache_get(key)
+            if total is None:
+                total = super()._query_count()
+                _cache_set(key, total)
+            return total
+
+        if mode == COUNT_ESTIMATE:
+            key = (self._query_args.get('count_key') or _statement_key(query)) + (COUNT_ESTIMATE,)
+            cached = _cache_get(key)
+            if cached is None:
+                cached = self._estimate_or_count(query)
+                _cache_set(key, cached)
+            total, self._estimated = cached
+            return total
+
+        return super()._query_count()
+
+    def _estimate_or_count(self, query):
+        """(tổng, có phải ước lượng không): EXPLAIN trước, dưới ngưỡng thì COUNT chính xác."""
+        estimated = estimate_count(query)
+        if estimated is not None and estimated >= current_app.config.get('PAGINATION_ESTIMATE_THRESHOLD', 10000):
+            return estimated, True
+        return super()._query_count(), False
+
+    @property
+    def pages(self):
+        if self.total is None and self._has_more is not None:
+            # Không biết tổng: chỉ biết tới trang hiện tại (+1 nếu còn)
+            return self.page + 1 if self._has_more else self.page
+        return super().pages
+
+    @property
+    def has_next(self):
+        if self.total is None and self._has_more is not None:
+            return self._has_more
+        return super().has_next
+
+
+def _statement_key(query):
+    compiled = query.statement.compile()
+    key = (str(compiled), repr(sorted(compiled.params.items(), key=lambda item: item[0])))
+    # Tên bảng đứng đầu để invalidate_count(<bảng>) / ghi qua flush xóa được key này
+    entity = query.column_descriptions[0].get('entity') if query.column_descriptions else None
+    table = getattr(getattr(entity, '__table__', None), 'name', None)
+    return (table,) + key if table else key
+
+
+def paginate(query, page=None, per_page=None, count=COUNT_EXACT, count_key=None, error_out=False):
+    """
+    Thay cho query.paginate(...) với chiến lược COUNT tùy chọn.
+
+    :param count: 'exact' | 'skip' | 'cached' | 'estimate'
+    :param count_key: Key cache cho 'cached', là tuple bắt đầu bằng tên bảng để tự mất cache
+                      khi bảng thay đổi, ví dụ ('notification', user_id). Mặc định lấy theo câu SQL.
+    :return: CountingPagination (cùng giao diện với Pagination của Flask-SQLAlchemy)
+    """
+    return CountingPagination(query=query, page=page, per_page=per_page, error_out=error_out,
+                              count_mode=count, count_key=count_key)
+
+
+def encode_cursor(created_date, id):
+    raw = f"{created_date.isoformat() if created_date else ''}|{id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Trả về (created_date, id) hoặc None nếu cursor không hợp lệ."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        created, id = raw.rsplit('|', 1)
+        return (datetime.fromisoformat(created) if created else None), int(id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+class KeysetPagination:
+    is_keyset = True
+
+    def __init__(self, items, per_page, has_next, has_prev, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _older_than(date_column, id_column, created, id):
+    """Điều kiện "đứng sau (created, id)" trong thứ tự giảm dần, NULL nhỏ nhất (nằm cuối danh sách)."""
+    if created is None:
+        return and_(date_column.is_(None), id_column < id)
+    return or_(date_column < created, and_(date_column == created, id_column < id), date_column.is_(None))
+
+
+def _newer_than(date_column, id_column, created, id):
+    """Điều kiện "đứng trước (created, id)" trong thứ tự giảm dần, NULL nhỏ nhất (nằm cuối danh sách)."""
+    if created is None:
+        return or_(date_column.isnot(None), and_(date_column.is_(None), id_column > id))
+    return or_(date_column > created, and_(date_column == created, id_column > id))
+
+
+def keyset_paginate(query, date_column, id_column, per_page=10, after=None, before=None):
+    """
+    Phân trang theo keyset trên (date_column, id_column) giảm dần.
+    Dòng có date_column NULL nằm cuối (như ORDER BY ... DESC của MySQL/SQLite, NULL nhỏ nhất),
+    cursor của chúng (ngày rỗng) được xử lý bằng nhánh IS NULL riêng thay vì so sánh với NULL.
+
+    :param query: Query đã lọc, chưa order_by (order_by cũ sẽ bị bỏ).
+    :param after: Cursor của phần tử cuối trang trước -> lấy trang cũ hơn.
+    :param before: Cursor của phần tử đầu trang sau -> lấy trang mới hơn.
+    :return: KeysetPagination
+    """
+    per_page = per_page or 10
+    after, before = decode_cursor(after), decode_cursor(before)
+    query = query.order_by(None)
+
+    if before:
+        query = query.filter(_newer_than(date_column, id_column, *before)) \
+            .order_by(date_column.asc(), id_column.asc())
+    else:
+        if after:
+            query = query.filter(_older_than(date_column, id_column, *after))
+        query = query.order_by(date_column.desc(), id_column.desc())
+
+    # Lấy dư 1 phần tử để biết còn trang hay không, không cần COUNT(*)
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if before:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, after is not None
+
+    date_key, id_key = date_column.key, id_column.key
+    return KeysetPagination(
+        items=rows,
+        per_page=per_page,
+        has_next=has_next and bool(rows),
+        has_prev=has_prev and bool(rows),
+        next_cursor=encode_cursor(getattr(rows[-1], date_key), getattr(rows[-1], id_key)) if rows else None,
+        prev_cursor=encode_cursor(getattr(rows[0], date_key), getattr(rows[0], id_key)) if rows else None
+    )
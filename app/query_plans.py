@@ -0,0 +1,83 @@
+"""
+    Kiểm tra query plan: query nóng trong dao.py không được quét toàn bộ bảng.
+
+        query_plan(statement)     các dòng plan của một statement (pagination.explain)
+        full_scans(plan, dialect) các bảng bị full scan trong plan:
+            SQLite  EXPLAIN QUERY PLAN, dòng "SCAN <bảng>" không dùng index
+            MySQL   EXPLAIN, dòng có type = 'ALL'
+        full_scans_in(fn)         chạy fn() (ví dụ một hàm DAO), EXPLAIN mọi câu SELECT nó gửi
+                                  xuống DB, trả về {sql: [bảng bị full scan]}
+
+    tests/test_query_plans.py dùng full_scans_in() cho các hot path; chạy trên DB của app
+    (DATABASE_URL). MySQL chỉ chọn index khi có thống kê thật: kiểm tra trên bản sao dữ liệu
+    đã ANALYZE TABLE, bảng vài dòng thì optimizer thường chọn ALL.
+"""
+import re
+
+from sqlalchemy import event
+
+from app import db
+from app.pagination import explain
+
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: AS (\w+))?$')
+_ALIAS_SUFFIX = re.compile(r'_\d+$')
+
+
+def query_plan(statement, session=None):
+    session = session or db.session
+    return [dict(row) for row in session.execute(explain(statement)).mappings()]
+
+
+def _table_name(name):
+    # Alias SQLAlchemy tự đặt (job_1, anon_1...): quy về bảng gốc, bỏ qua subquery
+    tables = db.metadata.tables
+    if name in tables:
+        return name
+    base = _ALIAS_SUFFIX.sub('', name)
+    return base if base in tables else None
+
+
+def full_scans(plan, dialect):
+    """Tên các bảng bị đọc toàn bộ (không qua index) trong plan."""
+    scanned = []
+    for row in plan:
+        if dialect == 'sqlite':
+            match = _SQLITE_SCAN.match(row.get('detail') or '')
+            table = match and _table_name(match.group(1))
+        elif dialect in ('mysql', 'mariadb'):
+            table = row.get('type') == 'ALL' and _table_name(row.get('table') or '')
+        else:
+            raise NotImplementedError(f"query plan check does not support {dialect}")
+        if table:
+            scanned.append(table)
+    return scanned
+
+
+def full_scans_in(fn, *args, **kwargs):
+    """
+    Chạy fn(*args, **kwargs), ghi lại các câu SELECT nó gửi xuống DB rồi EXPLAIN từng câu
+    với đúng tham số đã dùng. Trả về {sql: [bảng bị full scan]} chỉ gồm các câu có full scan.
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        fn(*args, **kwargs)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    dialect = engine.dialect.name
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect == 'sqlite' else 'EXPLAIN '
+    scans = {}
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            plan = [dict(row) for row in connection.exec_driver_sql(prefix + statement, parameters).mappings()]
+            tables = full_scans(plan, dialect)
+            if tables:
+                scans[statement] = tables
+    return scans
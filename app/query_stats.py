@@ -0,0 +1,150 @@
+"""
+    Đếm query SQL theo request: số câu, tổng thời gian DB và câu chậm nhất.
+
+    Event before/after_cursor_execute trên mọi Engine cộng vào QueryStats của request hiện
+    tại (flask.g); ngoài request (thread nền, script) không ghi gì. capture_queries() gom
+    query của một đoạn code bất kỳ (test, benchmark).
+
+    QUERY_STATS=True:
+        - response có header X-Query-Count, X-Query-Time-Ms và Server-Timing (DevTools hiển thị)
+        - /_debug/queries trả về QUERY_STATS_HISTORY request gần nhất kèm câu SQL chậm nhất
+          (lịch sử riêng của từng app, tạo trong init_app theo config của app đó)
+          (chỉ admin, hoặc ai cũng xem được khi app.debug)
+    QUERY_STATS_WARN_COUNT: request chạy nhiều câu hơn ngưỡng này được log warning (None = tắt),
+        có tác dụng cả khi QUERY_STATS tắt.
+
+    Câu SQL (danh sách và câu chậm nhất) chỉ được giữ khi QUERY_STATS bật hoặc app.debug, và
+    trong capture_queries(); còn lại mỗi request chỉ đếm số câu và thời gian.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from flask import abort, current_app, g, has_request_context, jsonify, request
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.logger import get_logger
+from app.models import RoleEnum
+
+log = get_logger(__name__)
+
+_START_KEY = 'query_stats_start'
+_STATEMENT_MAX_LENGTH = 1000
+
+
+class QueryStats:
+    def __init__(self, keep_statements=True):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement = None
+        self.keep_statements = keep_statements
+        self.statements = []
+
+    def add(self, statement, duration_ms):
+        self.count += 1
+        self.total_ms += duration_ms
+        if duration_ms >= self.slowest_ms:
+            self.slowest_ms = duration_ms
+            if self.keep_statements:
+                self.slowest_statement = statement
+        if self.keep_statements:
+            self.statements.append(statement)
+
+    def as_dict(self):
+        return dict(count=self.count, db_ms=round(self.total_ms, 2), slowest_ms=round(self.slowest_ms, 2),
+                    slowest_statement=(self.slowest_statement or '')[:_STATEMENT_MAX_LENGTH] or None)
+
+
+_captures = threading.local()
+_history_lock = threading.Lock()
+
+
+def _active_stats():
+    stats = list(getattr(_captures, 'stack', ()))
+    if has_request_context() and g.get('query_stats') is not None:
+        stats.append(g.query_stats)
+    return stats
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get(_START_KEY)
+    if not starts:
+        return
+    duration_ms = (time.perf_counter() - starts.pop()) * 1000
+    for stats in _active_stats():
+        stats.add(statement, duration_ms)
+
+
+@contextmanager
+def capture_queries():
+    """
+    with capture_queries() as stats: ...  -> stats.count, stats.total_ms, stats.statements
+    Chỉ gom query chạy trong thread hiện tại (gồm cả request của app.test_client()).
+    """
+    stats = QueryStats()
+    stack = _captures.__dict__.setdefault('stack', [])
+    stack.append(stats)
+    try:
+        yield stats
+    finally:
+        stack.remove(stats)
+
+
+def _history():
+    return current_app.extensions['query_stats']
+
+
+def _start_query_stats():
+    g.query_stats = QueryStats(keep_statements=bool(current_app.config.get('QUERY_STATS') or current_app.debug))
+
+
+def _report_query_stats(response):
+    stats = g.get('query_stats')
+    if stats is None:
+        return response
+    warn_count = current_app.config.get('QUERY_STATS_WARN_COUNT')
+    if warn_count is not None and stats.count > warn_count:
+        log.warning("too many queries", path=request.path, endpoint=request.endpoint, **stats.as_dict())
+    if current_app.config.get('QUERY_STATS'):
+        db_ms = round(stats.total_ms, 2)
+        response.headers['X-Query-Count'] = str(stats.count)
+        response.headers['X-Query-Time-Ms'] = str(db_ms)
+        response.headers.add('Server-Timing', f'db;dur={db_ms};desc="{stats.count} queries"')
+        if request.endpoint != 'debug_queries':
+            with _history_lock:
+                _history().append(dict(method=request.method, path=request.full_path.rstrip('?'),
+                                       endpoint=request.endpoint, status=response.status_code,
+                                       time=time.strftime('%Y-%m-%d %H:%M:%S'), **stats.as_dict()))
+    return response
+
+
+def debug_queries():
+    if not current_app.config.get('QUERY_STATS'):
+        abort(404)
+    if not current_app.debug and not (current_user.is_authenticated and current_user.role == RoleEnum.ADMIN):
+        abort(403)
+    with _history_lock:
+        requests = list(reversed(_history()))
+    return jsonify(requests=requests)
+
+
+def clear_history():
+    with _history_lock:
+        _history().clear()
+
+
+def init_app(app):
+    app.extensions['query_stats'] = deque(maxlen=app.config.get('QUERY_STATS_HISTORY', 100))
+    app.before_request(_start_query_stats)
+    app.after_request(_report_query_stats)
+    app.add_url_rule('/_debug/queries', 'debug_queries', debug_queries)
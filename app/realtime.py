@@ -0,0 +1,76 @@
+"""
+    Socket.IO chạy nhiều worker process.
+
+    Mỗi worker chỉ giữ các client kết nối vào chính nó; khi có message queue, mọi
+    send()/emit() (chat room, thông báo) được publish lên một kênh pub/sub chung và
+    mỗi worker tự phát lại cho client của mình, nên client ở worker khác vẫn nhận được.
+
+    SOCKETIO_MESSAGE_QUEUE:
+        None                 chỉ trong process (mặc định, chạy 1 worker)
+        redis://host:6379/0  Redis pub/sub, dùng khi chạy nhiều worker
+        memory://            pub/sub giữa các Server trong cùng process (dùng cho test)
+    SOCKETIO_CHANNEL:        tên kênh, các worker của cùng một app phải dùng chung
+
+    Process không phục vụ websocket (worker nền, script) gửi sự kiện qua create_emitter().
+"""
+import pickle
+import queue
+import threading
+from collections import defaultdict
+
+import socketio
+
+DEFAULT_CHANNEL = 'flask-socketio'
+
+
+class MemoryPubSubManager(socketio.PubSubManager):
+    """Kênh pub/sub trong process: mỗi manager (không write_only) có một hàng đợi riêng."""
+    name = 'memory'
+
+    _subscribers = defaultdict(list)  # channel -> [queue.Queue]
+    _lock = threading.Lock()
+
+    def __init__(self, url='memory://', channel=DEFAULT_CHANNEL, write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self._queue = queue.Queue()
+        if not write_only:
+            with self._lock:
+                self._subscribers[channel].append(self._queue)
+
+    def _publish(self, data):
+        # pickle giống RedisManager để dữ liệu không bị chia sẻ tham chiếu giữa các "worker"
+        payload = pickle.dumps(data)
+        with self._lock:
+            subscribers = list(self._subscribers[self.channel])
+        for subscriber in subscribers:
+            subscriber.put(payload)
+
+    def _listen(self):
+        while True:
+            yield self._queue.get()
+
+    def close(self):
+        with self._lock:
+            if self._queue in self._subscribers[self.channel]:
+                self._subscribers[self.channel].remove(self._queue)
+
+
+def create_client_manager(url, channel=DEFAULT_CHANNEL, write_only=False):
+    """Client manager cho SocketIO(app, client_manager=...); None = mặc định trong process."""
+    if not url:
+        return None
+    if url.startswith('memory://'):
+        return MemoryPubSubManager(url, channel=channel, write_only=write_only)
+    if url.startswith(('redis://', 'rediss://')):
+        return socketio.RedisManager(url, channel=channel, write_only=write_only)
+    return socketio.KombuManager(url, channel=channel, write_only=write_only)
+
+
+def create_emitter(url, channel=DEFAULT_CHANNEL):
+    """
+    Manager chỉ ghi cho process ngoài web worker:
+        create_emitter(url).emit('notification', data, room='user_1', namespace='/')
+    """
+    if not url:
+        raise ValueError("SOCKETIO_MESSAGE_QUEUE is not configured")
+    return create_client_manager(url, channel=channel, write_only=True)
@@ -2,7 +2,8 @@
 
 import hashlib
 from datetime import datetime, timedelta
-from app import db, app
+from app import db
+from app.index import app
 from models import ( # Import tất cả các model và Enum cần thiết
     User, Resume, Company, Category, Job, CV, Application,
     Interview, Conversation, Message, Notification,
@@ -0,0 +1,139 @@
+"""
+    Chạy các tác vụ định kỳ (sweeper, rollup...) ngoài request.
+
+    SCHEDULER:
+        'thread'    thread nền trong web process, start ở request đầu tiên (mặc định).
+                    Mỗi worker một scheduler: tác vụ phải chịu được chạy song song
+                    (dao.expire_jobs dùng SELECT ... FOR UPDATE SKIP LOCKED).
+        'external'  chạy một process riêng: python -m app.scheduler
+        'off'       không chạy
+
+    Tác vụ mặc định:
+        expire_jobs      mỗi JOB_EXPIRATION_SWEEP_SECONDS giây (xem dao.expire_jobs)
+        requeue_uploads  mỗi UPLOAD_REQUEUE_SECONDS giây, lần đầu ngay khi start
+                         (xem uploads.requeue_pending_uploads)
+"""
+import threading
+import time
+
+from flask import current_app
+
+from app.logger import get_logger
+
+log = get_logger(__name__)
+
+
+class ScheduledTask:
+    def __init__(self, name, interval, fn):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.next_run = time.monotonic()
+        self.last_result = None
+
+
+class Scheduler:
+
+    def __init__(self, app=None):
+        # Tác vụ chạy trong app context của app này (mặc định: app đang chạy khi tạo scheduler)
+        self.app = app if app is not None else current_app._get_current_object()
+        self.tasks = {}
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def add(self, name, interval, fn, delay=0):
+        """Chạy fn() (trong app context) mỗi `interval` giây, lần đầu sau `delay` giây."""
+        task = ScheduledTask(name, interval, fn)
+        task.next_run = time.monotonic() + delay
+        self.tasks[name] = task
+        return task
+
+    def run_pending(self):
+        """Chạy các tác vụ đến hạn, trả về tên các tác vụ đã chạy."""
+        ran = []
+        for task in list(self.tasks.values()):
+            if task.next_run > time.monotonic():
+                continue
+            started = time.monotonic()
+            try:
+                with self.app.app_context():
+                    task.last_result = task.fn()
+            except Exception:
+                log.exception("scheduled task failed", task=task.name)
+            # Tính từ lúc bắt đầu chạy để chu kỳ không bị trôi theo thời gian chạy
+            task.next_run = started + task.interval
+            ran.append(task.name)
+        return ran
+
+    def seconds_until_next(self):
+        if not self.tasks:
+            return 60
+        return max(0.0, min(task.next_run for task in self.tasks.values()) - time.monotonic())
+
+    def start(self):
+        if not self.running:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self.run, name='scheduler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run(self):
+        while not self._stopping.is_set():
+            self.run_pending()
+            self._stopping.wait(self.seconds_until_next())
+
+
+def create_scheduler(app=None):
+    from app import dao, uploads
+
+    scheduler = Scheduler(app)
+    config = scheduler.app.config
+    # Trễ một chút để không chạy cùng lúc với lúc khởi động các worker
+    scheduler.add('expire_jobs', config.get('JOB_EXPIRATION_SWEEP_SECONDS', 300), dao.expire_jobs, delay=5)
+    scheduler.add('requeue_uploads', config.get('UPLOAD_REQUEUE_SECONDS', 300), uploads.requeue_pending_uploads)
+    return scheduler
+
+
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Scheduler của app hiện tại (app.extensions['scheduler'])."""
+    with _scheduler_lock:
+        scheduler = current_app.extensions.get('scheduler')
+        if scheduler is None:
+            scheduler = current_app.extensions['scheduler'] = create_scheduler()
+        return scheduler
+
+
+def _start_scheduler():
+    scheduler = current_app.extensions.get('scheduler')
+    if scheduler is not None and scheduler.running:
+        return
+    if current_app.config.get('SCHEDULER', 'thread') == 'thread' and not current_app.testing:
+        get_scheduler().start()
+
+
+def init_app(app):
+    app.before_request(_start_scheduler)
+
+
+if __name__ == '__main__':
+    from app import create_app
+
+    scheduler = create_scheduler(create_app())
+    log.warning("scheduler started", tasks=sorted(scheduler.tasks))
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        pass
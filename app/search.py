@@ -0,0 +1,319 @@
+"""
+    Tìm kiếm việc làm theo từ khóa (title, description, requirements, tag).
+
+    Mỗi backend nhận một query Job đã được lọc và trả về query chỉ còn các job
+    khớp từ khóa, sắp xếp theo độ liên quan. load_jobs vẫn tự paginate như cũ.
+
+    Cấu hình: app.config['SEARCH_BACKEND'] = 'auto' | 'mysql_fulltext' | 'sqlite_fts' | 'memory' | 'like'
+
+    'auto' chọn theo dialect nhưng chỉ khi chỉ mục đã có trong DB (FULLTEXT ft_job_search trên
+    MySQL, bảng job_fts trên SQLite; tạo bởi db.create_all() hoặc migration 3f6d2a8e9c41),
+    nếu chưa có thì dùng 'like'. Kết quả kiểm tra được nhớ theo engine.
+
+    Backend đã tạo và kết quả của 'auto' là của từng app (app.extensions['search']).
+"""
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from flask import current_app, has_app_context
+from sqlalchemy import Float, Integer, case, event, func, inspect, or_, select, text, union_all
+from sqlalchemy.dialects.mysql import match
+
+from app import db
+from app.logger import get_logger
+from app.models import Job, Tag, tag_job
+
+log = get_logger(__name__)
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Trọng số theo cột: title, description, requirements, tags
+FIELD_WEIGHTS = (10.0, 1.0, 2.0, 5.0)
+
+
+def tokenize(value):
+    return TOKEN_RE.findall(value.lower()) if value else []
+
+
+class SearchBackend:
+    name = None
+
+    def apply(self, query, keyword):
+        raise NotImplementedError
+
+
+class LikeSearchBackend(SearchBackend):
+    """Fallback không có chỉ mục: LIKE '%kw%' trên từng cột, không xếp hạng."""
+    name = 'like'
+
+    def apply(self, query, keyword):
+        for token in tokenize(keyword):
+            query = query.filter(or_(
+                Job.title.contains(token),
+                Job.description.contains(token),
+                Job.requirements.contains(token),
+                Job.tags.any(Tag.name.contains(token))
+            ))
+        return query.order_by(Job.created_date.desc())
+
+
+class SQLiteFTSSearchBackend(SearchBackend):
+    """Bảng ảo FTS5 job_fts (xem models.py), xếp hạng bằng bm25()."""
+    name = 'sqlite_fts'
+
+    def apply(self, query, keyword):
+        tokens = tokenize(keyword)
+        if not tokens:
+            return query.order_by(Job.created_date.desc())
+
+        # Mỗi token là một prefix query, các token được AND với nhau
+        fts_query = ' '.join('"%s"*' % t for t in tokens)
+        weights = ', '.join(str(w) for w in FIELD_WEIGHTS)
+        ranked = text(
+            "SELECT rowid AS job_id, bm25(job_fts, %s) AS score FROM job_fts WHERE job_fts MATCH :fts_query" % weights
+        ).bindparams(fts_query=fts_query).columns(job_id=Integer, score=Float).subquery('job_search')
+
+        # bm25() càng nhỏ càng liên quan
+        return query.join(ranked, ranked.c.job_id == Job.id) \
+            .order_by(ranked.c.score, Job.created_date.desc())
+
+
+class MySQLFullTextSearchBackend(SearchBackend):
+    """Chỉ mục FULLTEXT của InnoDB trên job và tag (xem models.py)."""
+    name = 'mysql_fulltext'
+
+    def apply(self, query, keyword):
+        if not tokenize(keyword):
+            return query.order_by(Job.created_date.desc())
+
+        # Mỗi MATCH đứng riêng trong WHERE của một nhánh UNION để dùng được chỉ mục FULLTEXT
+        # (MATCH nằm trong OR với điều kiện khác thì MySQL quét cả bảng job)
+        job_score = match(Job.title, Job.description, Job.requirements, against=keyword) \
+            .in_natural_language_mode()
+        tag_score = match(Tag.name, against=keyword).in_natural_language_mode()
+        job_hits = select(Job.id.label('job_id'), job_score.label('score')).where(job_score)
+        tag_hits = select(tag_job.c.job_id, tag_score.label('score')) \
+            .join(Tag, Tag.id == tag_job.c.tag_id) \
+            .where(tag_score)
+        hits = union_all(job_hits, tag_hits).subquery('job_hits')
+        ranked = select(hits.c.job_id, func.sum(hits.c.score).label('score')) \
+            .group_by(hits.c.job_id).subquery('job_search')
+
+        return query.join(ranked, ranked.c.job_id == Job.id) \
+            .order_by(ranked.c.score.desc(), Job.created_date.desc())
+
+
+class InMemorySearchBackend(SearchBackend):
+    """
+    Inverted index trong process, dùng cho test hoặc khi DB không hỗ trợ full-text.
+
+    Chỉ mục được build lần đầu khi tìm kiếm; mapper event của Job/Tag đánh dấu các
+    job cần index lại ở lần tìm kiếm kế tiếp. Chỉ đúng khi chạy một process duy nhất.
+    """
+    name = 'memory'
+
+    def __init__(self, max_results=1000):
+        self.max_results = max_results
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)  # token -> {job_id: weighted tf}
+        self._docs = {}  # job_id -> set(token)
+        self._vocabulary = []
+        self._stale = set()
+        self._built = False
+
+    def rebuild(self):
+        with self._lock:
+            self._postings.clear()
+            self._docs.clear()
+            self._stale.clear()
+            self._load(db.session.query(Job.id, Job.title, Job.description, Job.requirements))
+            self._built = True
+
+    def mark_stale(self, job_id=None):
+        """Đánh dấu job cần index lại ở lần tìm kiếm kế tiếp (None = build lại toàn bộ)."""
+        with self._lock:
+            if job_id is None:
+                self._built = False
+            else:
+                self._stale.add(job_id)
+
+    def _refresh(self):
+        stale, self._stale = self._stale, set()
+        for job_id in stale:
+            self._remove(job_id)
+        # Job đã bị xóa không còn trong DB nên chỉ bị remove
+        self._load(db.session.query(Job.id, Job.title, Job.description, Job.requirements)
+                   .filter(Job.id.in_(stale)))
+
+    def _load(self, rows):
+        rows = rows.all()
+        tags = defaultdict(list)
+        tag_query = db.session.query(tag_job.c.job_id, Tag.name).join(Tag, Tag.id == tag_job.c.tag_id)
+        if self._built:
+            tag_query = tag_query.filter(tag_job.c.job_id.in_([row[0] for row in rows]))
+        for job_id, name in tag_query:
+            tags[job_id].append(name or '')
+
+        for job_id, title, description, requirements in rows:
+            self._add(job_id, (title, description, requirements, ' '.join(tags[job_id])))
+        self._vocabulary = sorted(self._postings)
+
+    def _add(self, job_id, fields):
+        terms = defaultdict(float)
+        for weight, value in zip(FIELD_WEIGHTS, fields):
+            for token in tokenize(value):
+                terms[token] += weight
+        for token, tf in terms.items():
+            self._postings[token][job_id] = tf
+        self._docs[job_id] = set(terms)
+
+    def _remove(self, job_id):
+        for token in self._docs.pop(job_id, ()):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(job_id, None)
+                if not postings:
+                    del self._postings[token]
+
+    def _expand(self, prefix):
+        i = bisect_left(self._vocabulary, prefix)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(prefix):
+            yield self._vocabulary[i]
+            i += 1
+
+    def rank(self, keyword):
+        """Trả về danh sách job_id khớp tất cả token (prefix), sắp theo điểm tf-idf giảm dần."""
+        with self._lock:
+            if not self._built:
+                self.rebuild()
+            elif self._stale:
+                self._refresh()
+
+            total = len(self._docs) or 1
+            scores = None
+            for token in tokenize(keyword):
+                token_scores = defaultdict(float)
+                for term in self._expand(token):
+                    postings = self._postings[term]
+                    idf = math.log(1 + total / len(postings))
+                    for job_id, tf in postings.items():
+                        token_scores[job_id] += tf * idf
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {job_id: s + token_scores[job_id] for job_id, s in scores.items() if job_id in token_scores}
+                if not scores:
+                    return []
+
+        ranked = sorted((scores or {}).items(), key=lambda item: (-item[1], -item[0]))
+        return [job_id for job_id, _ in ranked[:self.max_results]]
+
+    def apply(self, query, keyword):
+        if not tokenize(keyword):
+            return query.order_by(Job.created_date.desc())
+
+        job_ids = self.rank(keyword)
+        if not job_ids:
+            return query.filter(False)
+
+        position = case({job_id: i for i, job_id in enumerate(job_ids)}, value=Job.id)
+        return query.filter(Job.id.in_(job_ids)).order_by(position)
+
+
+BACKENDS = {
+    LikeSearchBackend.name: LikeSearchBackend,
+    SQLiteFTSSearchBackend.name: SQLiteFTSSearchBackend,
+    MySQLFullTextSearchBackend.name: MySQLFullTextSearchBackend,
+    InMemorySearchBackend.name: InMemorySearchBackend,
+}
+
+def _has_fulltext_index(engine):
+    return 'ft_job_search' in {index['name'] for index in inspect(engine).get_indexes('job')}
+
+
+def _has_fts_table(engine):
+    return inspect(engine).has_table('job_fts')
+
+
+# dialect -> (backend, hàm kiểm tra chỉ mục của backend đã có trong DB)
+_AUTO_BACKENDS = {
+    'mysql': (MySQLFullTextSearchBackend.name, _has_fulltext_index),
+    'sqlite': (SQLiteFTSSearchBackend.name, _has_fts_table),
+}
+
+class _SearchState:
+    def __init__(self):
+        self.backends = {}
+        self.auto_names = {}  # engine -> tên backend 'auto' đã chọn
+
+
+def _state():
+    state = current_app.extensions.get('search')
+    if state is None:
+        state = current_app.extensions.setdefault('search', _SearchState())
+    return state
+
+
+def _auto_backend(engine):
+    auto_names = _state().auto_names
+    name = auto_names.get(engine)
+    if name is None:
+        name, has_index = _AUTO_BACKENDS.get(engine.dialect.name, (LikeSearchBackend.name, None))
+        if has_index is not None and not has_index(engine):
+            log.warning("search index missing, falling back to LIKE", backend=name, dialect=engine.dialect.name)
+            name = LikeSearchBackend.name
+        auto_names[engine] = name
+    return name
+
+
+def get_backend(name=None):
+    name = name or current_app.config.get('SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        name = _auto_backend(db.engine)
+
+    backends = _state().backends
+    if name not in backends:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown search backend: {name}")
+        backends.setdefault(name, BACKENDS[name]())
+    return backends[name]
+
+
+def search_jobs(query, keyword):
+    return get_backend().apply(query, keyword)
+
+
+def _memory_backend():
+    state = current_app.extensions.get('search') if has_app_context() else None
+    return state.backends.get(InMemorySearchBackend.name) if state else None
+
+
+@event.listens_for(Job, 'after_insert')
+@event.listens_for(Job, 'after_update')
+@event.listens_for(Job, 'after_delete')
+def _mark_job_stale(mapper, connection, target):
+    backend = _memory_backend()
+    if backend:
+        backend.mark_stale(target.id)
+
+
+@event.listens_for(Tag, 'after_update')
+@event.listens_for(Tag, 'after_delete')
+def _mark_tags_stale(mapper, connection, target):
+    backend = _memory_backend()
+    if backend:
+        backend.mark_stale()
+
+
+@event.listens_for(Job.__table__, 'after_create')
+@event.listens_for(Job.__table__, 'after_drop')
+def _reset_index(target, connection, **kw):
+    if not has_app_context() or 'search' not in current_app.extensions:
+        return
+    _state().auto_names.clear()
+    backend = _memory_backend()
+    if backend:
+        backend.mark_stale()
@@ -186,6 +186,33 @@ async function createDatetimeInterview(applyId) {
 }
 
 
+// Thông báo realtime: server emit 'notification' {unread, notification?} vào room của user
+function listenNotifications(socket) {
+    if (!socket) return;
+    socket.on("notification", (data) => {
+        const badge = document.getElementById("notification-badge");
+        if (badge) {
+            document.getElementById("notification-count").textContent = data.unread;
+            badge.classList.toggle("d-none", data.unread === 0);
+        }
+        const list = document.getElementById("notification-list");
+        if (!list || !data.notification) return;
+
+        const empty = document.getElementById("notification-empty");
+        if (empty) empty.remove();
+        const item = document.createElement("li");
+        item.innerHTML = `
+            <a href="${list.dataset.notificationsUrl}" class="dropdown-item py-2">
+                <h6 class="mb-1 text-wrap"></h6>
+                <small class="text-muted"><i class="bi bi-clock"></i> ${data.notification.created_date}</small>
+            </a>`;
+        item.querySelector("h6").textContent = data.notification.content;
+        // Chèn ngay dưới header của dropdown
+        list.children[0].after(item);
+    });
+}
+
+
     const salaryRange = document.getElementById("salaryRange");
     const salaryText = document.getElementById("salaryText");
 
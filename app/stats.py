@@ -0,0 +1,270 @@
+"""
+    Bộ đếm thống kê cho dashboard nhà tuyển dụng (/stats-by-recruiter).
+
+    Hai bảng rollup (app/models.py):
+        company_month_stat  (company_id, year, month): số job đăng, số đơn theo trạng thái
+        job_stat            (job_id): số đơn theo trạng thái
+
+    Cập nhật tăng dần: mapper event insert/update/delete của Job và Application chỉ cộng
+    dồn delta vào session.info; after_flush ghi mỗi dòng rollup bị ảnh hưởng bằng đúng một
+    câu upsert (theo thứ tự khóa cố định), nên flush nhiều đơn của cùng job/tháng chỉ khóa
+    dòng nóng đó một lần, và bộ đếm commit/rollback cùng với thao tác ghi.
+    Đổi status chuyển đơn từ cột này sang cột khác;
+    đổi job_id/applied_date/company_id/created_date chuyển sang dòng khác.
+    Bộ đếm về 0 (job/đơn bị xóa) không xóa dòng rollup; dao.stats_job_by_recruiter bỏ qua các dòng đó.
+
+    query.update()/delete() hàng loạt và INSERT bằng Core không đi qua mapper event: sau
+    những thao tác đó (và lần đầu triển khai) chạy rollup để tính lại từ bảng gốc:
+        python -m app.stats
+"""
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import delete, event, extract, func, insert, inspect, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app import db
+from app.logger import get_logger
+from app.models import Job, Application, ApplicationStatusEnum, CompanyMonthStat, JobStat
+
+log = get_logger(__name__)
+
+# session.info: {(model, ((khóa, giá trị), ...)): Counter(cột -> delta)} chờ ghi ở after_flush
+_PENDING_DELTAS = 'stats_pending_deltas'
+
+# Trạng thái có cột riêng; DRAFT/DELETED chỉ tính vào tổng `applications`
+STATUS_COLUMNS = {
+    ApplicationStatusEnum.PENDING: 'pending',
+    ApplicationStatusEnum.CONFIRMED: 'confirmed',
+    ApplicationStatusEnum.ACCEPTED: 'accepted',
+    ApplicationStatusEnum.REJECTED: 'rejected',
+}
+
+
+def _counters(model):
+    return [c.name for c in model.__table__.c if not c.primary_key]
+
+
+def _status(value):
+    if isinstance(value, str):
+        try:
+            return ApplicationStatusEnum(value)
+        except ValueError:
+            return ApplicationStatusEnum.__members__.get(value)
+    return value
+
+
+def _period(value):
+    value = value or datetime.now()
+    return value.year, value.month
+
+
+def bump(connection, model, keys, deltas):
+    """Cộng deltas vào dòng `keys` của bảng rollup, tạo dòng nếu chưa có (một câu upsert)."""
+    deltas = {column: n for column, n in deltas.items() if n}
+    if not deltas:
+        return
+    table = model.__table__
+    values = dict(keys, **{column: deltas.get(column, 0) for column in _counters(model)})
+    dialect = connection.dialect.name
+
+    if dialect == 'sqlite':
+        stmt = sqlite_insert(table).values(values)
+        stmt = stmt.on_conflict_do_update(index_elements=list(keys),
+                                          set_={c: table.c[c] + stmt.excluded[c] for c in deltas})
+        connection.execute(stmt)
+    elif dialect in ('mysql', 'mariadb'):
+        stmt = mysql_insert(table).values(values)
+        connection.execute(stmt.on_duplicate_key_update({c: table.c[c] + stmt.inserted[c] for c in deltas}))
+    else:
+        result = connection.execute(update(table)
+                                    .where(*[table.c[k] == v for k, v in keys.items()])
+                                    .values({c: table.c[c] + n for c, n in deltas.items()}))
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(values))
+
+
+def _add(session, model, keys, deltas):
+    """Cộng dồn delta cho dòng `keys` của bảng rollup, ghi một lần ở after_flush."""
+    pending = session.info.setdefault(_PENDING_DELTAS, {})
+    pending.setdefault((model, tuple(sorted(keys.items()))), Counter()).update(deltas)
+
+
+@event.listens_for(Session, 'before_flush')
+def _reset_deltas(session, flush_context, instances):
+    # Delta còn lại của lần flush lỗi trước đó không được ghi
+    session.info.pop(_PENDING_DELTAS, None)
+
+
+@event.listens_for(Session, 'after_flush')
+def _write_deltas(session, flush_context):
+    pending = session.info.pop(_PENDING_DELTAS, None)
+    if not pending:
+        return
+    # Thứ tự cố định (bảng, khóa) để hai transaction không khóa chéo nhau
+    for (model, keys), deltas in sorted(pending.items(), key=lambda item: (item[0][0].__tablename__, item[0][1])):
+        connection = session.connection(bind_arguments=dict(mapper=inspect(model)))
+        bump(connection, model, dict(keys), deltas)
+
+
+def _values(connection, target, attrs, old=False):
+    """
+    Giá trị cũ hoặc mới của các thuộc tính trong lúc flush, không lazy-load. Thuộc tính
+    chưa load (expired) được đọc từ DB qua connection: trước UPDATE (before_update) đó là
+    giá trị cũ, sau UPDATE (after_update) là giá trị mới.
+    """
+    state = inspect(target)
+    values = {}
+    for attr in attrs:
+        history = state.attrs[attr].history
+        current = (history.deleted or history.unchanged) if old else (history.added or history.unchanged)
+        values[attr] = current[0] if current else None
+    missing = [attr for attr, value in values.items() if value is None]
+    if missing and target.id is not None:
+        model = type(target)
+        row = connection.execute(select(*[getattr(model, attr) for attr in missing])
+                                 .where(model.id == target.id)).mappings().first()
+        if row:
+            values.update({attr: row[attr] for attr in missing})
+    return values
+
+
+def _changed(target, attrs):
+    state = inspect(target)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _listen(model, attrs, apply):
+    """
+    Gắn mapper event: insert cộng, delete trừ; update trừ theo giá trị cũ trước câu UPDATE
+    rồi cộng theo giá trị mới sau câu UPDATE (chỉ khi một trong `attrs` thay đổi).
+    """
+    @event.listens_for(model, 'after_insert')
+    def _inserted(mapper, connection, target):
+        apply(connection, inspect(target).session, _values(connection, target, attrs), 1)
+
+    @event.listens_for(model, 'before_update')
+    def _before_update(mapper, connection, target):
+        if _changed(target, attrs):
+            apply(connection, inspect(target).session, _values(connection, target, attrs, old=True), -1)
+
+    @event.listens_for(model, 'after_update')
+    def _after_update(mapper, connection, target):
+        if _changed(target, attrs):
+            apply(connection, inspect(target).session, _values(connection, target, attrs), 1)
+
+    @event.listens_for(model, 'before_delete')
+    def _deleted(mapper, connection, target):
+        apply(connection, inspect(target).session, _values(connection, target, attrs, old=True), -1)
+
+
+# ---------- Job ----------
+def _apply_job(connection, session, values, sign):
+    if values['company_id'] is None:
+        return
+    year, month = _period(values['created_date'])
+    _add(session, CompanyMonthStat, dict(company_id=values['company_id'], year=year, month=month), {'jobs': sign})
+
+
+@event.listens_for(Job, 'after_delete')
+def _drop_job_stat(mapper, connection, target):
+    session = inspect(target).session
+    if session is not None:
+        # Delta của các đơn bị xóa cùng job không được tạo lại dòng job_stat
+        session.info.get(_PENDING_DELTAS, {}).pop((JobStat, (('job_id', target.id),)), None)
+    connection.execute(delete(JobStat).where(JobStat.job_id == target.id))
+
+
+_listen(Job, ('company_id', 'created_date'), _apply_job)
+
+
+# ---------- Application ----------
+def _apply_application(connection, session, values, sign):
+    if values['job_id'] is None:
+        return
+    counts = {'applications': sign}
+    column = STATUS_COLUMNS.get(_status(values['status']))
+    if column:
+        counts[column] = sign
+    _add(session, JobStat, dict(job_id=values['job_id']), counts)
+
+    company_id = connection.scalar(select(Job.company_id).where(Job.id == values['job_id']))
+    if company_id is not None:
+        year, month = _period(values['applied_date'])
+        _add(session, CompanyMonthStat, dict(company_id=company_id, year=year, month=month), counts)
+
+
+_listen(Application, ('job_id', 'applied_date', 'status'), _apply_application)
+
+
+# ---------- Rollup ----------
+def rebuild(company_id=None):
+    """
+    Tính lại bộ đếm từ bảng job/application bằng GROUP BY (toàn bộ hoặc một công ty) và
+    thay thế các dòng rollup hiện có trong một transaction. Trả về số dòng rollup đã ghi.
+    """
+    job_year, job_month = extract('year', Job.created_date), extract('month', Job.created_date)
+    app_year, app_month = extract('year', Application.applied_date), extract('month', Application.applied_date)
+
+    jobs = select(Job.company_id, job_year, job_month, func.count()) \
+        .where(Job.company_id.isnot(None), Job.created_date.isnot(None)) \
+        .group_by(Job.company_id, job_year, job_month)
+    company_apps = select(Job.company_id, app_year, app_month, Application.status, func.count()) \
+        .join(Job, Job.id == Application.job_id) \
+        .where(Application.applied_date.isnot(None)) \
+        .group_by(Job.company_id, app_year, app_month, Application.status)
+    job_apps = select(Application.job_id, Application.status, func.count()) \
+        .join(Job, Job.id == Application.job_id) \
+        .group_by(Application.job_id, Application.status)
+    if company_id is not None:
+        jobs = jobs.where(Job.company_id == company_id)
+        company_apps = company_apps.where(Job.company_id == company_id)
+        job_apps = job_apps.where(Job.company_id == company_id)
+
+    months = {}
+    for cid, year, month, n in db.session.execute(jobs):
+        months.setdefault((cid, int(year), int(month)), Counter())['jobs'] += n
+    for cid, year, month, status, n in db.session.execute(company_apps):
+        counter = months.setdefault((cid, int(year), int(month)), Counter())
+        counter['applications'] += n
+        if STATUS_COLUMNS.get(_status(status)):
+            counter[STATUS_COLUMNS[_status(status)]] += n
+    per_job = {}
+    for job_id, status, n in db.session.execute(job_apps):
+        counter = per_job.setdefault(job_id, Counter())
+        counter['applications'] += n
+        if STATUS_COLUMNS.get(_status(status)):
+            counter[STATUS_COLUMNS[_status(status)]] += n
+
+    try:
+        if company_id is None:
+            db.session.execute(delete(CompanyMonthStat))
+            db.session.execute(delete(JobStat))
+        else:
+            db.session.execute(delete(CompanyMonthStat).where(CompanyMonthStat.company_id == company_id))
+            db.session.execute(delete(JobStat).where(
+                JobStat.job_id.in_(select(Job.id).where(Job.company_id == company_id))))
+        if months:
+            db.session.execute(insert(CompanyMonthStat), [
+                dict(company_id=cid, year=year, month=month,
+                     **{c: counter[c] for c in _counters(CompanyMonthStat)})
+                for (cid, year, month), counter in months.items()])
+        if per_job:
+            db.session.execute(insert(JobStat), [
+                dict(job_id=job_id, **{c: counter[c] for c in _counters(JobStat)})
+                for job_id, counter in per_job.items()])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    log.info("stats rebuilt", company_id=company_id, months=len(months), jobs=len(per_job))
+    return len(months) + len(per_job)
+
+
+if __name__ == '__main__':
+    from app import create_app
+
+    with create_app().app_context():
+        print(f"{rebuild()} rollup rows written")
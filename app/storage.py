@@ -0,0 +1,73 @@
+"""
+    Nơi lưu file người dùng upload (avatar, CV).
+
+    UPLOAD_STORAGE:
+        'cloudinary'  mặc định, trả về secure_url của Cloudinary
+        'local'       copy vào UPLOAD_LOCAL_ROOT, URL = UPLOAD_LOCAL_URL + key (dùng cho dev/test)
+"""
+import os
+import shutil
+import threading
+
+from flask import current_app
+
+
+class StorageBackend:
+    name = None
+
+    def save(self, path, key):
+        """Lưu file ở đường dẫn local `path` dưới tên `key`, trả về URL công khai."""
+        raise NotImplementedError
+
+
+class CloudinaryStorage(StorageBackend):
+    """SDK Cloudinary chỉ được import và cấu hình (CLOUDINARY_*) ở lần upload đầu tiên."""
+    name = 'cloudinary'
+
+    _configured = False
+    _lock = threading.Lock()
+
+    @classmethod
+    def _uploader(cls):
+        import cloudinary
+        import cloudinary.uploader
+
+        if not cls._configured:
+            with cls._lock:
+                if not cls._configured:
+                    config = current_app.config
+                    cloudinary.config(cloud_name=config['CLOUDINARY_CLOUD_NAME'],
+                                      api_key=config['CLOUDINARY_API_KEY'],
+                                      api_secret=config['CLOUDINARY_API_SECRET'],
+                                      secure=True)
+                    cls._configured = True
+        return cloudinary.uploader
+
+    def save(self, path, key):
+        result = self._uploader().upload(path, resource_type='auto')
+        return result['secure_url']
+
+
+class LocalStorage(StorageBackend):
+    name = 'local'
+
+    def __init__(self, root, base_url):
+        self.root = root
+        self.base_url = base_url.rstrip('/') + '/'
+
+    def save(self, path, key):
+        target = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(path, target)
+        return self.base_url + key
+
+
+def get_storage():
+    config = current_app.config
+    name = config.get('UPLOAD_STORAGE', CloudinaryStorage.name)
+    if name == LocalStorage.name:
+        return LocalStorage(config.get('UPLOAD_LOCAL_ROOT', os.path.join(current_app.static_folder, 'uploads')),
+                            config.get('UPLOAD_LOCAL_URL', '/static/uploads/'))
+    if name == CloudinaryStorage.name:
+        return CloudinaryStorage()
+    raise ValueError(f"Unknown upload storage: {name}")
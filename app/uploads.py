@@ -0,0 +1,184 @@
+"""
+    Upload avatar/CV bất đồng bộ.
+
+    Request chỉ ghi file xuống thư mục staging (UPLOAD_STAGING_DIR) rồi trả về; một pool
+    UPLOAD_WORKERS thread đẩy file lên storage (app/storage.py) và cập nhật DB:
+        - CV:     upload_status PENDING -> READY (file_path = URL) hoặc FAILED
+        - Avatar: avatar_upload_status PENDING -> READY (User.avatar = URL) hoặc FAILED;
+                  User.avatar giữ giá trị mặc định cho tới khi upload xong
+
+    File staging chỉ bị xóa sau khi đã cập nhật DB, nên CV/avatar còn PENDING sau khi process
+    bị dừng đột ngột được đẩy lại bởi tác vụ requeue_uploads của scheduler (app/scheduler.py):
+    chỉ các file staging cũ hơn UPLOAD_REQUEUE_AFTER_SECONDS, để không upload lại file mà
+    worker khác vẫn đang xử lý. Upload trùng vẫn an toàn: finalizer bỏ qua key đã xong.
+"""
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from flask import current_app
+from sqlalchemy import select
+from werkzeug.utils import secure_filename
+
+from app import db
+from app.logger import get_logger
+from app.models import CV, User, UploadStatusEnum
+from app.storage import get_storage
+
+log = get_logger(__name__)
+
+KIND_AVATAR = 'avatar'
+KIND_CV = 'cv'
+
+_executor_lock = threading.Lock()
+_pending = set()  # upload đang chạy của mọi app trong process
+_in_flight = set()  # key đang upload trong process này
+
+
+def staging_dir():
+    return current_app.config.get('UPLOAD_STAGING_DIR') or os.path.join(tempfile.gettempdir(), 'recruitment-uploads')
+
+
+def staged_path(key):
+    return os.path.join(staging_dir(), key)
+
+
+def stage_upload(file, kind):
+    """Ghi FileStorage xuống thư mục staging, trả về key duy nhất (dạng '<kind>/<uuid>.<ext>')."""
+    ext = os.path.splitext(secure_filename(file.filename or ''))[1].lower()
+    key = f"{kind}/{uuid.uuid4().hex}{ext}"
+    path = staged_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    file.save(path)
+    return key
+
+
+def _get_executor():
+    """Pool thread upload của app hiện tại (app.extensions['uploads'])."""
+    with _executor_lock:
+        executor = current_app.extensions.get('uploads')
+        if executor is None:
+            executor = current_app.extensions['uploads'] = ThreadPoolExecutor(
+                max_workers=current_app.config.get('UPLOAD_WORKERS', 4), thread_name_prefix='upload-worker')
+        return executor
+
+
+def submit(kind, target_id, key):
+    """Đẩy file đã stage lên storage ở thread nền; gọi sau khi đã commit dòng DB tương ứng."""
+    _in_flight.add(key)
+    future = _get_executor().submit(_process, current_app._get_current_object(), kind, target_id, key)
+    _pending.add(future)
+    future.add_done_callback(_pending.discard)
+    future.add_done_callback(lambda _: _in_flight.discard(key))
+    return future
+
+
+def wait_for_uploads(timeout=None):
+    """Chờ các upload đang chạy xong (dùng cho test và khi tắt app)."""
+    wait(list(_pending), timeout=timeout)
+
+
+def _upload(path, key):
+    attempts = current_app.config.get('UPLOAD_MAX_ATTEMPTS', 3)
+    storage = get_storage()
+    for attempt in range(1, attempts + 1):
+        try:
+            return storage.save(path, key)
+        except Exception:
+            if attempt == attempts:
+                raise
+            log.warning("upload failed, retrying", key=key, attempt=attempt)
+            time.sleep(current_app.config.get('UPLOAD_RETRY_DELAY', 1) * 2 ** (attempt - 1))
+
+
+def _process(app, kind, target_id, key):
+    url = None
+    with app.app_context():
+        path = staged_path(key)
+        try:
+            url = _upload(path, key)
+            log.info("upload finished", kind=kind, target_id=target_id, key=key)
+        except Exception:
+            log.exception("upload failed", kind=kind, target_id=target_id, key=key)
+
+        try:
+            FINALIZERS[kind](target_id, key, url)
+        except Exception:
+            db.session.rollback()
+            log.exception("upload finalize failed", kind=kind, target_id=target_id, key=key)
+            return url
+
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    return url
+
+
+def _finalize_cv(cv_id, key, url):
+    cv = db.session.get(CV, cv_id)
+    if cv is None or cv.upload_key != key:
+        # CV đã bị xóa hoặc đã có lần upload mới hơn
+        return
+    if url:
+        cv.file_path = url
+        cv.upload_status = UploadStatusEnum.READY
+    else:
+        cv.upload_status = UploadStatusEnum.FAILED
+    cv.upload_key = None
+    db.session.commit()
+
+
+def _finalize_avatar(user_id, key, url):
+    user = db.session.get(User, user_id)
+    if user is None or user.avatar_upload_key != key:
+        return
+    if url:
+        user.avatar = url
+        user.avatar_upload_status = UploadStatusEnum.READY
+    else:
+        user.avatar_upload_status = UploadStatusEnum.FAILED
+    user.avatar_upload_key = None
+    db.session.commit()
+
+
+FINALIZERS = {
+    KIND_CV: _finalize_cv,
+    KIND_AVATAR: _finalize_avatar,
+}
+
+# Upload còn PENDING của từng loại: (kind, cột id, cột trạng thái, cột key)
+PENDING_UPLOADS = [
+    (KIND_CV, CV.id, CV.upload_status, CV.upload_key),
+    (KIND_AVATAR, User.id, User.avatar_upload_status, User.avatar_upload_key),
+]
+
+
+def requeue_pending_uploads(older_than=None):
+    """
+    Đẩy lại các CV/avatar còn PENDING mà file staging vẫn còn và đã cũ hơn `older_than` giây
+    (mặc định UPLOAD_REQUEUE_AFTER_SECONDS), tức upload của process đã bị dừng đột ngột.
+    """
+    if older_than is None:
+        older_than = current_app.config.get('UPLOAD_REQUEUE_AFTER_SECONDS', 600)
+    cutoff = time.time() - older_than
+    count = 0
+    for kind, id_column, status_column, key_column in PENDING_UPLOADS:
+        pending = db.session.execute(select(id_column, key_column)
+                                     .where(status_column == UploadStatusEnum.PENDING, key_column.isnot(None)))
+        for target_id, key in pending.all():
+            if key in _in_flight:
+                continue
+            try:
+                if os.path.getmtime(staged_path(key)) > cutoff:
+                    continue
+            except OSError:
+                continue
+            submit(kind, target_id, key)
+            count += 1
+    if count:
+        log.warning("requeued pending uploads", count=count)
+    return count
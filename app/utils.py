@@ -1,14 +1,9 @@
-from flask_mail import Message
-from app import app, mail
+from flask import current_app
+
+from app.mailer import queue_mail
 
 def send_email_notification(to_email, subject, body):
     if not to_email:
         return
-    try:
-        msg = Message(subject=subject,
-                      sender=app.config['MAIL_USERNAME'],
-                      recipients=[to_email])
-        msg.body = body
-        mail.send(msg)
-    except Exception as e:
-        print(f"[!] Error sending email: {str(e)}")
+    # Chỉ đưa vào outbox (người gọi commit), worker gửi sau (xem app/mailer.py)
+    queue_mail(to_email, subject, body, sender=current_app.config['MAIL_USERNAME'])
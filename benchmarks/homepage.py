@@ -0,0 +1,115 @@
+"""
+    Benchmark route trang chủ (/) trước và sau khi cache bộ đếm.
+
+        legacy  count_jobs() + count_candidates() + count_companies() rồi render (cách cũ)
+        cold    GET / khi cache trống (1 COUNT trên job + 1 lượt quét user)
+        warm    GET / khi bộ đếm đã có trong cache (không query aggregate nào)
+
+    Dữ liệu được seed vào --db-url (mặc định file SQLite trong thư mục tạm, truyền cho app
+    qua DATABASE_URL) và dùng lại ở các lần chạy sau.
+
+        python benchmarks/homepage.py --jobs 200000 --users 200000 --requests 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-url', default='sqlite:///' + os.path.join(tempfile.gettempdir(), 'homepage_bench.sqlite'))
+    parser.add_argument('--jobs', type=int, default=200000)
+    parser.add_argument('--users', type=int, default=200000)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--reseed', action='store_true', help='seed lại kể cả khi DB đã có dữ liệu')
+    return parser.parse_args()
+
+
+ARGS = parse_args()
+# Phải đặt trước khi import app: engine được tạo lúc import
+os.environ['DATABASE_URL'] = ARGS.db_url
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import render_template  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from app import db, dao  # noqa: E402
+from app.index import app  # noqa: E402
+from app.cache import get_cache  # noqa: E402
+from app.models import User, Company, Job, RoleEnum, JobStatusEnum  # noqa: E402
+
+CHUNK = 50000
+
+
+def seed(jobs, users):
+    rnd = random.Random(42)
+    db.drop_all()
+    db.create_all()
+    for start in range(0, users, CHUNK):
+        db.session.execute(insert(User), [
+            dict(username=f'user{i}', password='x', email=f'user{i}@bench.test',
+                 role=RoleEnum.RECRUITER if i % 10 == 0 else RoleEnum.JOBSEEKER, is_active=rnd.random() > 0.05)
+            for i in range(start, min(start + CHUNK, users))])
+    db.session.execute(insert(Company), [dict(user_id=i + 1, company_name=f'Company {i}')
+                                         for i in range(0, users, 10)])
+    companies = (users + 9) // 10
+    for start in range(0, jobs, CHUNK):
+        db.session.execute(insert(Job), [
+            dict(title=f'Job {i}', company_id=rnd.randint(1, companies),
+                 status=rnd.choice([JobStatusEnum.POSTED, JobStatusEnum.POSTED, JobStatusEnum.EXPIRED]))
+            for i in range(start, min(start + CHUNK, jobs))])
+    db.session.commit()
+
+
+def legacy_index():
+    # Route / trước khi có cache: 3 COUNT(*) mỗi request
+    with app.test_request_context('/'):
+        return render_template('index.html', total_jobs=dao.count_jobs(),
+                               total_candidates=dao.count_candidates(), total_companies=dao.count_companies())
+
+
+def timed(fn, requests, before=None):
+    timings = []
+    for _ in range(requests):
+        if before:
+            before()
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1], sum(timings)
+
+
+def main():
+    with app.app_context():
+        seeded = None
+        try:
+            seeded = (db.session.scalar(select(func.count()).select_from(Job)),
+                      db.session.scalar(select(func.count()).select_from(User)))
+        except Exception:
+            db.session.rollback()
+        if ARGS.reseed or seeded != (ARGS.jobs, ARGS.users):
+            print(f"Seeding {ARGS.jobs:,} jobs / {ARGS.users:,} users into {ARGS.db_url}")
+            seed(ARGS.jobs, ARGS.users)
+
+        client = app.test_client()
+        get = lambda: client.get('/')
+        cases = [
+            ('legacy', legacy_index, None),
+            ('cold', get, dao.invalidate_homepage_counters),
+            ('warm', get, None),
+        ]
+        get_cache().clear()
+        print(f"{'handler':<8} {'median ms':>10} {'p95 ms':>8} {'req/s':>8}")
+        for name, fn, before in cases:
+            fn()  # warm-up (template, cache)
+            median, p95, total = timed(fn, ARGS.requests, before)
+            print(f"{name:<8} {median:>10.2f} {p95:>8.2f} {ARGS.requests / total * 1000:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+    Benchmark feed đơn ứng tuyển của nhà tuyển dụng (/applications).
+
+    So sánh:
+        in_list  cách cũ: lấy company, lấy danh sách job_id của công ty, rồi
+                 application.job_id IN (...) (3 round trip, hàng nghìn bind param)
+        join     dao.company_applications_query(): application JOIN job JOIN company
+                 WHERE company.user_id = ... (1 round trip)
+
+    Mỗi lần đo gồm COUNT(*) và một trang PER_PAGE dòng sắp theo applied_date, có và không
+    lọc status / khoảng ngày. Dữ liệu được seed một lần vào --db-url (mặc định file SQLite
+    trong thư mục tạm) và dùng lại ở các lần chạy sau.
+
+        python benchmarks/recruiter_feed.py --jobs 10000 --applications 1000000
+        python benchmarks/recruiter_feed.py --db-url mysql+pymysql://root:pw@localhost/bench
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import create_engine, func, insert, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app import db, dao  # noqa: E402
+from app.index import app  # noqa: E402
+from app.models import User, Company, Job, Resume, CV, Application, RoleEnum, JobStatusEnum, \
+    ApplicationStatusEnum  # noqa: E402
+
+PER_PAGE = 20
+CHUNK = 50000
+STATUSES = [ApplicationStatusEnum.PENDING, ApplicationStatusEnum.CONFIRMED,
+            ApplicationStatusEnum.ACCEPTED, ApplicationStatusEnum.REJECTED]
+
+
+def seed(engine, companies, jobs, applications, seekers):
+    """Công ty 1 là nhà tuyển dụng lớn (20% số job), các job còn lại chia đều cho các công ty khác."""
+    rnd = random.Random(42)
+    now = datetime.now()
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [dict(id=i, username=f'user{i}', password='x', email=f'user{i}@bench.test',
+                                         role=RoleEnum.RECRUITER if i <= companies else RoleEnum.JOBSEEKER)
+                                    for i in range(1, companies + seekers + 1)])
+        conn.execute(insert(Company), [dict(id=i, user_id=i, company_name=f'Company {i}')
+                                       for i in range(1, companies + 1)])
+        big = max(1, jobs // 5)
+        conn.execute(insert(Job), [dict(id=i, title=f'Job {i}', status=JobStatusEnum.POSTED,
+                                        company_id=1 if i <= big or companies == 1 else 2 + i % (companies - 1),
+                                        created_date=now - timedelta(days=rnd.randint(0, 365)))
+                                   for i in range(1, jobs + 1)])
+        conn.execute(insert(Resume), [dict(id=i, user_id=companies + i) for i in range(1, seekers + 1)])
+        conn.execute(insert(CV), [dict(id=i, title=f'CV {i}', file_path=f'/cv/{i}.pdf', resume_id=i)
+                                  for i in range(1, seekers + 1)])
+    for start in range(0, applications, CHUNK):
+        rows = [dict(cv_id=rnd.randint(1, seekers), job_id=rnd.randint(1, jobs), status=rnd.choice(STATUSES),
+                     applied_date=now - timedelta(minutes=rnd.randint(0, 365 * 24 * 60)))
+                for _ in range(start, min(start + CHUNK, applications))]
+        with engine.begin() as conn:
+            conn.execute(insert(Application), rows)
+        print(f"  seeded {start + len(rows):,} applications", end='\r', flush=True)
+    print()
+
+
+def seeded_size(engine):
+    try:
+        with Session(engine) as session:
+            return (session.scalar(select(func.count()).select_from(Job)),
+                    session.scalar(select(func.count()).select_from(Application)))
+    except Exception:
+        return None
+
+
+def page(session, query):
+    """COUNT(*) + một trang, giống paginate() với count cold."""
+    total = session.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+    rows = session.scalars(query.order_by(Application.applied_date.desc(), Application.id.desc())
+                           .limit(PER_PAGE)).all()
+    return total, rows
+
+
+def in_list_feed(session, user_id, filters):
+    company = session.scalars(select(Company).filter_by(user_id=user_id)).first()
+    job_ids = session.scalars(select(Job.id).where(Job.company_id == company.id)).all()
+    query = select(Application).where(Application.job_id.in_(job_ids))
+    if filters.get('status'):
+        query = query.where(Application.status == filters['status'])
+    if filters.get('applied_from'):
+        query = query.where(Application.applied_date >= filters['applied_from'])
+    if filters.get('applied_to'):
+        query = query.where(Application.applied_date < filters['applied_to'])
+    return page(session, query)
+
+
+def join_feed(session, user_id, filters):
+    # Câu query thật của dao, chỉ lấy statement để chạy trên engine của benchmark
+    return page(session, dao.company_applications_query(user_id, **filters).statement)
+
+
+def measure(engine, fn, user_id, filters, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        with Session(engine) as session:
+            started = time.perf_counter()
+            result = fn(session, user_id, filters)
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-url', default='sqlite:///' + os.path.join(tempfile.gettempdir(),
+                                                                        'recruiter_feed_bench.sqlite'))
+    parser.add_argument('--companies', type=int, default=200)
+    parser.add_argument('--jobs', type=int, default=10000)
+    parser.add_argument('--applications', type=int, default=1000000)
+    parser.add_argument('--seekers', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--reseed', action='store_true', help='seed lại kể cả khi DB đã có dữ liệu')
+    args = parser.parse_args()
+
+    engine = create_engine(args.db_url)
+    if args.reseed or seeded_size(engine) != (args.jobs, args.applications):
+        print(f"Seeding {args.jobs:,} jobs / {args.applications:,} applications into {args.db_url}")
+        started = time.time()
+        seed(engine, args.companies, args.jobs, args.applications, args.seekers)
+        print(f"Seeded in {time.time() - started:.1f}s")
+
+    now = datetime.now()
+    cases = [
+        ('all', {}),
+        ('status=PENDING', {'status': ApplicationStatusEnum.PENDING}),
+        ('last 7 days', {'applied_from': now - timedelta(days=7)}),
+        ('PENDING, last 30 days', {'status': ApplicationStatusEnum.PENDING, 'applied_from': now - timedelta(days=30)}),
+    ]
+    recruiters = [('large (company 1)', 1), ('small (company 2)', 2)]
+
+    print(f"{'company':<18} {'filter':<22} {'rows':>8} {'in_list ms':>11} {'join ms':>9} {'speedup':>8}")
+    with app.app_context():
+        for label, user_id in recruiters:
+            for name, filters in cases:
+                legacy_ms, (legacy_total, legacy_rows) = measure(engine, in_list_feed, user_id, filters, args.repeat)
+                join_ms, (join_total, join_rows) = measure(engine, join_feed, user_id, filters, args.repeat)
+                assert legacy_total == join_total and [a.id for a in legacy_rows] == [a.id for a in join_rows]
+                print(f"{label:<18} {name:<22} {join_total:>8} {legacy_ms:>11.1f} {join_ms:>9.1f} "
+                      f"{legacy_ms / join_ms if join_ms else 0:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+    Benchmark fan-out tin nhắn Socket.IO qua message queue theo số worker process.
+
+    Mỗi worker là một socketio.Server dùng create_client_manager() của app với N client
+    giả cùng ở trong một room; một process publish M tin nhắn vào room đó qua
+    create_emitter(). Đo tổng số packet được giao tới client mỗi giây.
+
+        python benchmarks/socketio_fanout.py --queue redis://localhost:6379/15 --workers 1 2 4 8
+
+    Cần Redis đang chạy (memory:// không đi qua process khác).
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import socketio  # noqa: E402
+
+from app.realtime import create_client_manager, create_emitter  # noqa: E402
+
+ROOM = 'benchmark-room'
+
+
+def worker(url, channel, clients, expected, ready, results, timeout):
+    server = socketio.Server(client_manager=create_client_manager(url, channel), async_mode='threading')
+    delivered = 0
+    lock = threading.Lock()
+    done = threading.Event()
+    finished_at = None
+
+    def deliver(eio_sid, packet):
+        nonlocal delivered, finished_at
+        with lock:
+            delivered += 1
+            if delivered == expected:
+                finished_at = time.time()
+                done.set()
+
+    server._send_packet = deliver
+    server._send_eio_packet = deliver
+    server.manager_initialized = True
+    server.manager.initialize()
+    for i in range(clients):
+        sid = server.manager.connect(f'{os.getpid()}-{i}', '/')
+        server.manager.enter_room(sid, '/', ROOM)
+
+    ready.release()
+    done.wait(timeout)
+    results.put((delivered, finished_at))
+
+
+def run(url, workers, clients, messages, timeout):
+    channel = f'benchmark-{uuid.uuid4().hex}'
+    ready = multiprocessing.Semaphore(0)
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker,
+                                         args=(url, channel, clients, clients * messages, ready, results, timeout),
+                                         daemon=True)
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.acquire()
+    time.sleep(0.5)  # chờ các worker subscribe xong
+
+    emitter = create_emitter(url, channel)
+    started = time.time()
+    for i in range(messages):
+        emitter.emit('message', {'sender': 'benchmark', 'message': f'message {i}'}, room=ROOM, namespace='/')
+    published = time.time()
+
+    outcomes = [results.get(timeout=timeout + 5) for _ in processes]
+    for process in processes:
+        process.join(timeout=1)
+        if process.is_alive():
+            process.terminate()
+
+    delivered = sum(count for count, _ in outcomes)
+    finished = max((at for _, at in outcomes if at), default=None)
+    elapsed = (finished or time.time()) - started
+    return {
+        'workers': workers,
+        'clients': workers * clients,
+        'delivered': delivered,
+        'expected': workers * clients * messages,
+        'publish_s': published - started,
+        'elapsed_s': elapsed,
+        'deliveries_per_s': delivered / elapsed if elapsed else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queue', default=os.getenv('SOCKETIO_MESSAGE_QUEUE', 'redis://localhost:6379/15'))
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=50, help='client mỗi worker')
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    if args.queue.startswith('memory://'):
+        parser.error('memory:// chỉ hoạt động trong một process, hãy dùng redis://')
+    if args.queue.startswith(('redis://', 'rediss://')):
+        import redis
+        try:
+            redis.Redis.from_url(args.queue).ping()
+        except redis.RedisError as e:
+            parser.exit(1, f"Cannot connect to {args.queue}: {e}\n")
+
+    print(f"{'workers':>7} {'clients':>8} {'delivered':>12} {'publish s':>10} {'total s':>8} {'deliveries/s':>13}")
+    for workers in args.workers:
+        r = run(args.queue, workers, args.clients, args.messages, args.timeout)
+        lost = '' if r['delivered'] == r['expected'] else f"  (expected {r['expected']})"
+        print(f"{r['workers']:>7} {r['clients']:>8} {r['delivered']:>12} {r['publish_s']:>10.2f} "
+              f"{r['elapsed_s']:>8.2f} {r['deliveries_per_s']:>13.0f}{lost}")
+
+
+if __name__ == '__main__':
+    main()
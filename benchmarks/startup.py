@@ -0,0 +1,109 @@
+"""
+    Benchmark thời gian khởi động: mỗi lần đo chạy trong một process Python mới (cold start).
+
+        import    `import app` (Flask, extension, module tính năng chưa import)
+        routes    `import app.index` sau khi đã import app (create_app: config, extension, route, hook)
+        tests     chạy cả test suite (python -m unittest discover tests)
+
+    --top N in ra N module tốn thời gian nhất khi `import app.index` (python -X importtime).
+    Biến môi trường của process hiện tại được truyền xuống, ví dụ SOCKETIO_ASYNC_MODE=threading.
+
+        python benchmarks/startup.py --runs 5 --top 15
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+IMPORT_SCRIPT = """
+import time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+import app.index
+print((imported - started) * 1000, (time.perf_counter() - imported) * 1000)
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-url', default='sqlite:///:memory:')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=0)
+    parser.add_argument('--skip-tests', action='store_true')
+    return parser.parse_args()
+
+
+def environment(db_url):
+    env = dict(os.environ, DATABASE_URL=db_url, PYTHONDONTWRITEBYTECODE='1')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+    return env
+
+
+def measure_imports(env, runs):
+    imports, routes = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT], cwd=ROOT, env=env, check=True,
+                             capture_output=True, text=True).stdout.split()
+        imports.append(float(out[-2]))
+        routes.append(float(out[-1]))
+    return imports, routes
+
+
+def measure_tests(env, runs):
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, '-m', 'unittest', 'discover', '-s', 'tests', '-t', '.'],
+                                cwd=ROOT, env=env, capture_output=True, text=True)
+        durations.append((time.perf_counter() - started) * 1000)
+        if result.returncode != 0:
+            print(result.stderr[-2000:])
+            raise SystemExit('test suite failed')
+    return durations
+
+
+def slowest_imports(env, top):
+    """Thư viện được module app.* import trực tiếp, tốn nhiều thời gian nhất (tính cả module con)."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app.index'], cwd=ROOT, env=env,
+                            check=True, capture_output=True, text=True).stderr
+    # importtime in module con trước module cha; thụt lề 2 dấu cách mỗi cấp
+    rows, pending = [], []
+    for line in stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|( +)(\S+)', line)
+        if not match:
+            continue
+        depth, name = len(match.group(2)) // 2, match.group(3)
+        children = [child for child in pending if child[0] == depth + 1]
+        pending = [child for child in pending if child[0] <= depth] + [(depth, name, int(match.group(1)))]
+        if name == 'app' or name.startswith('app.'):
+            rows.extend((us / 1000, child) for _, child, us in children
+                        if child != 'app' and not child.startswith('app.'))
+    return sorted(rows, reverse=True)[:top]
+
+
+def report(name, values):
+    print(f"{name:<8} median {statistics.median(values):8.1f} ms   min {min(values):8.1f} ms   (n={len(values)})")
+
+
+def main():
+    args = parse_args()
+    env = environment(args.db_url)
+    imports, routes = measure_imports(env, args.runs)
+    report('import', imports)
+    report('routes', routes)
+    if not args.skip_tests:
+        report('tests', measure_tests(env, max(1, args.runs // 2)))
+    if args.top:
+        print("\nslowest imports (import app.index):")
+        for ms, name in slowest_imports(env, args.top):
+            print(f"  {ms:8.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""outbox, stats rollups, cv upload state, full-text search
+
+Bảng và cột thêm trong đợt tối ưu hiệu năng:
+    outbox_mail                  hàng đợi email (app/mailer.py)
+    company_month_stat, job_stat bộ đếm dashboard nhà tuyển dụng (app/stats.py), tính lại từ
+                                 job/application ngay khi tạo bảng
+    cv.upload_status/upload_key  upload CV ở thread nền (app/uploads.py); CV cũ là READY,
+                                 file_path được phép NULL khi đang upload lần đầu
+    tìm kiếm (app/search.py)     MySQL: FULLTEXT ft_job_search, ft_tag_name
+                                 SQLite: bảng FTS5 job_fts + trigger đồng bộ, nạp sẵn job hiện có
+Như revision index, phần nào đã có (DB tạo bằng db.create_all() với model mới) thì bỏ qua.
+DDL FTS được chép từ app/models.py tại thời điểm này, không import model.
+
+Revision ID: 3f6d2a8e9c41
+Revises: 8179d6ca38de
+Create Date: 2026-10-18 21:12:09.518204
+
+"""
+from collections import Counter
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6d2a8e9c41'
+down_revision = '8179d6ca38de'
+branch_labels = None
+depends_on = None
+
+STAT_COLUMNS = ('applications', 'pending', 'confirmed', 'accepted', 'rejected')
+# Trạng thái đơn có cột riêng trong bảng rollup (như app/stats.py STATUS_COLUMNS)
+STATUS_COLUMNS = {'PENDING': 'pending', 'CONFIRMED': 'confirmed', 'ACCEPTED': 'accepted', 'REJECTED': 'rejected'}
+
+_JOB_FTS_TAGS = ("(SELECT group_concat(tag.name, ' ') FROM tag JOIN tag_job ON tag_job.tag_id = tag.id "
+                 "WHERE tag_job.job_id = {job_id})")
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS job_fts USING fts5(title, description, requirements, tags)",
+    "CREATE TRIGGER IF NOT EXISTS job_fts_ai AFTER INSERT ON job BEGIN "
+    "INSERT INTO job_fts(rowid, title, description, requirements, tags) "
+    "VALUES (new.id, new.title, new.description, new.requirements, ''); END",
+    "CREATE TRIGGER IF NOT EXISTS job_fts_au AFTER UPDATE OF title, description, requirements ON job BEGIN "
+    "UPDATE job_fts SET title = new.title, description = new.description, requirements = new.requirements "
+    "WHERE rowid = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS job_fts_ad AFTER DELETE ON job BEGIN "
+    "DELETE FROM job_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS job_fts_tag_ai AFTER INSERT ON tag_job BEGIN "
+    "UPDATE job_fts SET tags = " + _JOB_FTS_TAGS.format(job_id='new.job_id') + " WHERE rowid = new.job_id; END",
+    "CREATE TRIGGER IF NOT EXISTS job_fts_tag_ad AFTER DELETE ON tag_job BEGIN "
+    "UPDATE job_fts SET tags = " + _JOB_FTS_TAGS.format(job_id='old.job_id') + " WHERE rowid = old.job_id; END",
+    "CREATE TRIGGER IF NOT EXISTS job_fts_tag_au AFTER UPDATE OF name ON tag BEGIN "
+    "UPDATE job_fts SET tags = " + _JOB_FTS_TAGS.format(job_id='job_fts.rowid') +
+    " WHERE rowid IN (SELECT job_id FROM tag_job WHERE tag_id = new.id); END",
+    # Job có trước revision này
+    "INSERT INTO job_fts(rowid, title, description, requirements, tags) "
+    "SELECT job.id, job.title, job.description, job.requirements, coalesce(" + _JOB_FTS_TAGS.format(job_id='job.id') +
+    ", '') FROM job WHERE job.id NOT IN (SELECT rowid FROM job_fts)",
+]
+SQLITE_FTS_OBJECTS = ('job_fts_tag_au', 'job_fts_tag_ad', 'job_fts_tag_ai', 'job_fts_ad', 'job_fts_au', 'job_fts_ai')
+
+MYSQL_FULLTEXT = [
+    ('ft_job_search', 'job', 'title, description, requirements'),
+    ('ft_tag_name', 'tag', 'name'),
+]
+
+job = sa.table('job', sa.column('id'), sa.column('company_id'), sa.column('created_date'))
+application = sa.table('application', sa.column('job_id'), sa.column('status'), sa.column('applied_date'))
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def _is_mysql():
+    return op.get_bind().dialect.name in ('mysql', 'mariadb')
+
+
+def _stat_counters():
+    return [sa.Column(name, sa.Integer(), nullable=False) for name in STAT_COLUMNS]
+
+
+def _create_tables(existing):
+    created = set()
+    if 'outbox_mail' not in existing:
+        op.create_table(
+            'outbox_mail',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('recipient', sa.String(length=255), nullable=False),
+            sa.Column('sender', sa.String(length=255), nullable=True),
+            sa.Column('subject', sa.String(length=255), nullable=True),
+            sa.Column('body', sa.Text(), nullable=True),
+            sa.Column('status', sa.Enum('PENDING', 'SENDING', 'SENT', 'FAILED', name='mailstatusenum'),
+                      nullable=False),
+            sa.Column('attempts', sa.Integer(), nullable=False),
+            sa.Column('last_error', sa.Text(), nullable=True),
+            sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+            sa.Column('created_date', sa.DateTime(), nullable=True),
+            sa.Column('sent_date', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_outbox_mail_status', 'outbox_mail', ['status'])
+        op.create_index('ix_outbox_mail_next_attempt_at', 'outbox_mail', ['next_attempt_at'])
+    if 'company_month_stat' not in existing:
+        op.create_table(
+            'company_month_stat',
+            sa.Column('company_id', sa.Integer(), nullable=False),
+            sa.Column('year', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('month', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('jobs', sa.Integer(), nullable=False),
+            *_stat_counters(),
+            sa.ForeignKeyConstraint(['company_id'], ['company.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('company_id', 'year', 'month'),
+        )
+        created.add('company_month_stat')
+    if 'job_stat' not in existing:
+        op.create_table(
+            'job_stat',
+            sa.Column('job_id', sa.Integer(), autoincrement=False, nullable=False),
+            *_stat_counters(),
+            sa.ForeignKeyConstraint(['job_id'], ['job.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('job_id'),
+        )
+        created.add('job_stat')
+    return created
+
+
+def _alter_cv():
+    columns = {column['name'] for column in _inspector().get_columns('cv')}
+    if 'upload_status' in columns:
+        return
+    upload_status = sa.Enum('PENDING', 'READY', 'FAILED', name='uploadstatusenum')
+    with op.batch_alter_table('cv') as batch:
+        # server_default chỉ để điền READY cho CV đã có, bỏ ngay bên dưới (model dùng default phía Python)
+        batch.add_column(sa.Column('upload_status', upload_status, nullable=False, server_default='READY'))
+        batch.add_column(sa.Column('upload_key', sa.String(length=255), nullable=True))
+        batch.alter_column('file_path', existing_type=sa.String(length=255), nullable=True)
+    with op.batch_alter_table('cv') as batch:
+        batch.alter_column('upload_status', existing_type=upload_status, existing_nullable=False,
+                           server_default=None)
+
+
+def _backfill_stats(created):
+    """Tính bộ đếm cho bảng rollup vừa tạo từ job/application hiện có (giống app/stats.py rebuild)."""
+    bind = op.get_bind()
+    if 'company_month_stat' in created:
+        job_year, job_month = sa.extract('year', job.c.created_date), sa.extract('month', job.c.created_date)
+        app_year, app_month = sa.extract('year', application.c.applied_date), \
+            sa.extract('month', application.c.applied_date)
+        months = {}
+        for company_id, year, month, n in bind.execute(
+                sa.select(job.c.company_id, job_year, job_month, sa.func.count())
+                .where(job.c.company_id.isnot(None), job.c.created_date.isnot(None))
+                .group_by(job.c.company_id, job_year, job_month)):
+            months.setdefault((company_id, int(year), int(month)), Counter())['jobs'] += n
+        for company_id, year, month, status, n in bind.execute(
+                sa.select(job.c.company_id, app_year, app_month, application.c.status, sa.func.count())
+                .join(job, job.c.id == application.c.job_id)
+                .where(job.c.company_id.isnot(None), application.c.applied_date.isnot(None))
+                .group_by(job.c.company_id, app_year, app_month, application.c.status)):
+            counter = months.setdefault((company_id, int(year), int(month)), Counter())
+            counter['applications'] += n
+            if status in STATUS_COLUMNS:
+                counter[STATUS_COLUMNS[status]] += n
+        if months:
+            op.bulk_insert(sa.table('company_month_stat', *(sa.column(c) for c in
+                                                           ('company_id', 'year', 'month', 'jobs') + STAT_COLUMNS)),
+                           [dict(company_id=company_id, year=year, month=month,
+                                 **{c: counter[c] for c in ('jobs',) + STAT_COLUMNS})
+                            for (company_id, year, month), counter in months.items()])
+
+    if 'job_stat' in created:
+        per_job = {}
+        for job_id, status, n in bind.execute(
+                sa.select(application.c.job_id, application.c.status, sa.func.count())
+                .join(job, job.c.id == application.c.job_id)
+                .group_by(application.c.job_id, application.c.status)):
+            counter = per_job.setdefault(job_id, Counter())
+            counter['applications'] += n
+            if status in STATUS_COLUMNS:
+                counter[STATUS_COLUMNS[status]] += n
+        if per_job:
+            op.bulk_insert(sa.table('job_stat', *(sa.column(c) for c in ('job_id',) + STAT_COLUMNS)),
+                           [dict(job_id=job_id, **{c: counter[c] for c in STAT_COLUMNS})
+                            for job_id, counter in per_job.items()])
+
+
+def _create_search_indexes():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for ddl in SQLITE_FTS:
+            op.execute(ddl)
+    elif _is_mysql():
+        for name, table, columns in MYSQL_FULLTEXT:
+            if name not in {index['name'] for index in _inspector().get_indexes(table)}:
+                op.execute(f"ALTER TABLE {table} ADD FULLTEXT INDEX {name} ({columns})")
+
+
+def upgrade():
+    created = _create_tables(set(_inspector().get_table_names()))
+    _alter_cv()
+    _backfill_stats(created)
+    _create_search_indexes()
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for trigger in SQLITE_FTS_OBJECTS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS job_fts")
+    elif _is_mysql():
+        for name, table, columns in reversed(MYSQL_FULLTEXT):
+            if name in {index['name'] for index in _inspector().get_indexes(table)}:
+                op.drop_index(name, table_name=table)
+
+    # CV chưa upload xong (file_path NULL): schema cũ bắt buộc có file_path
+    op.execute("UPDATE cv SET file_path = '' WHERE file_path IS NULL")
+    with op.batch_alter_table('cv') as batch:
+        batch.alter_column('file_path', existing_type=sa.String(length=255), nullable=False)
+        batch.drop_column('upload_key')
+        batch.drop_column('upload_status')
+
+    op.drop_table('job_stat')
+    op.drop_table('company_month_stat')
+    op.drop_index('ix_outbox_mail_next_attempt_at', table_name='outbox_mail')
+    op.drop_index('ix_outbox_mail_status', table_name='outbox_mail')
+    op.drop_table('outbox_mail')
@@ -0,0 +1,41 @@
+"""avatar upload state
+
+user.avatar_upload_status/avatar_upload_key: upload avatar ở thread nền có trạng thái lưu
+trong DB như CV (app/uploads.py), để requeue_uploads đẩy lại avatar còn PENDING sau khi
+process bị dừng đột ngột. User đã có là READY. Cột đã có (DB tạo bằng db.create_all() với
+model mới) thì bỏ qua.
+
+Revision ID: 5a9e1c7b3d20
+Revises: 3f6d2a8e9c41
+Create Date: 2026-10-18 23:40:12.318845
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a9e1c7b3d20'
+down_revision = '3f6d2a8e9c41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('user')}
+    if 'avatar_upload_status' in columns:
+        return
+    upload_status = sa.Enum('PENDING', 'READY', 'FAILED', name='uploadstatusenum')
+    with op.batch_alter_table('user') as batch:
+        # server_default chỉ để điền READY cho user đã có, bỏ ngay bên dưới (model dùng default phía Python)
+        batch.add_column(sa.Column('avatar_upload_status', upload_status, nullable=False, server_default='READY'))
+        batch.add_column(sa.Column('avatar_upload_key', sa.String(length=255), nullable=True))
+    with op.batch_alter_table('user') as batch:
+        batch.alter_column('avatar_upload_status', existing_type=upload_status, existing_nullable=False,
+                           server_default=None)
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch:
+        batch.drop_column('avatar_upload_key')
+        batch.drop_column('avatar_upload_status')
@@ -0,0 +1,65 @@
+"""hot path indexes
+
+Index cho các query nóng trong app/dao.py (xem __table_args__ trong app/models.py và
+tests/test_query_plans.py). Index đã có (DB tạo bằng db.create_all() sau khi model có
+index) thì bỏ qua, nên chạy được trên mọi DB đã stamp baseline.
+
+Revision ID: 8179d6ca38de
+Revises: b1c84d26573f
+Create Date: 2026-10-18 16:55:47.636145
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8179d6ca38de'
+down_revision = 'b1c84d26573f'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # (tên, bảng, cột)
+    ('ix_job_company_id', 'job', ['company_id', 'id']),
+    ('ix_job_status_expiration', 'job', ['status', 'expiration_date']),
+    ('ix_job_status_created', 'job', ['status', 'created_date']),
+    ('ix_application_job_status_applied', 'application', ['job_id', 'status', 'applied_date']),
+    ('ix_application_cv_id', 'application', ['cv_id']),
+    ('ix_resume_user_id', 'resume', ['user_id']),
+    ('ix_cv_resume_id', 'cv', ['resume_id']),
+    ('ix_interview_application_id', 'interview', ['application_id']),
+    ('ix_message_conversation_timestamp', 'message', ['conversation_id', 'timestamp']),
+    ('ix_notification_user_read_created', 'notification', ['user_id', 'is_read', 'created_date']),
+    ('ix_conversation_user_user', 'conversation_user', ['user_id', 'conversation_id']),
+    ('ix_conversation_user_conversation', 'conversation_user', ['conversation_id', 'user_id']),
+]
+
+
+def _existing_indexes(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    existing = {}
+    for name, table, columns in INDEXES:
+        if table not in existing:
+            existing[table] = _existing_indexes(table)
+        if name not in existing[table]:
+            op.create_index(name, table, columns)
+
+
+def _foreign_key_columns(table):
+    return {column for fk in sa.inspect(op.get_bind()).get_foreign_keys(table) for column in fk['constrained_columns']}
+
+
+def downgrade():
+    bind = op.get_bind()
+    for name, table, columns in reversed(INDEXES):
+        if name not in _existing_indexes(table):
+            continue
+        # MySQL bỏ index tự tạo cho khóa ngoại khi đã có index khác dùng được, nên index
+        # bắt đầu bằng cột khóa ngoại không xóa được (error 1553): giữ lại
+        if bind.dialect.name in ('mysql', 'mariadb') and columns[0] in _foreign_key_columns(table):
+            continue
+        op.drop_index(name, table_name=table)
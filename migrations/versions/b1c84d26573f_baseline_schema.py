@@ -0,0 +1,193 @@
+"""baseline schema
+
+Schema trước khi có migration (các bảng db.create_all() tạo ra trước đợt tối ưu hiệu năng).
+    DB mới:                         flask --app app.index db upgrade
+    DB đang chạy (tạo bằng create_all, chưa có outbox_mail/job_stat...):
+                                    flask --app app.index db stamp b1c84d26573f && flask --app app.index db upgrade
+    DB tạo bằng create_all với model hiện tại: flask --app app.index db stamp head
+
+Revision ID: b1c84d26573f
+Revises: 
+Create Date: 2026-10-18 16:55:46.340002
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b1c84d26573f'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+ROLE = sa.Enum('ADMIN', 'JOBSEEKER', 'RECRUITER', name='roleenum')
+EMPLOYMENT = sa.Enum('FULLTIME', 'PARTTIME', name='employmentenum')
+JOB_STATUS = sa.Enum('DRAFT', 'POSTED', 'DELETED', 'EXPIRED', name='jobstatusenum')
+APPLICATION_STATUS = sa.Enum('DRAFT', 'PENDING', 'REJECTED', 'CONFIRMED', 'ACCEPTED', 'DELETED',
+                             name='applicationstatusenum')
+
+
+def upgrade():
+    op.create_table(
+        'user',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('username', sa.String(length=50), nullable=False),
+        sa.Column('password', sa.String(length=255), nullable=False),
+        sa.Column('first_name', sa.String(length=50), nullable=True),
+        sa.Column('last_name', sa.String(length=50), nullable=True),
+        sa.Column('email', sa.String(length=100), nullable=False),
+        sa.Column('role', ROLE, nullable=True),
+        sa.Column('avatar', sa.Text(), nullable=True),
+        sa.Column('joined_date', sa.DateTime(), nullable=True),
+        sa.Column('phone', sa.String(length=20), nullable=True),
+        sa.Column('last_login', sa.DateTime(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('is_recruiter', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+        sa.UniqueConstraint('username'),
+    )
+    op.create_table(
+        'category',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('description', sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'conversation',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('created_date', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'tag',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'company',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('website', sa.String(length=255), nullable=True),
+        sa.Column('introduction', sa.Text(), nullable=True),
+        sa.Column('company_name', sa.String(length=255), nullable=True),
+        sa.Column('industry', sa.String(length=100), nullable=True),
+        sa.Column('company_size', sa.String(length=50), nullable=True),
+        sa.Column('address', sa.String(length=100), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id'),
+    )
+    op.create_table(
+        'resume',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('skill', sa.String(length=255), nullable=True),
+        sa.Column('experience', sa.String(length=255), nullable=True),
+        sa.Column('education', sa.String(length=255), nullable=True),
+        sa.Column('preferred_locations', sa.String(length=255), nullable=True),
+        sa.Column('preferred_job_types', sa.String(length=255), nullable=True),
+        sa.Column('linkedin_url', sa.String(length=255), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'message',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('content', sa.Text(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.Column('is_read', sa.Boolean(), nullable=True),
+        sa.Column('conversation_id', sa.Integer(), nullable=True),
+        sa.Column('sender_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['conversation_id'], ['conversation.id']),
+        sa.ForeignKeyConstraint(['sender_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'conversation_user',
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('conversation_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['conversation_id'], ['conversation.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+    )
+    op.create_table(
+        'notification',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('content', sa.Text(), nullable=True),
+        sa.Column('is_read', sa.Boolean(), nullable=True),
+        sa.Column('created_date', sa.DateTime(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'job',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('title', sa.String(length=100), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('requirements', sa.Text(), nullable=True),
+        sa.Column('location', sa.String(length=100), nullable=True),
+        sa.Column('salary', sa.Float(), nullable=True),
+        sa.Column('employment_type', EMPLOYMENT, nullable=True),
+        sa.Column('status', JOB_STATUS, nullable=True),
+        sa.Column('expiration_date', sa.DateTime(), nullable=True),
+        sa.Column('created_date', sa.DateTime(), nullable=True),
+        sa.Column('updated_date', sa.DateTime(), nullable=True),
+        sa.Column('view_count', sa.Integer(), nullable=True),
+        sa.Column('company_id', sa.Integer(), nullable=True),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['category_id'], ['category.id']),
+        sa.ForeignKeyConstraint(['company_id'], ['company.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'cv',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('title', sa.String(length=100), nullable=False),
+        sa.Column('file_path', sa.String(length=255), nullable=False),
+        sa.Column('is_default', sa.Boolean(), nullable=True),
+        sa.Column('created_date', sa.DateTime(), nullable=True),
+        sa.Column('updated_date', sa.DateTime(), nullable=True),
+        sa.Column('resume_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['resume_id'], ['resume.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'tag_job',
+        sa.Column('tag_id', sa.Integer(), nullable=True),
+        sa.Column('job_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['job.id']),
+        sa.ForeignKeyConstraint(['tag_id'], ['tag.id']),
+    )
+    op.create_table(
+        'application',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('cover_letter', sa.Text(), nullable=True),
+        sa.Column('status', APPLICATION_STATUS, nullable=True),
+        sa.Column('applied_date', sa.DateTime(), nullable=True),
+        sa.Column('updated_date', sa.DateTime(), nullable=True),
+        sa.Column('feedback', sa.Text(), nullable=True),
+        sa.Column('cv_id', sa.Integer(), nullable=True),
+        sa.Column('job_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['cv_id'], ['cv.id']),
+        sa.ForeignKeyConstraint(['job_id'], ['job.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'interview',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('dateTime', sa.DateTime(), nullable=True),
+        sa.Column('url', sa.String(length=255), nullable=True),
+        sa.Column('application_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['application_id'], ['application.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade():
+    for table in ('interview', 'application', 'tag_job', 'cv', 'job', 'notification', 'conversation_user',
+                  'message', 'resume', 'company', 'tag', 'conversation', 'category', 'user'):
+        op.drop_table(table)
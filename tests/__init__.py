@@ -0,0 +1,9 @@
+import os
+
+# App mặc định (app.index) tạo engine ngay trong create_app: phải chọn DB trước khi import.
+# Test luôn chạy trên SQLite in-memory (tearDown gọi db.drop_all()), không bao giờ trên DB thật;
+# TEST_DATABASE_URL để chạy trên DB khác dành riêng cho test.
+os.environ['DATABASE_URL'] = os.getenv('TEST_DATABASE_URL', 'sqlite:///:memory:')
+os.environ.pop('DATABASE_REPLICA_URLS', None)
+
+import app.index  # noqa: E402,F401  (tạo app mặc định trước khi chạy test)
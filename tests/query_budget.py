@@ -0,0 +1,16 @@
+from app.query_stats import capture_queries
+
+
+class QueryBudgetMixin:
+    """
+    Cho TestCase có self.client:
+        response = self.assertQueryBudget(4, '/jobs')
+    Gửi request và fail nếu số câu SQL vượt budget (in ra các câu đã chạy để dễ tìm N+1).
+    """
+
+    def assertQueryBudget(self, budget, url, method='GET', **kwargs):
+        with capture_queries() as stats:
+            response = self.client.open(url, method=method, **kwargs)
+        if stats.count > budget:
+            self.fail(f"{method} {url}: {stats.count} queries > budget {budget}\n" + '\n'.join(stats.statements))
+        return response
@@ -0,0 +1,113 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from app import db, create_app, search, metrics, socketio
+from app.cache import get_cache
+from app.index import app
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def loaded_modules(*names, **env):
+    """Chạy `import app.index` trong process mới, trả về các module trong `names` đã được import."""
+    script = ("import sys, app.index; "
+              f"print(' '.join(name for name in {names!r} if name in sys.modules))")
+    env = dict(os.environ, DATABASE_URL='sqlite:///:memory:', **env)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env, capture_output=True, text=True,
+                            check=True)
+    return set(result.stdout.split())
+
+
+class TestCreateApp(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.uri = f"sqlite:///{os.path.join(self.tmp.name, 'factory.sqlite')}"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_config_override(self):
+        other = create_app(dict(SQLALCHEMY_DATABASE_URI=self.uri, PAGE_SIZE=3, SOCKETIO_ENABLED=False))
+        self.assertEqual(other.config['PAGE_SIZE'], 3)
+        self.assertEqual(other.config['SQLALCHEMY_ENGINE_OPTIONS'], {})
+        self.assertEqual(other.config['SQLALCHEMY_BINDS'], {})
+        self.assertEqual(app.config['PAGE_SIZE'], 8)
+        with other.app_context():
+            self.assertEqual(str(db.engine.url), self.uri)
+            self.assertNotIn('socketio', other.extensions)
+
+    def test_google_login_registered_only_when_configured(self):
+        self.assertNotIn('google', create_app(dict(SOCKETIO_ENABLED=False)).blueprints)
+        configured = create_app(dict(GOOGLE_OAUTH_CLIENT_ID='id', GOOGLE_OAUTH_CLIENT_SECRET='secret',
+                                     SOCKETIO_ENABLED=False))
+        self.assertIn('google', configured.blueprints)
+
+    def test_migrate_commands_loaded_on_demand(self):
+        other = create_app(dict(SQLALCHEMY_DATABASE_URI=self.uri, SOCKETIO_ENABLED=False))
+        self.assertNotIn('migrate', other.extensions)
+        result = other.test_cli_runner().invoke(args=['db', '--help'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('upgrade', result.output)
+        self.assertIn('migrate', other.extensions)
+
+    def test_routes_and_hooks_on_new_app(self):
+        other = create_app(dict(SQLALCHEMY_DATABASE_URI=self.uri, SOCKETIO_ENABLED=False, TESTING=True,
+                                QUERY_STATS=True, QUERY_STATS_HISTORY=2))
+        for endpoint in ('index', 'job', 'metrics', 'debug_queries'):
+            self.assertIn(endpoint, other.view_functions)
+        with other.app_context():
+            db.create_all()
+            try:
+                client = other.test_client()
+                for _ in range(3):
+                    response = client.get('/jobs')
+                    self.assertEqual(response.status_code, 200)
+                    self.assertIn('X-Query-Count', response.headers)
+                history = other.extensions['query_stats']
+                self.assertEqual((history.maxlen, len(history)), (2, 2))
+                self.assertIsNot(history, app.extensions['query_stats'])
+            finally:
+                db.session.remove()
+                db.engine.dispose()
+
+    def test_feature_modules_read_current_app_config(self):
+        other = create_app(dict(SQLALCHEMY_DATABASE_URI=self.uri, SOCKETIO_ENABLED=False, SEARCH_BACKEND='memory'))
+        with other.app_context():
+            self.assertIsInstance(search.get_backend(), search.InMemorySearchBackend)
+        with app.app_context():
+            self.assertNotIsInstance(search.get_backend(), search.InMemorySearchBackend)
+
+    def test_state_is_per_app(self):
+        other = create_app(dict(SQLALCHEMY_DATABASE_URI=self.uri, SOCKETIO_ENABLED=False, SEARCH_BACKEND='memory'))
+        create_app(dict(SQLALCHEMY_DATABASE_URI=self.uri, SOCKETIO_ENABLED=False))
+        with other.app_context():
+            state = get_cache(), metrics.current(), search.get_backend()
+        with app.app_context():
+            self.assertIsNot(get_cache(), state[0])
+            self.assertIsNot(metrics.current(), state[1])
+            self.assertNotIn(state[2], app.extensions.get('search', search._SearchState()).backends.values())
+        # Socket.IO handler không bị đăng ký lại theo mỗi create_app
+        self.assertEqual([name for name, _, _ in socketio.handlers].count('message'), 1)
+
+    def test_google_login_without_configuration(self):
+        app.config['TESTING'] = True
+        response = app.test_client().get('/login/google')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.location.endswith('/login'))
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_heavy_integrations_not_imported_at_startup(self):
+        # eventlet chỉ bị bỏ qua khi chọn async mode khác (mặc định tự chọn eventlet nếu có)
+        heavy = ('cloudinary', 'flask_migrate', 'alembic', 'flask_dance', 'eventlet')
+        self.assertEqual(loaded_modules(*heavy, SOCKETIO_ASYNC_MODE='threading'), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+import unittest
+import hashlib
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import event
+
+from app import db, dao
+from app.index import app
+from app.models import User, RoleEnum, Company, Category, Job, JobStatusEnum, EmploymentEnum, Resume, CV, \
+    Application, ApplicationStatusEnum, Interview
+
+
+class TestApplicationsPage(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        password = hashlib.md5('password123'.encode()).hexdigest()
+        self.recruiter = User(username='recruiter', password=password, email='recruiter@test.com',
+                              role=RoleEnum.RECRUITER)
+        self.jobseekers = [User(username=f'jobseeker{i}', password=password, email=f'jobseeker{i}@test.com',
+                                role=RoleEnum.JOBSEEKER) for i in range(3)]
+        db.session.add_all([self.recruiter] + self.jobseekers)
+        db.session.commit()
+
+        self.company = Company(user_id=self.recruiter.id, company_name='TestCorp')
+        self.categories = [Category(name=f'Category {i}') for i in range(3)]
+        db.session.add_all([self.company] + self.categories)
+        db.session.commit()
+
+        self.jobs = [Job(title=f'Job {i}', status=JobStatusEnum.POSTED, company_id=self.company.id,
+                         category_id=self.categories[i].id, employment_type=EmploymentEnum.FULLTIME, salary=1000)
+                     for i in range(3)]
+        self.resumes = [Resume(user_id=user.id, skill='Python') for user in self.jobseekers]
+        db.session.add_all(self.jobs + self.resumes)
+        db.session.commit()
+
+        self.cvs = [CV(title=f'CV {i}', file_path=f'/cv/{i}.pdf', resume_id=resume.id)
+                    for i, resume in enumerate(self.resumes)]
+        db.session.add_all(self.cvs)
+        db.session.commit()
+
+        self.recruiter_id = self.recruiter.id
+        self.statements = []
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def apply(self, cv, job, minutes_ago=0, interview=False):
+        application = Application(cv_id=cv.id, job_id=job.id, status=ApplicationStatusEnum.ACCEPTED,
+                                  applied_date=datetime.now() - timedelta(minutes=minutes_ago))
+        db.session.add(application)
+        db.session.commit()
+        if interview:
+            db.session.add(Interview(application_id=application.id, url=f'https://meet.test/{application.id}',
+                                     dateTime=datetime.now()))
+            db.session.commit()
+        return application
+
+    def _record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def count_queries(self, fn, expire=True):
+        if expire:
+            db.session.expire_all()
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+        try:
+            result = fn()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', self._record)
+        return len(self.statements), result
+
+    def render_page(self):
+        response = self.client.get('/applications')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def touch(self, applications):
+        # Mọi thuộc tính cardapply.html dùng tới
+        for a in applications:
+            (a.job.title, a.job.company.company_name, str(a.job.category), a.cv.file_path,
+             a.cv.resume.skill, a.cv.resume.user.avatar, a.interviews)
+
+    def test_jobseeker_page_loaded_in_fixed_queries(self):
+        self.apply(self.cvs[0], self.jobs[0], interview=True)
+        jobseeker = SimpleNamespace(id=self.jobseekers[0].id)  # DAO chỉ cần id
+        dao.load_applications_for_user(jobseeker, page=1, per_page=3)  # nạp count cache
+
+        one, _ = self.count_queries(lambda: self.touch(dao.load_applications_for_user(jobseeker, page=1,
+                                                                                         per_page=3).items))
+        self.apply(self.cvs[0], self.jobs[1], minutes_ago=1, interview=True)
+        self.apply(self.cvs[0], self.jobs[2], minutes_ago=2)
+        dao.load_applications_for_user(jobseeker, page=1, per_page=3)
+        three, page = self.count_queries(lambda: dao.load_applications_for_user(jobseeker, page=1, per_page=3))
+        touched, _ = self.count_queries(lambda: self.touch(page.items), expire=False)
+
+        # 1 query trang (JOIN) + 1 query interviews; truy cập thuộc tính không phát sinh query
+        self.assertEqual(three, 2)
+        self.assertEqual(one, three)
+        self.assertEqual(touched, 0)
+        self.assertEqual([a.job.title for a in page.items], ['Job 0', 'Job 1', 'Job 2'])
+        self.assertEqual(set(dao.get_interview_map(page.items)), {page.items[0].id, page.items[1].id})
+
+    def test_recruiter_route_query_count_independent_of_page_size(self):
+        self.apply(self.cvs[0], self.jobs[0], interview=True)
+        self.client.post('/login', data=dict(username='recruiter', password='password123'))
+        self.render_page()  # nạp cache badge/count
+        one, _ = self.count_queries(self.render_page)
+
+        self.apply(self.cvs[1], self.jobs[1], minutes_ago=1, interview=True)
+        self.apply(self.cvs[2], self.jobs[2], minutes_ago=2)
+        self.render_page()
+        three, response = self.count_queries(self.render_page)
+
+        self.assertEqual(one, three)
+        self.assertEqual(len([st for st in self.statements if 'FROM interview' in st]), 1)
+        for i in range(3):
+            self.assertIn(f'Category {i}'.encode(), response.data)
+        self.assertIn(b'https://meet.test/', response.data)
+
+    def test_jobseeker_route_query_count_independent_of_page_size(self):
+        self.apply(self.cvs[0], self.jobs[0])
+        self.client.post('/login', data=dict(username='jobseeker0', password='password123'))
+        self.render_page()
+        one, _ = self.count_queries(self.render_page)
+
+        self.apply(self.cvs[0], self.jobs[1], interview=True)
+        self.apply(self.cvs[0], self.jobs[2], interview=True)
+        self.render_page()
+        three, response = self.count_queries(self.render_page)
+        self.assertEqual(one, three)
+        self.assertIn(b'Job 2', response.data)
+
+    def test_jobseeker_sees_only_own_applications(self):
+        self.apply(self.cvs[0], self.jobs[0])
+        self.apply(self.cvs[1], self.jobs[1])
+        jobseeker = dao.get_user_by_id(self.jobseekers[1].id)
+        page = dao.load_applications_for_user(jobseeker, page=1, per_page=3)
+        self.assertEqual([a.job.title for a in page.items], ['Job 1'])
+
+    def test_recruiter_feed_joins_jobs_in_one_query(self):
+        self.apply(self.cvs[0], self.jobs[0], interview=True)
+        self.apply(self.cvs[1], self.jobs[1], minutes_ago=1)
+        dao.load_applications_for_company(self.recruiter_id, page=1, per_page=3)  # nạp count cache
+        count, page = self.count_queries(lambda: dao.load_applications_for_company(self.recruiter_id,
+                                                                                   page=1, per_page=3))
+
+        # 1 query trang (application JOIN job JOIN company) + 1 query interviews, không lấy job_id trước
+        self.assertEqual(count, 2)
+        self.assertIn('JOIN company', self.statements[0])
+        self.assertNotIn('FROM job', self.statements[0].split('JOIN')[0])
+        self.assertEqual([a.job.title for a in page.items], ['Job 0', 'Job 1'])
+        touched, _ = self.count_queries(lambda: self.touch(page.items), expire=False)
+        self.assertEqual(touched, 0)
+
+    def test_recruiter_feed_filters(self):
+        other = User(username='other', password='x', email='other@test.com', role=RoleEnum.RECRUITER)
+        db.session.add(other)
+        db.session.commit()
+        other_company = Company(user_id=other.id, company_name='OtherCorp')
+        db.session.add(other_company)
+        db.session.commit()
+        other_job = Job(title='Other job', status=JobStatusEnum.POSTED, company_id=other_company.id)
+        db.session.add(other_job)
+        db.session.commit()
+
+        self.apply(self.cvs[0], self.jobs[0], minutes_ago=3 * 24 * 60)
+        pending = self.apply(self.cvs[1], self.jobs[1])
+        pending.status = ApplicationStatusEnum.PENDING
+        db.session.commit()
+        self.apply(self.cvs[2], other_job)
+
+        def titles(**kwargs):
+            page = dao.load_applications_for_company(self.recruiter_id, page=1, per_page=10, **kwargs)
+            return [a.job.title for a in page.items]
+
+        self.assertEqual(titles(), ['Job 1', 'Job 0'])
+        self.assertEqual(titles(status=ApplicationStatusEnum.PENDING), ['Job 1'])
+        self.assertEqual(titles(applied_from=datetime.now() - timedelta(days=1)), ['Job 1'])
+        self.assertEqual(titles(applied_to=datetime.now() - timedelta(days=1)), ['Job 0'])
+        self.assertEqual(dao.load_applications_for_company(other.id, page=1, per_page=10).total, 1)
+        self.assertEqual(dao.load_applications_for_company(self.jobseekers[0].id, page=1, per_page=10).total, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,265 @@
+import unittest
+import hashlib
+from app import db
+from app.index import app
+from app.models import User, RoleEnum, Conversation
+from app import dao
+from sqlalchemy import event
+
+
+class TestConversationLoading(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        password = hashlib.md5('password123'.encode()).hexdigest()
+        self.jobseeker = User(username='jobseeker', password=password, email='jobseeker@test.com',
+                              role=RoleEnum.JOBSEEKER)
+        self.recruiters = [User(username=f'recruiter{i}', password=password, email=f'recruiter{i}@test.com',
+                                role=RoleEnum.RECRUITER) for i in range(3)]
+        self.outsider = User(username='outsider', password=password, email='outsider@test.com',
+                             role=RoleEnum.JOBSEEKER)
+        db.session.add_all([self.jobseeker, self.outsider] + self.recruiters)
+        db.session.commit()
+        self.conversations = [dao.get_or_create_conversation(self.jobseeker.id, r.id) for r in self.recruiters]
+        self.jobseeker_id, self.outsider_id = self.jobseeker.id, self.outsider.id
+        self.conversation_ids = [conv.id for conv in self.conversations]
+        db.session.expire_all()
+
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def conversation_queries(self):
+        return [st for st in self.statements if 'conversation' in st]
+
+    def test_load_user_does_not_load_conversations(self):
+        user = dao.get_user_by_id(self.jobseeker_id)
+        self.assertEqual(user.username, 'jobseeker')
+        self.assertEqual(len(self.statements), 1)
+        self.assertEqual(self.conversation_queries(), [])
+
+    def test_load_user_with_conversations_opt_in(self):
+        user = dao.get_user_by_id(self.jobseeker_id, with_conversations=True)
+        self.assertEqual(len(user.conversation), 3)
+        self.assertEqual(len(self.statements), 2)
+
+    def test_get_conversations_for_user_loads_users_in_two_queries(self):
+        convs = dao.get_conversations_for_user(self.jobseeker_id)
+        self.assertEqual(len(convs), 3)
+        usernames = {u.username for conv in convs for u in conv.users}
+        self.assertEqual(usernames, {'jobseeker', 'recruiter0', 'recruiter1', 'recruiter2'})
+        self.assertEqual(len(self.statements), 2)
+
+    def test_get_conversations_for_user_without_conversations(self):
+        self.assertEqual(dao.get_conversations_for_user(self.outsider_id), [])
+
+    def test_conversations_page_query_count_constant(self):
+        self.client.post('/login', data=dict(username='jobseeker', password='password123'))
+        self.statements.clear()
+        response = self.client.get('/conversations')
+        self.assertEqual(response.status_code, 200)
+        with_three = len(self.conversation_queries())
+
+        conv = dao.get_or_create_conversation(self.jobseeker_id, self.outsider_id)
+        self.assertIsInstance(conv, Conversation)
+        db.session.expire_all()
+        self.statements.clear()
+        response = self.client.get('/conversations')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'outsider', response.data)
+        self.assertEqual(len(self.conversation_queries()), with_three)
+
+    def test_chat_room_forbidden_for_non_member(self):
+        self.client.post('/login', data=dict(username='outsider', password='password123'))
+        response = self.client.get(f'/chat/{self.conversation_ids[0]}')
+        self.assertEqual(response.status_code, 403)
+
+    def test_chat_room_for_member(self):
+        self.client.post('/login', data=dict(username='jobseeker', password='password123'))
+        response = self.client.get(f'/chat/{self.conversation_ids[0]}')
+        self.assertEqual(response.status_code, 200)
+
+
+class TestChatHistory(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['CHAT_PAGE_SIZE'] = 5
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        password = hashlib.md5('password123'.encode()).hexdigest()
+        self.jobseeker = User(username='jobseeker', password=password, email='jobseeker@test.com',
+                              role=RoleEnum.JOBSEEKER, avatar='a.png')
+        self.recruiter = User(username='recruiter', password=password, email='recruiter@test.com',
+                              role=RoleEnum.RECRUITER, avatar='b.png')
+        self.outsider = User(username='outsider', password=password, email='outsider@test.com',
+                             role=RoleEnum.JOBSEEKER)
+        db.session.add_all([self.jobseeker, self.recruiter, self.outsider])
+        db.session.commit()
+        conv = dao.get_or_create_conversation(self.jobseeker.id, self.recruiter.id)
+        self.conversation_id = conv.id
+        senders = [self.jobseeker.id, self.recruiter.id]
+        self.message_ids = [dao.add_message(conv.id, senders[i % 2], f'message {i}').id for i in range(12)]
+
+    def tearDown(self):
+        app.config['CHAT_PAGE_SIZE'] = 30
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_get_messages_latest_first_with_senders(self):
+        history = dao.get_messages(self.conversation_id)
+        self.assertEqual([m.id for m in history.items], self.message_ids[::-1][:5])
+        self.assertTrue(history.has_next)
+
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        db.session.expire_all()
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            history = dao.get_messages(self.conversation_id)
+            senders = [m.sender.username for m in history.items]
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(len(senders), 5)
+        self.assertEqual(len(statements), 1)
+
+    def test_walk_older_pages(self):
+        seen, cursor = [], None
+        while True:
+            history = dao.get_messages(self.conversation_id, before=cursor)
+            seen.extend(m.id for m in history.items)
+            if not history.has_next:
+                break
+            cursor = history.next_cursor
+        self.assertEqual(seen, self.message_ids[::-1])
+
+    def test_chat_room_renders_latest_page(self):
+        self.client.post('/login', data=dict(username='jobseeker', password='password123'))
+        response = self.client.get(f'/chat/{self.conversation_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'message 11', response.data)
+        self.assertIn(b'message 7', response.data)
+        self.assertNotIn(b'message 6', response.data)
+
+    def test_messages_api_load_older(self):
+        self.client.post('/login', data=dict(username='recruiter', password='password123'))
+        cursor = dao.get_messages(self.conversation_id).next_cursor
+        response = self.client.get(f'/api/conversations/{self.conversation_id}/messages?before={cursor}')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        # Trả về theo thứ tự thời gian để chèn thẳng lên đầu khung chat
+        self.assertEqual([m['message'] for m in data['messages']], [f'message {i}' for i in range(2, 7)])
+        self.assertIsNotNone(data['older_cursor'])
+
+        response = self.client.get(f'/api/conversations/{self.conversation_id}/messages?before={data["older_cursor"]}')
+        data = response.get_json()
+        self.assertEqual([m['message'] for m in data['messages']], ['message 0', 'message 1'])
+        self.assertIsNone(data['older_cursor'])
+
+    def test_messages_api_forbidden_for_non_member(self):
+        self.client.post('/login', data=dict(username='outsider', password='password123'))
+        response = self.client.get(f'/api/conversations/{self.conversation_id}/messages')
+        self.assertEqual(response.status_code, 403)
+
+
+class TestConversationInbox(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        password = hashlib.md5('password123'.encode()).hexdigest()
+        self.jobseeker = User(username='jobseeker', password=password, email='jobseeker@test.com',
+                              role=RoleEnum.JOBSEEKER)
+        self.recruiters = [User(username=f'recruiter{i}', password=password, email=f'recruiter{i}@test.com',
+                                role=RoleEnum.RECRUITER) for i in range(2)]
+        db.session.add_all([self.jobseeker] + self.recruiters)
+        db.session.commit()
+        self.jobseeker_id = self.jobseeker.id
+        self.recruiter_ids = [r.id for r in self.recruiters]
+        self.conversation_ids = [dao.get_or_create_conversation(self.jobseeker_id, rid).id
+                                 for rid in self.recruiter_ids]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def count_inbox_queries(self):
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        db.session.expire_all()
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response = self.client.get('/conversations')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(response.status_code, 200)
+        return len(statements), response
+
+    def test_summaries_last_message_and_unread(self):
+        first, second = self.conversation_ids
+        dao.add_message(first, self.recruiter_ids[0], 'hello')
+        dao.add_message(first, self.recruiter_ids[0], 'are you there?')
+        dao.add_message(first, self.jobseeker_id, 'yes')
+        dao.add_message(second, self.recruiter_ids[1], 'interview tomorrow')
+
+        summaries = dao.get_conversation_summaries(self.jobseeker_id)
+        # Cuộc trò chuyện có tin nhắn mới nhất lên đầu
+        self.assertEqual([s.conversation.id for s in summaries], [second, first])
+        self.assertEqual([s.last_message.content for s in summaries], ['interview tomorrow', 'yes'])
+        self.assertEqual([s.unread for s in summaries], [1, 2])
+        self.assertEqual(summaries[0].recipient.username, 'recruiter1')
+
+        recruiter_view = dao.get_conversation_summaries(self.recruiter_ids[0])
+        self.assertEqual(recruiter_view[0].unread, 1)
+
+    def test_summary_without_messages(self):
+        summaries = dao.get_conversation_summaries(self.jobseeker_id)
+        self.assertEqual(len(summaries), 2)
+        self.assertTrue(all(s.last_message is None and s.unread == 0 for s in summaries))
+
+    def test_opening_chat_marks_messages_read(self):
+        dao.add_message(self.conversation_ids[0], self.recruiter_ids[0], 'hello')
+        self.client.post('/login', data=dict(username='jobseeker', password='password123'))
+        self.client.get(f'/chat/{self.conversation_ids[0]}')
+        summaries = dao.get_conversation_summaries(self.jobseeker_id)
+        self.assertEqual([s.unread for s in summaries], [0, 0])
+        # Tin nhắn của chính mình không bị đánh dấu bởi người gửi
+        self.assertEqual(dao.mark_conversation_read(self.conversation_ids[0], self.recruiter_ids[0]), 0)
+
+    def test_inbox_query_count_independent_of_history(self):
+        self.client.post('/login', data=dict(username='jobseeker', password='password123'))
+        dao.add_message(self.conversation_ids[0], self.recruiter_ids[0], 'first')
+        self.count_inbox_queries()  # lần đầu còn nạp badge thông báo vào cache
+        small, _ = self.count_inbox_queries()
+
+        for i in range(40):
+            dao.add_message(self.conversation_ids[i % 2], self.recruiter_ids[i % 2], f'message {i}')
+        large, response = self.count_inbox_queries()
+        self.assertEqual(small, large)
+        self.assertIn(b'message 39', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
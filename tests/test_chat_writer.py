@@ -0,0 +1,164 @@
+import unittest
+import hashlib
+import queue
+import threading
+from unittest.mock import patch
+
+from sqlalchemy import event
+
+from app import db, dao, socketio, chat_writer
+from app.index import app
+from app.chat_writer import MessageWriter
+from app.models import User, RoleEnum, Message
+
+
+class TestMessageWriter(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        password = hashlib.md5('password123'.encode()).hexdigest()
+        self.jobseeker = User(username='jobseeker', password=password, email='jobseeker@test.com',
+                              role=RoleEnum.JOBSEEKER)
+        self.recruiter = User(username='recruiter', password=password, email='recruiter@test.com',
+                              role=RoleEnum.RECRUITER)
+        db.session.add_all([self.jobseeker, self.recruiter])
+        db.session.commit()
+        self.jobseeker_id, self.recruiter_id = self.jobseeker.id, self.recruiter.id
+        self.conversation_id = dao.get_or_create_conversation(self.jobseeker_id, self.recruiter_id).id
+        self.writers = []
+
+    def tearDown(self):
+        for writer in self.writers:
+            writer.stop()
+        chat_writer.shutdown_writer()
+        app.extensions.pop('chat_writer', None)
+        app.config['CHAT_WRITE_BEHIND'] = False
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def writer(self, **kwargs):
+        kwargs.setdefault('retry_delay', 0)
+        writer = MessageWriter(**kwargs).start()
+        self.writers.append(writer)
+        return writer
+
+    def stored(self):
+        db.session.expire_all()
+        return Message.query.filter_by(conversation_id=self.conversation_id).order_by(Message.id).all()
+
+    def test_messages_persisted_in_submit_order(self):
+        writer = self.writer(batch_size=7, flush_interval=0.01)
+        submitted = [writer.submit(self.conversation_id, self.jobseeker_id, f'message {i}') for i in range(50)]
+        self.assertTrue(all(msg.id is None for msg in submitted))
+        writer.flush()
+
+        stored = self.stored()
+        self.assertEqual([m.content for m in stored], [f'message {i}' for i in range(50)])
+        self.assertEqual([m.timestamp for m in stored], [m.timestamp for m in submitted])
+
+    def test_batch_written_with_single_insert(self):
+        writer = MessageWriter()
+        rows = [dict(conversation_id=self.conversation_id, sender_id=self.recruiter_id, content=f'm{i}',
+                     timestamp=None, is_read=False) for i in range(20)]
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            writer._write(rows)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(len([st for st in statements if st.startswith('INSERT INTO message')]), 1)
+        self.assertEqual(len(self.stored()), 20)
+
+    def test_stop_drains_queue(self):
+        writer = self.writer(batch_size=5, flush_interval=1)
+        for i in range(30):
+            writer.submit(self.conversation_id, self.jobseeker_id, f'message {i}')
+        writer.stop()
+        self.assertFalse(writer.running)
+        self.assertEqual(len(self.stored()), 30)
+
+    def test_submit_after_stop_writes_synchronously(self):
+        writer = self.writer()
+        writer.stop()
+        writer.submit(self.conversation_id, self.jobseeker_id, 'late message')
+        self.assertEqual([m.content for m in self.stored()], ['late message'])
+
+    def test_full_queue_falls_back_to_synchronous_write(self):
+        writer = self.writer()
+        with patch.object(writer._queue, 'put', side_effect=queue.Full):
+            writer.submit(self.conversation_id, self.jobseeker_id, 'overflow')
+        self.assertEqual([m.content for m in self.stored()], ['overflow'])
+
+    def test_full_queue_keeps_message_order(self):
+        writer = self.writer(batch_size=1, max_queue=2, flush_interval=0.01, put_timeout=0.05)
+        real_insert = writer._insert
+        started, release = threading.Event(), threading.Event()
+
+        def slow_insert(rows):
+            started.set()
+            release.wait(5)
+            real_insert(rows)
+
+        with patch.object(writer, '_insert', side_effect=slow_insert):
+            writer.submit(self.conversation_id, self.jobseeker_id, 'message 0')
+            self.assertTrue(started.wait(5))  # thread ghi đang giữ 'message 0'
+            writer.submit(self.conversation_id, self.jobseeker_id, 'message 1')
+            writer.submit(self.conversation_id, self.jobseeker_id, 'message 2')
+            threading.Timer(0.2, release.set).start()
+            # Hàng đợi đầy: chờ hết put_timeout rồi ghi đồng bộ sau các tin nhắn đang chờ
+            writer.submit(self.conversation_id, self.jobseeker_id, 'message 3')
+        self.assertEqual([m.content for m in self.stored()], [f'message {i}' for i in range(4)])
+
+    def test_failed_insert_is_retried(self):
+        writer = self.writer(flush_interval=0.01, max_retries=3)
+        real_insert = writer._insert
+        failures = [RuntimeError('db down'), RuntimeError('db down')]
+
+        def flaky_insert(rows):
+            if failures:
+                raise failures.pop()
+            real_insert(rows)
+
+        with patch.object(writer, '_insert', side_effect=flaky_insert):
+            writer.submit(self.conversation_id, self.jobseeker_id, 'retried')
+            writer.flush()
+        self.assertEqual(writer.dropped, 0)
+        self.assertEqual([m.content for m in self.stored()], ['retried'])
+
+    def test_batch_dropped_after_retries_and_writer_keeps_running(self):
+        writer = self.writer(flush_interval=0.01, max_retries=1)
+        with patch.object(writer, '_insert', side_effect=RuntimeError('db down')):
+            writer.submit(self.conversation_id, self.jobseeker_id, 'lost')
+            writer.flush()
+        self.assertEqual(writer.dropped, 1)
+        self.assertTrue(writer.running)
+
+        writer.submit(self.conversation_id, self.jobseeker_id, 'after recovery')
+        writer.flush()
+        self.assertEqual([m.content for m in self.stored()], ['after recovery'])
+
+    def test_handle_message_broadcasts_before_persisting(self):
+        app.config['CHAT_WRITE_BEHIND'] = True
+        self.client.post('/login', data=dict(username='jobseeker', password='password123'))
+        socket_client = socketio.test_client(app, flask_test_client=self.client)
+        socket_client.emit('join', {'room': str(self.conversation_id)})
+        socket_client.emit('message', {'room': str(self.conversation_id), 'data': 'hello'})
+
+        received = [packet['args'] for packet in socket_client.get_received() if packet['name'] == 'message']
+        self.assertEqual(received[0]['message'], 'hello')
+        self.assertEqual(received[0]['sender'], 'jobseeker')
+        socket_client.disconnect()
+
+        chat_writer.get_writer().flush()
+        self.assertEqual([m.content for m in self.stored()], ['hello'])
+
+
+if __name__ == '__main__':
+    unittest.main()
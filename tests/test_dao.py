@@ -1,7 +1,8 @@
 import unittest
 import hashlib
 from unittest.mock import patch
-from app import app, db
+from app import db
+from app.index import app
 from app.models import User, RoleEnum, Job, JobStatusEnum, Company, Category, EmploymentEnum
 from app import dao
 
@@ -17,7 +18,6 @@ class TestDaoFunctions(unittest.TestCase):
         - Thêm dữ liệu mẫu để sử dụng trong các test case.
         """
         app.config['TESTING'] = True
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
         self.app_context = app.app_context()
         self.app_context.push()
         db.create_all()
@@ -138,7 +138,7 @@ class TestDaoFunctions(unittest.TestCase):
         self.assertEqual(len(jobs_pagination.items), 0)
 
     # --- Test Case cho hàm add_user (sử dụng Mocking) ---
-    @patch('app.dao.cloudinary.uploader.upload')
+    @patch('cloudinary.uploader.upload')
     def test_add_user_success(self, mock_upload):
         """
         Kiểm tra thêm người dùng mới thành công.
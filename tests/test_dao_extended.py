@@ -1,7 +1,8 @@
 import unittest
 import hashlib
 from unittest.mock import patch
-from app import app, db
+from app import db
+from app.index import app
 from app.models import User, RoleEnum, Job, JobStatusEnum, Company, Category, EmploymentEnum, Application, CV, Resume, \
     ApplicationStatusEnum
 from app import dao
@@ -11,7 +12,6 @@ class TestDaoExtendedFunctions(unittest.TestCase):
 
     def setUp(self):
         app.config['TESTING'] = True
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
         self.app_context = app.app_context()
         self.app_context.push()
         db.create_all()
@@ -0,0 +1,169 @@
+import os
+import tempfile
+import time
+import unittest
+
+from flask import session as flask_session
+from flask_login import login_user
+from sqlalchemy.orm import Session
+
+from app import db, dao, create_app
+from app.db_routing import engine_options, replica_binds, replica, primary, RoutingSession
+from app.models import Category, User, RoleEnum
+
+POOL_CONFIG = dict(DB_POOL_SIZE=5, DB_MAX_OVERFLOW=2, DB_POOL_TIMEOUT=10, DB_POOL_RECYCLE=600,
+                   DB_POOL_PRE_PING=True)
+
+
+class TestEngineOptions(unittest.TestCase):
+
+    def test_pool_options(self):
+        self.assertEqual(engine_options('sqlite:///:memory:', POOL_CONFIG), {})
+        self.assertEqual(engine_options('mysql+pymysql://root@localhost/db', POOL_CONFIG),
+                         dict(pool_size=5, max_overflow=2, pool_timeout=10, pool_recycle=600, pool_pre_ping=True))
+
+    def test_replica_binds(self):
+        binds = replica_binds(['mysql+pymysql://root@replica1/db', 'sqlite:///replica.db'], POOL_CONFIG)
+        self.assertEqual(list(binds), ['replica_0', 'replica_1'])
+        self.assertEqual(binds['replica_0']['pool_size'], 5)
+        self.assertEqual(binds['replica_1'], dict(url='sqlite:///replica.db'))
+
+
+class TestReplicaRouting(unittest.TestCase):
+    """Primary và hai replica là ba file SQLite có dữ liệu khác nhau để biết câu nào đọc ở đâu."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        paths = [os.path.join(self.tmp.name, f'{name}.sqlite') for name in ('primary', 'replica0', 'replica1')]
+        self.app = create_app(dict(SQLALCHEMY_DATABASE_URI=f'sqlite:///{paths[0]}',
+                                   DATABASE_REPLICA_URLS=[f'sqlite:///{p}' for p in paths[1:]],
+                                   DB_REPLICA_STICKY_SECONDS=5, SOCKETIO_ENABLED=False))
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add_all([Category(name='Primary'),
+                            User(username='recruiter', password='x', email='recruiter@test.com',
+                                 role=RoleEnum.RECRUITER)])
+        db.session.commit()
+        self.recruiter_id = User.query.filter_by(username='recruiter').one().id
+        for i in range(2):
+            engine = db.engines[f'replica_{i}']
+            db.metadata.create_all(engine)
+            with Session(engine) as replica_session:
+                replica_session.add_all([Category(name=f'Replica {i}'),
+                                         User(username='seeker', password='x', email='seeker@test.com',
+                                              role=RoleEnum.JOBSEEKER)])
+                replica_session.commit()
+
+        @self.app.route('/candidates')
+        def candidates():
+            return str(dao.count_candidates())
+
+        @self.app.route('/login-as/<int:user_id>')
+        def login_as(user_id):
+            login_user(db.session.get(User, user_id))
+            return ''
+
+        @self.app.route('/categories', methods=['POST'])
+        def add_category():
+            db.session.add(Category(name='New'))
+            db.session.commit()
+            return str(dao.count_candidates())
+
+    def tearDown(self):
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+        self.app_context.pop()
+        self.tmp.cleanup()
+        # init_app tạo metadata cho từng bind; app chính không có các bind này (db.create_all())
+        for key in self.app.config['SQLALCHEMY_BINDS']:
+            db.metadatas.pop(key, None)
+
+    def categories(self):
+        return [c.name for c in dao.load_cate()]
+
+    def test_session_class(self):
+        self.assertIsInstance(db.session(), RoutingSession)
+
+    def test_primary_by_default(self):
+        self.assertEqual(self.categories(), ['Primary'])
+        self.assertEqual(dao.count_jobs.__wrapped__(), 0)
+
+    def test_replica_block(self):
+        with replica():
+            names = self.categories()
+        self.assertEqual(len(names), 1)
+        self.assertTrue(names[0].startswith('Replica'))
+        self.assertEqual(self.categories(), ['Primary'])
+
+    def test_read_only_dao_functions(self):
+        self.assertEqual(dao.count_candidates(), 1)
+        self.assertEqual(dao.count_candidates.__wrapped__(), 0)
+
+    def test_one_replica_per_transaction_round_robin(self):
+        seen = []
+        for _ in range(2):
+            with replica():
+                first, second = self.categories(), self.categories()
+            self.assertEqual(first, second)
+            seen.extend(first)
+            db.session.rollback()
+        self.assertEqual(sorted(seen), ['Replica 0', 'Replica 1'])
+
+    def test_writes_in_transaction_read_primary(self):
+        db.session.add(Category(name='Pending'))
+        with replica():
+            self.assertEqual(self.categories(), ['Primary', 'Pending'])  # autoflush -> primary
+        db.session.rollback()
+        with replica():
+            self.assertTrue(self.categories()[0].startswith('Replica'))
+
+    def test_primary_and_locking_reads(self):
+        with replica():
+            with primary():
+                self.assertEqual(self.categories(), ['Primary'])
+            locked = Category.query.with_for_update().all()
+        self.assertEqual([c.name for c in locked], ['Primary'])
+
+    def test_read_your_writes(self):
+        # Mỗi request có app context (g, db.session) riêng như khi chạy thật
+        self.app_context.pop()
+        try:
+            client = self.app.test_client()
+            client.get(f'/login-as/{self.recruiter_id}')
+            self.assertEqual(client.get('/candidates').get_data(as_text=True), '1')
+            # Sau khi ghi, phần còn lại của request và các request sau của phiên này đọc primary
+            self.assertEqual(client.post('/categories').get_data(as_text=True), '0')
+            self.assertEqual(client.get('/candidates').get_data(as_text=True), '0')
+            self.assertEqual(self.app.test_client().get('/candidates').get_data(as_text=True), '1')
+
+            with client.session_transaction() as sess:
+                sess['_db_primary_until'] = time.time() - 1
+            self.assertEqual(client.get('/candidates').get_data(as_text=True), '1')
+        finally:
+            self.app_context.push()
+
+    def test_anonymous_writes_do_not_set_session_cookie(self):
+        self.app_context.pop()
+        try:
+            client = self.app.test_client()
+            response = client.post('/categories')
+            # Phần còn lại của request vẫn đọc primary, nhưng không có cookie session
+            self.assertEqual(response.get_data(as_text=True), '0')
+            self.assertNotIn('Set-Cookie', response.headers)
+            self.assertEqual(client.get('/candidates').get_data(as_text=True), '1')
+        finally:
+            self.app_context.push()
+
+    def test_no_sticky_session(self):
+        self.app.config['DB_REPLICA_STICKY_SECONDS'] = 0
+        with self.app.test_request_context():
+            db.session.add(Category(name='New'))
+            db.session.commit()
+            self.assertEqual(dao.count_candidates(), 0)
+            self.assertNotIn('_db_primary_until', flask_session)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,11 @@
 import unittest
 import hashlib
-from app import app, db
+
+from sqlalchemy import event
+
+from app import db
+from app.index import app
+from app.cache import get_cache
 from app.models import User, RoleEnum, Job, JobStatusEnum, Company, Category
 from app import dao
 
@@ -12,7 +17,6 @@ class TestIndexRoutes(unittest.TestCase):
         Set up the test environment before each test case.
         """
         app.config['TESTING'] = True
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
         app.config['WTF_CSRF_ENABLED'] = False  # Disable CSRF for form testing
 
         self.client = app.test_client()
@@ -82,6 +86,36 @@ class TestIndexRoutes(unittest.TestCase):
         self.assertIn(b'Candidates', response.data)
         self.assertIn(b'Companies', response.data)
 
+    def test_homepage_counters_cached(self):
+        """Trang chủ chỉ đếm lại khi cache trống, job/user thay đổi thì số liệu được cập nhật."""
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+
+        self.assertEqual(dao.get_homepage_counters(), dao.HomepageCounters(jobs=1, candidates=1, companies=1))
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            self.client.get('/')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertFalse([st for st in statements if 'count(' in st.lower() or 'sum(' in st.lower()])
+
+        # Sửa thuộc tính không liên quan: cache giữ nguyên
+        self.job.title = 'Renamed'
+        db.session.commit()
+        self.assertIsNotNone(get_cache().get(dao.HOMEPAGE_COUNTERS_KEY))
+
+        self.job.status = JobStatusEnum.EXPIRED
+        db.session.add(User(username='seeker2', password='x', email='seeker2@test.com', role=RoleEnum.JOBSEEKER))
+        db.session.commit()
+        self.assertEqual(dao.get_homepage_counters(), dao.HomepageCounters(jobs=0, candidates=2, companies=1))
+
+        # Rollback không xóa cache
+        dao.get_homepage_counters()
+        self.recruiter_user.is_active = False
+        db.session.flush()
+        db.session.rollback()
+        self.assertIsNotNone(get_cache().get(dao.HOMEPAGE_COUNTERS_KEY))
+
     def test_login_page_loads(self):
         """Check if the login page (GET) loads successfully."""
         response = self.client.get('/login')
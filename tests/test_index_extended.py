@@ -1,6 +1,7 @@
 import unittest
 import hashlib
-from app import app, db
+from app import db
+from app.index import app
 from app.models import User, RoleEnum, Job, JobStatusEnum, Company, Category, Resume, CV
 from unittest.mock import patch
 
@@ -9,7 +10,6 @@ class TestIndexExtendedRoutes(unittest.TestCase):
 
     def setUp(self):
         app.config['TESTING'] = True
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
         app.config['WTF_CSRF_ENABLED'] = False
         self.client = app.test_client()
         self.app_context = app.app_context()
@@ -0,0 +1,94 @@
+import unittest
+import hashlib
+from unittest.mock import patch
+
+from sqlalchemy import event
+
+from app import db, dao, job_views
+from app.index import app
+from app.models import User, RoleEnum, Company, Job, JobStatusEnum
+
+
+class TestJobViews(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        recruiter = User(username='recruiter', password=hashlib.md5(b'x').hexdigest(), email='r@test.com',
+                         role=RoleEnum.RECRUITER)
+        db.session.add(recruiter)
+        db.session.commit()
+        company = Company(user_id=recruiter.id, company_name='TestCorp')
+        db.session.add(company)
+        db.session.commit()
+        self.jobs = [Job(title=f'Job {i}', status=JobStatusEnum.POSTED, company_id=company.id, location='HCM')
+                     for i in range(3)]
+        db.session.add_all(self.jobs)
+        db.session.commit()
+        self.job_ids = [job.id for job in self.jobs]
+
+        self.counter = job_views.get_counter()
+        self.counter.store.drain()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def view_counts(self):
+        db.session.expire_all()
+        return [db.session.get(Job, job_id).view_count or 0 for job_id in self.job_ids]
+
+    def view(self, client, job_id):
+        response = client.get(f'/job-detail/{job_id}')
+        self.assertEqual(response.status_code, 200)
+
+    def test_views_are_buffered_and_flushed_in_one_update(self):
+        first, second = app.test_client(), app.test_client()
+        self.view(first, self.job_ids[0])
+        self.view(first, self.job_ids[0])  # cùng session: không tính thêm
+        self.view(second, self.job_ids[0])
+        self.view(second, self.job_ids[1])
+        self.assertEqual(self.view_counts(), [0, 0, 0])
+
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            self.assertEqual(self.counter.flush(), 2)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(len([st for st in statements if st.startswith('UPDATE job')]), 1)
+        self.assertEqual(self.view_counts(), [2, 1, 0])
+        self.assertEqual(self.counter.flush(), 0)
+
+    def test_failed_flush_keeps_counts(self):
+        self.counter.record(self.job_ids[2])
+        self.counter.record(self.job_ids[2])
+        with patch('app.job_views.apply_view_counts', side_effect=RuntimeError('db down')):
+            self.assertEqual(self.counter.flush(), 0)
+        self.counter.record(self.job_ids[2])
+        self.counter.flush()
+        self.assertEqual(self.view_counts(), [0, 0, 3])
+
+    def test_missing_job_is_not_counted(self):
+        self.assertEqual(app.test_client().get('/job-detail/9999').status_code, 404)
+        self.assertEqual(self.counter.store.drain(), {})
+
+    def test_load_jobs_sorted_by_views(self):
+        for job_id, views in zip(self.job_ids, [5, 20, 1]):
+            for _ in range(views):
+                self.counter.record(job_id)
+        self.counter.flush()
+
+        jobs = dao.load_jobs(page=1, per_page=3, sort=dao.SORT_POPULAR)
+        self.assertEqual([job.title for job in jobs.items], ['Job 1', 'Job 0', 'Job 2'])
+        response = app.test_client().get('/jobs?sort=popular')
+        self.assertLess(response.data.index(b'Job 1'), response.data.index(b'Job 0'))
+
+
+if __name__ == '__main__':
+    unittest.main()
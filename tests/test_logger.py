@@ -0,0 +1,60 @@
+import logging
+import unittest
+from app import db
+from app.index import app
+from app.logger import get_logger, init_query_logging, disable_query_logging, KeyValueFormatter
+from app.models import Job
+
+
+class TestStructuredLogging(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_fields_are_formatted(self):
+        log = get_logger('app.test')
+        with self.assertLogs('app.test', level='INFO') as captured:
+            log.info("job added", job_id=1, title='Dev')
+        line = KeyValueFormatter().format(captured.records[0])
+        self.assertIn("msg='job added'", line)
+        self.assertIn("job_id=1 title='Dev'", line)
+
+    def test_debug_fields_not_evaluated_when_disabled(self):
+        logging.getLogger('app.test').setLevel(logging.WARNING)
+
+        class Expensive:
+            def __repr__(self):
+                raise AssertionError("should not be formatted")
+
+        get_logger('app.test').debug("hot path", value=Expensive())
+
+    def test_sampled_query_logging(self):
+        init_query_logging(sample_rate=1.0)
+        try:
+            with self.assertLogs('app.sql', level='INFO') as captured:
+                Job.query.count()
+            record = captured.records[-1]
+            self.assertIn('FROM job', record.fields['statement'])
+            self.assertGreaterEqual(record.fields['duration_ms'], 0)
+        finally:
+            disable_query_logging()
+
+    def test_slow_query_logging(self):
+        init_query_logging(slow_ms=0)
+        try:
+            with self.assertLogs('app.sql', level='WARNING') as captured:
+                Job.query.count()
+            self.assertEqual(captured.records[-1].getMessage(), 'slow query')
+        finally:
+            disable_query_logging()
+
+if __name__ == '__main__':
+    unittest.main()
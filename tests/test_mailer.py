@@ -0,0 +1,208 @@
+import socketserver
+import threading
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app import db, mail, mailer
+from app.index import app
+from app.mailer import queue_mail, dispatch_pending
+from app.models import OutboxMail, MailStatusEnum
+from app.utils import send_email_notification
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """SMTP tối giản đủ cho smtplib: EHLO, MAIL, RCPT, DATA, RSET, QUIT."""
+
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost stand-in')
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            command = line.split(' ', 1)[0].upper()
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 localhost')
+            elif command == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif command == 'RCPT':
+                address = line.split(':', 1)[1].strip('<> ')
+                if address in self.server.rejected:
+                    self.reply('550 No such user')
+                else:
+                    recipients.append(address)
+                    self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while True:
+                    chunk = self.rfile.readline().decode()
+                    if chunk in ('.\r\n', ''):
+                        break
+                    data.append(chunk)
+                self.server.messages.append((recipients, ''.join(data)))
+                self.reply('250 OK queued')
+            elif command in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Not implemented')
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.connections = 0
+        self.messages = []
+        self.rejected = set()
+
+
+class TestMailOutbox(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.smtp = SMTPStandIn()
+        threading.Thread(target=self.smtp.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+        self.original_mail = app.extensions['mail']
+        app.extensions['mail'] = mail.init_mail({
+            'MAIL_SERVER': '127.0.0.1',
+            'MAIL_PORT': self.smtp.server_address[1],
+            'MAIL_DEFAULT_SENDER': 'noreply@test.com',
+            'MAIL_SUPPRESS_SEND': False,
+        })
+
+    def tearDown(self):
+        app.extensions['mail'] = self.original_mail
+        self.smtp.shutdown()
+        self.smtp.server_close()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def outbox(self):
+        db.session.expire_all()
+        return OutboxMail.query.order_by(OutboxMail.id).all()
+
+    def make_due(self):
+        OutboxMail.query.update({OutboxMail.next_attempt_at: datetime.now() - timedelta(seconds=1)})
+        db.session.commit()
+
+    def test_queue_mail_does_not_touch_smtp(self):
+        rows = queue_mail(['a@test.com', 'b@test.com', None], 'Subject', 'Body')
+        self.assertEqual(len(rows), 2)
+        self.assertEqual([row.status for row in self.outbox()], [MailStatusEnum.PENDING] * 2)
+        self.assertEqual(self.smtp.connections, 0)
+
+    def test_queued_with_request_transaction(self):
+        queue_mail('kept@test.com', 'Subject', 'Body')
+        db.session.commit()
+        queue_mail('dropped@test.com', 'Subject', 'Body')
+        db.session.rollback()
+        self.assertEqual([row.recipient for row in self.outbox()], ['kept@test.com'])
+
+    def test_worker_woken_after_commit_and_started_on_first_request(self):
+        app.config['TESTING'] = False
+        try:
+            with patch.object(mailer, 'get_worker') as get_worker:
+                queue_mail('user@test.com', 'Subject', 'Body')
+                get_worker.return_value.wake.assert_not_called()
+                db.session.commit()
+                get_worker.return_value.wake.assert_called_once_with()
+
+                get_worker.reset_mock()
+                # Hook before_request, gọi trực tiếp để không start scheduler thật
+                self.assertIn(mailer._start_worker, app.before_request_funcs[None])
+                mailer._start_worker()
+                get_worker.assert_called_once_with()
+        finally:
+            app.config['TESTING'] = True
+
+    def test_send_email_notification_uses_outbox(self):
+        send_email_notification('user@test.com', 'Hello', 'Body')
+        send_email_notification(None, 'Ignored', 'Body')
+        rows = self.outbox()
+        self.assertEqual([row.recipient for row in rows], ['user@test.com'])
+        self.assertEqual(rows[0].sender, app.config['MAIL_USERNAME'])
+
+    def test_batch_sent_over_single_connection(self):
+        queue_mail([f'user{i}@test.com' for i in range(5)], 'Interview', 'See you')
+        self.assertEqual(dispatch_pending(), 5)
+
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertEqual([r for r, _ in self.smtp.messages], [[f'user{i}@test.com'] for i in range(5)])
+        rows = self.outbox()
+        self.assertTrue(all(row.status == MailStatusEnum.SENT and row.sent_date for row in rows))
+        self.assertEqual(dispatch_pending(), 0)
+
+    def test_batch_size_limits_claim(self):
+        queue_mail([f'user{i}@test.com' for i in range(7)], 'Subject', 'Body')
+        self.assertEqual(dispatch_pending(batch_size=3), 3)
+        self.assertEqual(dispatch_pending(batch_size=3), 3)
+        self.assertEqual(dispatch_pending(batch_size=3), 1)
+        self.assertEqual(self.smtp.connections, 3)
+
+    def test_rejected_recipient_retried_with_backoff(self):
+        self.smtp.rejected.add('bad@test.com')
+        queue_mail(['good@test.com', 'bad@test.com'], 'Subject', 'Body')
+        before = datetime.now()
+        dispatch_pending()
+
+        good, bad = self.outbox()
+        self.assertEqual(good.status, MailStatusEnum.SENT)
+        self.assertEqual(bad.status, MailStatusEnum.PENDING)
+        self.assertEqual(bad.attempts, 1)
+        self.assertIn('SMTPRecipientsRefused', bad.last_error)
+        self.assertGreaterEqual(bad.next_attempt_at, before + timedelta(seconds=app.config['MAIL_RETRY_BASE_SECONDS']))
+        # Chưa đến hạn thử lại
+        self.assertEqual(dispatch_pending(), 0)
+
+    def test_server_down_then_failed_after_max_attempts(self):
+        queue_mail('user@test.com', 'Subject', 'Body')
+        self.smtp.shutdown()
+        self.smtp.server_close()
+
+        delays = []
+        for _ in range(app.config['MAIL_MAX_ATTEMPTS']):
+            self.make_due()
+            before = datetime.now()
+            self.assertEqual(dispatch_pending(), 1)
+            row = self.outbox()[0]
+            if row.status == MailStatusEnum.PENDING:
+                delays.append(row.next_attempt_at - before)
+
+        self.assertEqual(row.status, MailStatusEnum.FAILED)
+        self.assertEqual(row.attempts, app.config['MAIL_MAX_ATTEMPTS'])
+        self.assertEqual(delays, sorted(delays))
+        self.make_due()
+        self.assertEqual(dispatch_pending(), 0)
+
+    def test_expired_sending_lease_is_reclaimed(self):
+        queue_mail('user@test.com', 'Subject', 'Body')
+        row = self.outbox()[0]
+        row.status = MailStatusEnum.SENDING
+        row.next_attempt_at = datetime.now() + timedelta(minutes=5)
+        db.session.commit()
+        self.assertEqual(dispatch_pending(), 0)
+
+        self.make_due()
+        self.assertEqual(dispatch_pending(), 1)
+        self.assertEqual(self.outbox()[0].status, MailStatusEnum.SENT)
+
+
+if __name__ == '__main__':
+    unittest.main()
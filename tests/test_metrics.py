@@ -0,0 +1,180 @@
+import gc
+import hashlib
+import os
+import tempfile
+import threading
+import unittest
+
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from app import db, dao, metrics, socketio, create_app
+from app.index import app
+from app.mailer import queue_mail
+from app.metrics import Counter, Histogram, Gauge, render
+from app.models import User, RoleEnum
+
+
+def sample(text, line_prefix):
+    values = [line.rsplit(' ', 1)[1] for line in text.splitlines() if line.startswith(line_prefix + ' ')]
+    return float(values[0]) if values else None
+
+
+class TestMetricTypes(unittest.TestCase):
+
+    def test_counter_from_many_threads(self):
+        counter = Counter('test_total', 'Test.', ('kind',), registry=None)
+
+        def work():
+            for _ in range(10000):
+                counter.labels('a').inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counter.labels('a').value, 80000)
+
+    def test_shards_of_finished_threads_are_retired(self):
+        counter = Counter('test_total', 'Test.', registry=None)
+        counter.inc()
+        # Mỗi request một thread như werkzeug threaded: số shard không tăng theo số thread
+        for _ in range(50):
+            thread = threading.Thread(target=counter.inc, args=(2,))
+            thread.start()
+            thread.join()
+        gc.collect()
+        shards = counter.labels()._shards
+        self.assertEqual(len(shards._shards), 1)  # chỉ còn shard của thread test
+        self.assertEqual(counter.labels().value, 101)
+
+    def test_histogram_exposition(self):
+        registry = []
+        histogram = Histogram('test_seconds', 'Test latency.', ('endpoint',), buckets=(0.1, 1.0), registry=registry)
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.labels('jobs').observe(value)
+        Gauge('test_depth', 'Test gauge.', lambda: 7, registry=registry)
+
+        text = render(registry)
+        self.assertIn('# TYPE test_seconds histogram', text)
+        self.assertEqual(sample(text, 'test_seconds_bucket{endpoint="jobs",le="0.1"}'), 2)
+        self.assertEqual(sample(text, 'test_seconds_bucket{endpoint="jobs",le="1.0"}'), 3)
+        self.assertEqual(sample(text, 'test_seconds_bucket{endpoint="jobs",le="+Inf"}'), 4)
+        self.assertEqual(sample(text, 'test_seconds_count{endpoint="jobs"}'), 4)
+        self.assertAlmostEqual(sample(text, 'test_seconds_sum{endpoint="jobs"}'), 3.65)
+        self.assertEqual(sample(text, 'test_depth'), 7)
+
+    def test_failing_gauge_is_skipped(self):
+        registry = []
+        Gauge('broken', 'Broken.', lambda: 1 / 0, registry=registry)
+        Gauge('working', 'Working.', lambda: 1, registry=registry)
+        self.assertEqual(sample(render(registry), 'working'), 1)
+
+    def test_pool_wait_and_timeouts(self):
+        path = os.path.join(tempfile.mkdtemp(), 'pool.sqlite')
+        engine = create_engine(f'sqlite:///{path}', poolclass=QueuePool, pool_size=1, max_overflow=0,
+                               pool_timeout=0.05)
+        app_metrics = metrics.AppMetrics()
+        metrics.instrument_pool(engine.pool, 'test-pool', app_metrics)
+        try:
+            with engine.connect():
+                with self.assertRaises(exc.TimeoutError):
+                    engine.connect()
+        finally:
+            engine.dispose()
+        self.assertEqual(app_metrics.pool_timeouts.labels('test-pool').value, 1)
+        cumulative, total = app_metrics.pool_wait.labels('test-pool').snapshot()
+        self.assertEqual(cumulative[-1], 2)
+        self.assertGreaterEqual(total, 0.05)
+
+    def test_unsupported_pool_skipped(self):
+        engine = create_engine('sqlite://', poolclass=StaticPool)
+        try:
+            app_metrics = metrics.AppMetrics()
+            self.assertFalse(metrics.instrument_pool(engine.pool, 'static-pool', app_metrics))
+            with engine.connect():
+                pass
+        finally:
+            engine.dispose()
+        self.assertEqual(app_metrics.pool_wait.labels('static-pool').snapshot()[0][-1], 0)
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['METRICS'] = True
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        app.config.update(METRICS=False, METRICS_TOKEN=None)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        return response.get_data(as_text=True)
+
+    def test_request_latency_by_endpoint(self):
+        before = sample(self.scrape(), 'http_requests_total{endpoint="job",method="GET",status="200"}') or 0
+        self.client.get('/jobs')
+        self.client.get('/jobs')
+        self.client.get('/no-such-page')
+
+        text = self.scrape()
+        self.assertEqual(sample(text, 'http_requests_total{endpoint="job",method="GET",status="200"}'), before + 2)
+        self.assertGreaterEqual(sample(text, 'http_request_duration_seconds_count{endpoint="job",method="GET"}'), 2)
+        self.assertGreaterEqual(sample(text, 'http_requests_total{endpoint="unmatched",method="GET",status="404"}'), 1)
+
+    def test_mail_queue_depth(self):
+        queue_mail('someone@test.com', 'Subject', 'Body')
+        queue_mail('other@test.com', 'Subject', 'Body')
+        text = self.scrape()
+        self.assertEqual(sample(text, 'mail_outbox_messages{status="PENDING"}'), 2)
+        self.assertEqual(sample(text, 'mail_outbox_messages{status="SENT"}'), 0)
+
+    def test_socketio_messages(self):
+        password = hashlib.md5('password123'.encode()).hexdigest()
+        users = [User(username=name, password=password, email=f'{name}@test.com', role=role)
+                 for name, role in (('seeker', RoleEnum.JOBSEEKER), ('recruiter', RoleEnum.RECRUITER))]
+        db.session.add_all(users)
+        db.session.commit()
+        conversation = dao.get_or_create_conversation(users[0].id, users[1].id)
+        self.client.post('/login', data=dict(username='seeker', password='password123'))
+        socket = socketio.test_client(app, flask_test_client=self.client)
+        try:
+            before = sample(self.scrape(), 'socketio_messages_total{event="message"}') or 0
+            self.assertGreaterEqual(sample(self.scrape(), 'socketio_connected_clients'), 1)
+            socket.emit('join', {'room': str(conversation.id)})
+            socket.emit('message', {'room': str(conversation.id), 'data': 'Hello'})
+            text = self.scrape()
+        finally:
+            socket.disconnect()
+        self.assertEqual(sample(text, 'socketio_messages_total{event="message"}'), before + 1)
+        self.assertGreaterEqual(sample(text, 'socketio_rooms'), 2)  # user_<id> và phòng chat
+
+    def test_disabled(self):
+        app.config['METRICS'] = False
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    def test_off_by_default(self):
+        self.assertFalse(create_app(dict(SOCKETIO_ENABLED=False)).config['METRICS'])
+
+    def test_token(self):
+        app.config['METRICS_TOKEN'] = 's3cret'
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        headers = {'Authorization': 'Bearer wrong'}
+        self.assertEqual(self.client.get('/metrics', headers=headers).status_code, 404)
+        headers = {'Authorization': 'Bearer s3cret'}
+        self.assertEqual(self.client.get('/metrics', headers=headers).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import text
+
+from app import db, create_app
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'migrations')
+BASELINE = 'b1c84d26573f'
+
+# Dữ liệu có trước đợt tối ưu (schema baseline): 2 job, 1 tag, 2 đơn ứng tuyển ở 2 tháng
+LEGACY_ROWS = [
+    "INSERT INTO user (id, username, password, email, role) VALUES (1, 'recruiter', 'x', 'r@test.com', 'RECRUITER')",
+    "INSERT INTO company (id, user_id, company_name) VALUES (1, 1, 'LegacyCorp')",
+    "INSERT INTO job (id, title, status, company_id, created_date) VALUES "
+    "(1, 'Python developer', 'POSTED', 1, '2025-01-05 00:00:00'), (2, 'Java developer', 'POSTED', 1, '2025-02-05 00:00:00')",
+    "INSERT INTO tag (id, name) VALUES (1, 'backend')",
+    "INSERT INTO tag_job (tag_id, job_id) VALUES (1, 1)",
+    "INSERT INTO resume (id, user_id) VALUES (1, 1)",
+    "INSERT INTO cv (id, title, file_path, resume_id) VALUES (1, 'CV', 'cv.pdf', 1)",
+    "INSERT INTO application (job_id, cv_id, status, applied_date) VALUES "
+    "(1, 1, 'PENDING', '2025-01-06 00:00:00'), (1, 1, 'ACCEPTED', '2025-02-06 00:00:00')",
+]
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Như migrations/env.py: bảng FTS5 và index FULLTEXT không nằm trong metadata
+    return not (reflected and compare_to is None and name.startswith(('job_fts', 'ft_')))
+
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_app(dict(SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(self.tmp.name, 'm.sqlite')}",
+                                   SOCKETIO_ENABLED=False))
+        self.runner = self.app.test_cli_runner()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        self.tmp.cleanup()
+
+    def db(self, command, *args):
+        result = self.runner.invoke(args=['db', command, '--directory', MIGRATIONS, *args])
+        self.assertEqual(result.exit_code, 0, result.output)
+
+    def execute(self, *statements):
+        with self.app.app_context(), db.engine.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+
+    def rows(self, query):
+        with self.app.app_context(), db.engine.connect() as connection:
+            return [tuple(row) for row in connection.execute(text(query))]
+
+    def schema_diff(self):
+        with self.app.app_context(), db.engine.connect() as connection:
+            context = MigrationContext.configure(connection, opts=dict(include_object=include_object))
+            return compare_metadata(context, db.metadata)
+
+    def test_upgrade_from_baseline_matches_models(self):
+        self.db('upgrade', BASELINE)
+        self.execute(*LEGACY_ROWS)
+        self.db('upgrade')
+        self.assertEqual(self.schema_diff(), [])
+
+        self.assertEqual(self.rows("SELECT year, month, jobs, applications, pending, accepted "
+                                   "FROM company_month_stat ORDER BY month"),
+                         [(2025, 1, 1, 1, 1, 0), (2025, 2, 1, 1, 0, 1)])
+        self.assertEqual(self.rows("SELECT job_id, applications, pending, accepted FROM job_stat"), [(1, 2, 1, 1)])
+        self.assertEqual(self.rows("SELECT upload_status, file_path FROM cv"), [('READY', 'cv.pdf')])
+        self.assertEqual(self.rows("SELECT avatar_upload_status, avatar_upload_key FROM user"), [('READY', None)])
+        self.assertEqual(self.rows("SELECT rowid FROM job_fts WHERE job_fts MATCH 'backend'"), [(1,)])
+
+        # Trigger giữ job_fts đồng bộ với job thêm sau migration
+        self.execute("INSERT INTO job (id, title, company_id) VALUES (3, 'Golang developer', 1)")
+        self.assertEqual(self.rows("SELECT rowid FROM job_fts WHERE job_fts MATCH 'golang'"), [(3,)])
+
+    def test_downgrade_to_baseline(self):
+        self.db('upgrade')
+        self.db('downgrade', BASELINE)
+        tables = {name for name, in self.rows("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertNotIn('outbox_mail', tables)
+        self.assertNotIn('job_stat', tables)
+        self.assertNotIn('job_fts', tables)
+        self.db('upgrade')
+        self.assertEqual(self.schema_diff(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,310 @@
+import unittest
+import hashlib
+from unittest.mock import patch
+from app import db, socketio
+from app.cache import get_cache
+from app.index import app
+from app.models import User, RoleEnum, Notification, Company, Category, Job, JobStatusEnum, Resume, CV, \
+    Application
+from app import dao
+from sqlalchemy import event
+
+
+class TestNotificationBadge(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user = User(username='jobseeker', password=hashlib.md5('password123'.encode()).hexdigest(),
+                         email='jobseeker@test.com', role=RoleEnum.JOBSEEKER)
+        db.session.add(self.user)
+        db.session.commit()
+        self.client.post('/login', data=dict(username='jobseeker', password='password123'))
+
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def notification_queries(self):
+        return [st for st in self.statements if 'FROM notification' in st]
+
+    def test_badge_served_from_cache(self):
+        dao.NotificationDAO.create(user_id=self.user.id, content='Welcome')
+
+        self.client.get('/about')
+        self.assertTrue(self.notification_queries())
+
+        self.statements.clear()
+        response = self.client.get('/about')
+        self.assertEqual(self.notification_queries(), [])
+        self.assertIn(b'Welcome', response.data)
+
+    def test_writes_refresh_badge(self):
+        dao.NotificationDAO.create(user_id=self.user.id, content='First')
+        self.assertEqual(dao.NotificationDAO.get_badge(self.user.id).unread, 1)
+
+        dao.NotificationDAO.create(user_id=self.user.id, content='Second')
+        badge = dao.NotificationDAO.get_badge(self.user.id)
+        self.assertEqual(badge.unread, 2)
+        self.assertEqual([n.content for n in badge.recent], ['Second', 'First'])
+
+        dao.NotificationDAO.mark_as_read(badge.recent[0].id, self.user.id)
+        self.assertEqual(dao.NotificationDAO.get_badge(self.user.id).unread, 1)
+
+        dao.NotificationDAO.mark_all_as_read(self.user.id)
+        self.assertEqual(dao.NotificationDAO.get_badge(self.user.id).unread, 0)
+
+        dao.NotificationDAO.delete(badge.recent[1].id)
+        self.assertEqual([n.content for n in dao.NotificationDAO.get_badge(self.user.id).recent], ['Second'])
+
+        dao.NotificationDAO.delete_all_by_user(self.user.id)
+        self.assertEqual(dao.NotificationDAO.get_badge(self.user.id).recent, [])
+
+    def test_badge_ttl_short_with_memory_cache(self):
+        cache = get_cache()
+        self.assertFalse(cache.shared)
+        with patch.object(cache, 'set') as cache_set:
+            dao.NotificationDAO.get_badge(self.user.id)
+            with patch.object(cache, 'shared', True):
+                dao.NotificationDAO.get_badge(self.user.id)
+        self.assertEqual([call.kwargs['ttl'] for call in cache_set.call_args_list],
+                         [app.config['NOTIFICATION_BADGE_MEMORY_TTL'], app.config['NOTIFICATION_BADGE_TTL']])
+
+    def test_notification_queued_by_view_shown_on_same_page(self):
+        recruiter = User(username='recruiter', password=hashlib.md5('password123'.encode()).hexdigest(),
+                         email='recruiter@test.com', role=RoleEnum.RECRUITER)
+        db.session.add(recruiter)
+        db.session.commit()
+        client = app.test_client()
+        client.post('/login', data=dict(username='recruiter', password='password123'))
+        response = client.post('/profile', data=dict(company_name='Corp', address='HCM'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'You have successfully created your company profile.', response.data)
+
+    def test_resume_notification_committed_by_view(self):
+        form = dict(resume_form='1', skill='Python', experience='2 years', education='HCMUT',
+                    location='HCM', job='FULLTIME', linkedin='https://linkedin.com/in/jobseeker')
+        with self.assertNoLogs('app.dao', level='WARNING'):
+            response = self.client.post('/profile', data=form)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual([n.content for n in dao.NotificationDAO.get_badge(self.user.id).recent],
+                         ['You have successfully created your resume.'])
+
+    def test_notifications_page_is_paginated(self):
+        for i in range(7):
+            dao.NotificationDAO.create(user_id=self.user.id, content=f'Notice {i}')
+        response = self.client.get('/notifications?page=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Notice 0', response.data)
+
+
+class TestNotificationBatching(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.users = [User(username=f'user{i}', password='x', email=f'user{i}@test.com',
+                           role=RoleEnum.RECRUITER if i == 0 else RoleEnum.JOBSEEKER) for i in range(6)]
+        db.session.add_all(self.users)
+        db.session.commit()
+        self.user_ids = [user.id for user in self.users]
+
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def inserts(self):
+        return [st for st in self.statements if st.startswith('INSERT INTO notification')]
+
+    def contents(self, user_id):
+        return sorted(n.content for n in Notification.query.filter_by(user_id=user_id))
+
+    def test_queued_notifications_written_with_commit(self):
+        recruiter, seeker = self.user_ids[:2]
+        self.assertEqual(dao.NotificationDAO.get_badge(seeker).unread, 0)  # nạp cache badge
+
+        dao.NotificationDAO.queue(seeker, 'Applied')
+        dao.NotificationDAO.queue(recruiter, 'New application')
+        self.assertEqual(self.inserts(), [])
+        db.session.commit()
+
+        self.assertEqual(len(self.inserts()), 1)
+        self.assertEqual(self.contents(seeker), ['Applied'])
+        self.assertEqual(self.contents(recruiter), ['New application'])
+        self.assertEqual(dao.NotificationDAO.get_badge(seeker).unread, 1)
+
+    def test_rollback_discards_queued_notifications(self):
+        dao.NotificationDAO.queue(self.user_ids[1], 'Lost')
+        db.session.rollback()
+        db.session.commit()
+        self.assertEqual(self.contents(self.user_ids[1]), [])
+
+    def test_queued_notifications_written_at_request_teardown(self):
+        with app.test_request_context('/'):
+            dao.NotificationDAO.queue(self.user_ids[1], 'From request')
+        self.assertEqual(self.contents(self.user_ids[1]), ['From request'])
+
+        with self.assertRaises(RuntimeError):
+            with app.test_request_context('/'):
+                dao.NotificationDAO.queue(self.user_ids[1], 'Failed request')
+                raise RuntimeError('boom')
+        db.session.rollback()
+        self.assertEqual(self.contents(self.user_ids[1]), ['From request'])
+
+    def test_teardown_writes_only_queued_notifications(self):
+        self.assertEqual(dao.NotificationDAO.get_badge(self.user_ids[1]).unread, 0)  # nạp cache badge
+        with self.assertLogs('app.dao', level='WARNING') as captured:
+            with app.test_request_context('/'):
+                db.session.get(User, self.user_ids[1]).email = 'changed@test.com'
+                dao.NotificationDAO.queue(self.user_ids[1], 'From request')
+        self.assertIn('not committed by the view', captured.output[0])
+        db.session.expire_all()
+        self.assertEqual(self.contents(self.user_ids[1]), ['From request'])
+        self.assertEqual(db.session.get(User, self.user_ids[1]).email, 'user1@test.com')
+        self.assertEqual(dao.NotificationDAO.get_badge(self.user_ids[1]).unread, 1)
+
+    def test_broadcast_inserts_in_chunks(self):
+        sent = dao.NotificationDAO.broadcast('Hello seekers', dao.active_user_ids(RoleEnum.JOBSEEKER), chunk_size=2)
+        self.assertEqual(sent, 5)
+        self.assertEqual(len(self.inserts()), 3)
+        # Chỉ đọc cột id, không load User
+        self.assertFalse([st for st in self.statements if 'user.username' in st])
+        self.assertEqual(self.contents(self.user_ids[0]), [])
+        for user_id in self.user_ids[1:]:
+            self.assertEqual(self.contents(user_id), ['Hello seekers'])
+
+    def test_broadcast_to_category(self):
+        company = Company(user_id=self.user_ids[0], company_name='Corp')
+        categories = [Category(name='IT'), Category(name='Design')]
+        db.session.add_all([company] + categories)
+        db.session.commit()
+        jobs = [Job(title=c.name, status=JobStatusEnum.POSTED, company_id=company.id, category_id=c.id)
+                for c in categories]
+        resumes = [Resume(user_id=user_id) for user_id in self.user_ids[1:4]]
+        db.session.add_all(jobs + resumes)
+        db.session.commit()
+        cvs = [CV(title='CV', file_path='/cv.pdf', resume_id=resume.id) for resume in resumes]
+        db.session.add_all(cvs)
+        db.session.commit()
+        # user1 ứng tuyển 2 job IT-Design, user2 job IT, user3 job Design
+        db.session.add_all([Application(cv_id=cvs[0].id, job_id=jobs[0].id),
+                            Application(cv_id=cvs[0].id, job_id=jobs[1].id),
+                            Application(cv_id=cvs[1].id, job_id=jobs[0].id),
+                            Application(cv_id=cvs[2].id, job_id=jobs[1].id)])
+        db.session.commit()
+
+        sent = dao.NotificationDAO.broadcast('New IT jobs', dao.job_seeker_ids_in_category(categories[0].id))
+        self.assertEqual(sent, 2)
+        self.assertEqual([self.contents(user_id) for user_id in self.user_ids[1:4]],
+                         [['New IT jobs'], ['New IT jobs'], []])
+
+
+class TestNotificationPush(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        password = hashlib.md5('password123'.encode()).hexdigest()
+        self.users = [User(username=name, password=password, email=f'{name}@test.com', role=RoleEnum.JOBSEEKER)
+                      for name in ('alice', 'bob')]
+        db.session.add_all(self.users)
+        db.session.commit()
+        self.alice, self.bob = [user.id for user in self.users]
+
+        self.sockets = {}
+        for user in self.users:
+            client = app.test_client()
+            client.post('/login', data=dict(username=user.username, password='password123'))
+            self.sockets[user.id] = socketio.test_client(app, flask_test_client=client)
+
+    def tearDown(self):
+        for socket in self.sockets.values():
+            socket.disconnect()
+        app.config['NOTIFICATION_PUSH'] = True
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def pushed(self, user_id):
+        return [event['args'][0] for event in self.sockets[user_id].get_received()
+                if event['name'] == 'notification']
+
+    def test_create_pushes_unread_count_to_user_room(self):
+        dao.NotificationDAO.create(user_id=self.alice, content='Welcome')
+
+        pushed = self.pushed(self.alice)
+        self.assertEqual(len(pushed), 1)
+        self.assertEqual(pushed[0]['unread'], 1)
+        self.assertEqual(pushed[0]['notification']['content'], 'Welcome')
+        self.assertEqual(self.pushed(self.bob), [])
+
+    def test_one_push_per_user_per_commit(self):
+        dao.NotificationDAO.queue(self.alice, 'First')
+        dao.NotificationDAO.queue(self.alice, 'Second')
+        dao.NotificationDAO.queue(self.bob, 'Hello')
+        db.session.commit()
+
+        self.assertEqual([(p['unread'], p['notification']['content']) for p in self.pushed(self.alice)],
+                         [(2, 'Second')])
+        self.assertEqual([p['unread'] for p in self.pushed(self.bob)], [1])
+
+    def test_rollback_pushes_nothing(self):
+        dao.NotificationDAO.queue(self.alice, 'Lost')
+        db.session.rollback()
+        db.session.commit()
+        self.assertEqual(self.pushed(self.alice), [])
+
+    def test_mark_as_read_pushes_new_count(self):
+        dao.NotificationDAO.create_many([(self.alice, 'One'), (self.alice, 'Two')])
+        self.pushed(self.alice)
+
+        dao.NotificationDAO.mark_all_as_read(self.alice)
+        self.assertEqual(self.pushed(self.alice), [dict(unread=0)])
+
+    def test_cannot_join_other_user_room(self):
+        self.sockets[self.bob].emit('join', {'room': dao.NotificationDAO.user_room(self.alice)})
+        dao.NotificationDAO.create(user_id=self.alice, content='Private')
+        self.assertEqual(self.pushed(self.bob), [])
+
+    def test_anonymous_socket_gets_no_room(self):
+        anonymous = socketio.test_client(app)
+        try:
+            dao.NotificationDAO.create(user_id=self.alice, content='Welcome')
+            self.assertEqual([e for e in anonymous.get_received() if e['name'] == 'notification'], [])
+        finally:
+            anonymous.disconnect()
+
+    def test_push_can_be_disabled(self):
+        app.config['NOTIFICATION_PUSH'] = False
+        dao.NotificationDAO.create(user_id=self.alice, content='Quiet')
+        self.assertEqual(self.pushed(self.alice), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
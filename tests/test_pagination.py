@@ -0,0 +1,197 @@
+import unittest
+import hashlib
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from app import db, pagination
+from app.index import app
+from app.models import User, RoleEnum, Job, JobStatusEnum, Company, Category
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql
+from app.pagination import encode_cursor, decode_cursor, paginate, explain
+from app import dao
+
+
+class TestKeysetPagination(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        recruiter = User(username='recruiter', password=hashlib.md5('pw'.encode()).hexdigest(),
+                         email='recruiter@test.com', role=RoleEnum.RECRUITER)
+        db.session.add(recruiter)
+        db.session.commit()
+        company = Company(user_id=recruiter.id, company_name='PagingCorp')
+        category = Category(name='IT')
+        db.session.add_all([company, category])
+        db.session.commit()
+
+        # 7 job, 2 job cùng created_date để kiểm tra tie-break theo id
+        base = datetime(2025, 1, 1)
+        dates = [base + timedelta(days=i) for i in range(6)] + [base + timedelta(days=5)]
+        self.jobs = [Job(title=f'Job {i}', status=JobStatusEnum.POSTED, created_date=d,
+                         company_id=company.id, category_id=category.id) for i, d in enumerate(dates)]
+        db.session.add_all(self.jobs)
+        db.session.commit()
+        # Thứ tự mong đợi: created_date giảm dần, id giảm dần
+        self.expected = [j.id for j in sorted(self.jobs, key=lambda j: (j.created_date, j.id), reverse=True)]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_cursor_round_trip(self):
+        created = datetime(2025, 3, 4, 5, 6, 7)
+        self.assertEqual(decode_cursor(encode_cursor(created, 42)), (created, 42))
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+
+    def test_walk_forward_and_back(self):
+        seen = []
+        page = dao.load_jobs(per_page=3, keyset=True)
+        self.assertFalse(page.has_prev)
+        pages = [page]
+        while True:
+            seen.extend(j.id for j in page.items)
+            if not page.has_next:
+                break
+            page = dao.load_jobs(per_page=3, after=page.next_cursor)
+            pages.append(page)
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 3)
+
+        back = dao.load_jobs(per_page=3, before=pages[2].prev_cursor)
+        self.assertEqual([j.id for j in back.items], [j.id for j in pages[1].items])
+        self.assertTrue(back.has_prev)
+        self.assertTrue(back.has_next)
+
+    def test_null_created_date_sorted_last(self):
+        undated = [self.jobs[1], self.jobs[4]]
+        for job in undated:
+            job.created_date = None
+        db.session.commit()
+        expected = [j for j in self.expected if j not in {job.id for job in undated}] + \
+            sorted((job.id for job in undated), reverse=True)
+
+        seen, pages = [], []
+        page = dao.load_jobs(per_page=3, keyset=True)
+        while True:
+            pages.append(page)
+            seen.extend(j.id for j in page.items)
+            if not page.has_next:
+                break
+            page = dao.load_jobs(per_page=3, after=page.next_cursor)
+        self.assertEqual(seen, expected)
+        # Trang cuối bắt đầu bằng job không có ngày: cursor (None, id) vẫn đi được cả hai chiều
+        self.assertEqual([j.id for j in pages[2].items], expected[6:])
+        back = dao.load_jobs(per_page=3, before=pages[2].prev_cursor)
+        self.assertEqual([j.id for j in back.items], expected[3:6])
+
+        null_cursor = encode_cursor(None, expected[5])
+        self.assertEqual(decode_cursor(null_cursor), (None, expected[5]))
+        self.assertEqual([j.id for j in dao.load_jobs(per_page=3, after=null_cursor).items], expected[6:])
+
+    def test_jobs_route_with_cursor(self):
+        first = dao.load_jobs(per_page=3, keyset=True)
+        response = self.client.get(f'/jobs?after={first.next_cursor}')
+        self.assertEqual(response.status_code, 200)
+        titles = {j.id: j.title for j in self.jobs}
+        for job_id in self.expected[3:6]:
+            self.assertIn(titles[job_id].encode(), response.data)
+        self.assertNotIn(titles[self.expected[0]].encode() + b'<', response.data)
+        self.assertIn(b'before=', response.data)
+
+    def test_page_numbers_follow_cursor_order(self):
+        seen = []
+        for page in range(1, 4):
+            seen.extend(j.id for j in dao.load_jobs(page=page, per_page=3).items)
+        self.assertEqual(seen, self.expected)
+
+    def test_keyword_search_ignores_cursor(self):
+        first = dao.load_jobs(per_page=3, keyset=True)
+        page = dao.load_jobs(keyword='Job', per_page=3, after=first.next_cursor)
+        self.assertEqual(page.page, 1)
+        self.assertEqual(len(page.items), 3)
+
+        app.config['KEYSET_PAGE_THRESHOLD'] = 1
+        try:
+            response = self.client.get('/jobs?keyword=Job')
+        finally:
+            app.config['KEYSET_PAGE_THRESHOLD'] = 5
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'after=', response.data)
+
+    # --- Chiến lược COUNT ---
+    def count_queries(self, fn):
+        statements = []
+
+        def before_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_execute)
+        try:
+            result = fn()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_execute)
+        return result, [st for st in statements if 'count(' in st.lower()]
+
+    def test_skip_count(self):
+        page, counts = self.count_queries(lambda: paginate(Job.query.order_by(Job.id), page=1, per_page=3,
+                                                           count='skip'))
+        self.assertEqual(counts, [])
+        self.assertIsNone(page.total)
+        self.assertEqual(len(page.items), 3)
+        self.assertTrue(page.has_next)
+        self.assertEqual(page.pages, 2)
+
+        last = paginate(Job.query.order_by(Job.id), page=3, per_page=3, count='skip')
+        self.assertEqual(len(last.items), 1)
+        self.assertFalse(last.has_next)
+
+    def test_cached_count_invalidated_on_write(self):
+        user_id = self.jobs[0].company.user_id
+        dao.NotificationDAO.create(user_id=user_id, content='first')
+
+        page, counts = self.count_queries(lambda: dao.NotificationDAO.get_all(user_id, page=1, per_page=5))
+        self.assertEqual((page.total, len(counts)), (1, 1))
+        page, counts = self.count_queries(lambda: dao.NotificationDAO.get_all(user_id, page=1, per_page=5))
+        self.assertEqual((page.total, len(counts)), (1, 0))
+
+        dao.NotificationDAO.create(user_id=user_id, content='second')
+        self.assertEqual(dao.NotificationDAO.get_all(user_id, page=1, per_page=5).total, 2)
+
+        dao.NotificationDAO.delete_all_by_user(user_id)
+        self.assertEqual(dao.NotificationDAO.get_all(user_id, page=1, per_page=5).total, 0)
+
+    def test_estimate_cached(self):
+        query = Job.query.filter(Job.status == JobStatusEnum.POSTED).order_by(Job.id)
+        with patch.object(pagination, 'estimate_count', return_value=None) as estimate:
+            for _ in range(2):
+                page, counts = self.count_queries(lambda: paginate(query, page=1, per_page=3, count='estimate'))
+            self.assertEqual((page.total, page.total_is_estimate, estimate.call_count), (7, False, 1))
+            self.assertEqual(counts, [])
+
+            # Ghi qua ORM vào bảng job xóa cache
+            db.session.add(Job(title='New', status=JobStatusEnum.POSTED, company_id=self.jobs[0].company_id))
+            db.session.commit()
+            self.assertEqual(paginate(query, page=1, per_page=3, count='estimate').total, 8)
+            self.assertEqual(estimate.call_count, 2)
+
+        other = Job.query.filter(Job.title != 'x').order_by(Job.id)
+        with patch.object(pagination, 'estimate_count', return_value=50000) as estimate:
+            for _ in range(2):
+                page, counts = self.count_queries(lambda: paginate(other, page=1, per_page=3, count='estimate'))
+                self.assertEqual((page.total, page.total_is_estimate), (50000, True))
+            self.assertEqual((estimate.call_count, counts), (1, []))
+
+    def test_explain_compiles_for_mysql(self):
+        sql = str(explain(Job.query.filter(Job.status == JobStatusEnum.POSTED).statement)
+                  .compile(dialect=mysql.dialect()))
+        self.assertTrue(sql.startswith('EXPLAIN SELECT'))
+
+
+if __name__ == '__main__':
+    unittest.main()
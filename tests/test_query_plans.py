@@ -0,0 +1,113 @@
+import hashlib
+import importlib.util
+import os
+import unittest
+
+from sqlalchemy import select
+from sqlalchemy.dialects import sqlite
+
+from app import db, dao
+from app.index import app
+from app.pagination import explain
+from app.query_plans import full_scans, full_scans_in, query_plan
+from app.models import User, RoleEnum, Company, Resume, CV, Job, JobStatusEnum, Application, \
+    ApplicationStatusEnum
+
+MIGRATION = os.path.join(os.path.dirname(__file__), '..', 'migrations', 'versions',
+                         '8179d6ca38de_hot_path_indexes.py')
+
+
+class TestQueryPlans(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        password = hashlib.md5('password123'.encode()).hexdigest()
+        self.recruiter = User(username='recruiter', password=password, email='recruiter@test.com',
+                              role=RoleEnum.RECRUITER)
+        self.jobseeker = User(username='jobseeker', password=password, email='jobseeker@test.com',
+                              role=RoleEnum.JOBSEEKER)
+        db.session.add_all([self.recruiter, self.jobseeker])
+        db.session.commit()
+        company = Company(user_id=self.recruiter.id, company_name='TestCorp')
+        resume = Resume(user_id=self.jobseeker.id)
+        db.session.add_all([company, resume])
+        db.session.commit()
+        cv = CV(title='CV', file_path='/cv.pdf', resume_id=resume.id)
+        job = Job(title='Job', status=JobStatusEnum.POSTED, company_id=company.id)
+        db.session.add_all([cv, job])
+        db.session.commit()
+        application = Application(cv_id=cv.id, job_id=job.id, status=ApplicationStatusEnum.PENDING)
+        db.session.add(application)
+        db.session.commit()
+        conversation = dao.get_or_create_conversation(self.recruiter.id, self.jobseeker.id)
+        dao.add_message(conversation.id, self.recruiter.id, 'Hello')
+        dao.NotificationDAO.create(self.jobseeker.id, 'Welcome')
+
+        self.ids = dict(company=company.id, job=job.id, application=application.id, conversation=conversation.id)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def hot_paths(self):
+        recruiter, jobseeker, ids = self.recruiter.id, self.jobseeker, self.ids
+        return {
+            'load_jobs': lambda: dao.load_jobs(page=1, per_page=8),
+            'load_jobs keyset': lambda: dao.load_jobs(keyset=True, per_page=8),
+            'company applications': lambda: dao.load_applications_for_company(recruiter, page=1, per_page=8),
+            'jobseeker applications': lambda: dao.load_applications_for_user(jobseeker, page=1, per_page=8),
+            'applications by job': lambda: dao.get_application_by_job(ids['job']),
+            'notification badge': lambda: (dao.NotificationDAO.invalidate_badge(jobseeker.id),
+                                           dao.NotificationDAO.get_badge(jobseeker.id)),
+            'notification list': lambda: dao.NotificationDAO.get_all(jobseeker.id, count='exact'),
+            'messages': lambda: dao.get_messages(ids['conversation']),
+            'conversation summaries': lambda: dao.get_conversation_summaries(jobseeker.id),
+            'conversation member': lambda: dao.is_conversation_member(ids['conversation'], jobseeker.id),
+            'interview': lambda: dao.get_interview(ids['application']),
+            'company interviews': lambda: dao.get_list_interview_by_owner_company(recruiter),
+            'recruiter stats': lambda: dao.stats_application_by_recruiter(ids['company']),
+        }
+
+    def test_hot_dao_queries_use_indexes(self):
+        for name, fn in self.hot_paths().items():
+            with self.subTest(name):
+                db.session.expire_all()
+                self.assertEqual(full_scans_in(fn), {})
+
+    def test_detects_full_scan(self):
+        scans = full_scans_in(lambda: Job.query.filter(Job.title == 'Job').all())
+        self.assertEqual(list(scans.values()), [['job']])
+
+    def test_query_plan_of_statement(self):
+        plan = query_plan(select(Job.id).where(Job.status == JobStatusEnum.POSTED)
+                          .order_by(Job.created_date.desc()))
+        self.assertEqual(full_scans(plan, 'sqlite'), [])
+        self.assertIn('ix_job_status_created', ' '.join(row['detail'] for row in plan))
+
+    def test_explain_compiles_for_sqlite(self):
+        sql = str(explain(select(Job.id)).compile(dialect=sqlite.dialect()))
+        self.assertTrue(sql.startswith('EXPLAIN QUERY PLAN SELECT'))
+
+    def test_mysql_plan(self):
+        plan = [dict(table='application', type='ref'), dict(table='job', type='ALL'),
+                dict(table='<derived2>', type='ALL'), dict(table='job_1', type='ALL')]
+        self.assertEqual(full_scans(plan, 'mysql'), ['job', 'job'])
+
+    def test_migration_creates_model_indexes(self):
+        spec = importlib.util.spec_from_file_location('hot_path_indexes', MIGRATION)
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+
+        declared = {(index.name, table.name, tuple(column.name for column in index.columns))
+                    for table in db.metadata.tables.values() for index in table.indexes
+                    if index.name and not table.name.startswith('outbox_mail')}
+        self.assertEqual({(name, table, tuple(columns)) for name, table, columns in migration.INDEXES}, declared)
+
+
+if __name__ == '__main__':
+    unittest.main()
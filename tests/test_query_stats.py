@@ -0,0 +1,189 @@
+import hashlib
+import unittest
+from datetime import datetime, timedelta
+
+from flask import g
+
+from app import db, dao, query_stats
+from app.index import app
+from app.models import User, RoleEnum, Company, Category, Resume, CV, Job, JobStatusEnum, Application, \
+    ApplicationStatusEnum, Interview
+from app.query_stats import capture_queries
+from tests.query_budget import QueryBudgetMixin
+
+PASSWORD = 'password123'
+
+
+def seed(size):
+    """Dữ liệu đủ nhiều (size job/đơn/thông báo/tin nhắn) để N+1 lộ ra trong số query."""
+    password = hashlib.md5(PASSWORD.encode()).hexdigest()
+    users = dict(admin=User(username='admin', password=password, email='admin@test.com', role=RoleEnum.ADMIN),
+                 recruiter=User(username='recruiter', password=password, email='recruiter@test.com',
+                                role=RoleEnum.RECRUITER, is_recruiter=True),
+                 jobseeker=User(username='jobseeker', password=password, email='jobseeker@test.com',
+                                role=RoleEnum.JOBSEEKER))
+    db.session.add_all(users.values())
+    db.session.commit()
+
+    company = Company(user_id=users['recruiter'].id, company_name='TestCorp')
+    category = Category(name='IT')
+    resume = Resume(user_id=users['jobseeker'].id)
+    db.session.add_all([company, category, resume])
+    db.session.commit()
+    cv = CV(title='CV', file_path='/cv.pdf', resume_id=resume.id)
+    jobs = [Job(title=f'Job {i}', status=JobStatusEnum.POSTED, company_id=company.id, category_id=category.id,
+                created_date=datetime.now() - timedelta(hours=i)) for i in range(size)]
+    db.session.add_all([cv] + jobs)
+    db.session.commit()
+    applications = [Application(cv_id=cv.id, job_id=job.id, status=ApplicationStatusEnum.PENDING) for job in jobs]
+    db.session.add_all(applications)
+    db.session.commit()
+    db.session.add_all([Interview(application_id=a.id, url=f'https://meet/{a.id}', dateTime=datetime.now())
+                        for a in applications])
+    db.session.commit()
+
+    conversation = dao.get_or_create_conversation(users['jobseeker'].id, users['recruiter'].id)
+    for i in range(size):
+        dao.add_message(conversation.id, users['recruiter'].id, f'Message {i}')
+    dao.NotificationDAO.create_many([(users['jobseeker'].id, f'Notification {i}') for i in range(size)])
+    return dict(users={role: user.id for role, user in users.items()}, company=company.id, job=jobs[0].id,
+                conversation=conversation.id, notification=dao.NotificationDAO.get_badge(users['jobseeker'].id)
+                .recent[0].id)
+
+
+class TestQueryStats(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['QUERY_STATS'] = True
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.ids = seed(3)
+        query_stats.clear_history()
+
+    def tearDown(self):
+        app.config['QUERY_STATS'] = False
+        app.config['QUERY_STATS_WARN_COUNT'] = 50
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def login(self, username):
+        self.client.post('/login', data=dict(username=username, password=PASSWORD))
+
+    def test_response_headers(self):
+        with capture_queries() as stats:
+            response = self.client.get('/jobs')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(int(response.headers['X-Query-Count']), stats.count)
+        self.assertGreater(stats.count, 0)
+        self.assertGreaterEqual(float(response.headers['X-Query-Time-Ms']), 0)
+        self.assertIn(f'desc="{stats.count} queries"', response.headers['Server-Timing'])
+
+    def test_no_headers_when_disabled(self):
+        app.config['QUERY_STATS'] = False
+        response = self.client.get('/jobs')
+        self.assertNotIn('X-Query-Count', response.headers)
+        self.assertEqual(self.client.get('/_debug/queries').status_code, 404)
+
+    def test_debug_endpoint_lists_recent_requests(self):
+        self.client.get('/jobs?page=1')
+        self.assertEqual(self.client.get('/_debug/queries').status_code, 403)
+
+        self.login('admin')
+        requests = self.client.get('/_debug/queries').get_json()['requests']
+        self.assertEqual(requests[-1]['path'], '/jobs?page=1')
+        self.assertGreater(requests[-1]['count'], 0)
+        self.assertTrue(requests[-1]['slowest_statement'].startswith('SELECT'))
+
+    def test_many_queries_logged(self):
+        app.config['QUERY_STATS_WARN_COUNT'] = 0
+        with self.assertLogs('app.query_stats', level='WARNING') as captured:
+            self.client.get('/jobs')
+        self.assertEqual(captured.records[0].fields['path'], '/jobs')
+
+    def test_statements_kept_only_when_enabled(self):
+        with app.test_request_context('/'):
+            app.preprocess_request()
+            dao.count_jobs()
+            self.assertEqual(len(g.query_stats.statements), 1)
+
+        app.config['QUERY_STATS'] = False
+        with app.test_request_context('/'):
+            app.preprocess_request()
+            dao.count_jobs()
+            stats = g.query_stats
+            self.assertEqual(stats.count, 1)
+            self.assertEqual(stats.statements, [])
+            self.assertIsNone(stats.slowest_statement)
+
+    def test_capture_outside_request(self):
+        with capture_queries() as outer:
+            dao.count_jobs()
+            with capture_queries() as inner:
+                dao.count_jobs()
+        self.assertEqual((outer.count, inner.count), (2, 1))
+
+
+class TestRouteQueryBudgets(QueryBudgetMixin, unittest.TestCase):
+    """Số query mỗi route trong index.py không được tăng theo lượng dữ liệu."""
+
+    SIZE = 20
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.ids = seed(self.SIZE)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def login(self, username):
+        self.client.post('/login', data=dict(username=username, password=PASSWORD))
+        self.client.get('/about')  # nạp cache badge thông báo
+
+    def check(self, budgets):
+        for url, budget in budgets:
+            with self.subTest(url):
+                response = self.assertQueryBudget(budget, url)
+                self.assertLess(response.status_code, 400)
+
+    def test_anonymous_routes(self):
+        ids = self.ids
+        self.check([
+            ('/', 2), ('/about', 0), ('/contact', 0), ('/login', 0), ('/register', 0),
+            ('/jobs', 4), ('/jobs?page=2', 4), (f'/job-detail/{ids["job"]}', 7),
+            (f'/company/{ids["company"]}', 3), (f'/{ids["users"]["recruiter"]}/interview', 2),
+        ])
+
+    def test_jobseeker_routes(self):
+        self.login('jobseeker')
+        ids = self.ids
+        self.check([
+            ('/profile', 2), ('/applications', 3), ('/notifications', 2),
+            (f'/notifications/{ids["notification"]}', 8), ('/conversations', 3),
+            (f'/chat/{ids["conversation"]}', 6), (f'/api/conversations/{ids["conversation"]}/messages', 2),
+            ('/settings', 0),
+        ])
+
+    def test_recruiter_routes(self):
+        self.login('recruiter')
+        self.check([
+            ('/applications', 3), ('/stats-by-recruiter', 3), ('/job-posting', 4), ('/conversations', 3),
+            ('/profile', 2),
+        ])
+
+    def test_admin_routes(self):
+        self.login('admin')
+        self.check([('/verified', 3)])
+
+
+if __name__ == '__main__':
+    unittest.main()
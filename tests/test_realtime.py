@@ -0,0 +1,87 @@
+import threading
+import unittest
+import uuid
+
+import socketio
+
+from app.realtime import MemoryPubSubManager, create_client_manager, create_emitter
+
+
+class FakeWorker:
+    """Một socketio.Server như một worker process, ghi lại các packet gửi tới client."""
+
+    def __init__(self, channel):
+        self.server = socketio.Server(client_manager=create_client_manager('memory://', channel),
+                                      async_mode='threading')
+        self.received = []
+        self.event = threading.Event()
+        self.server._send_packet = self._record
+        self.server._send_eio_packet = self._record
+        self.server.manager_initialized = True
+        self.server.manager.initialize()
+
+    def _record(self, eio_sid, packet):
+        self.received.append((eio_sid, packet))
+        self.event.set()
+
+    def connect(self, eio_sid, room):
+        sid = self.server.manager.connect(eio_sid, '/')
+        self.server.manager.enter_room(sid, '/', room)
+        return sid
+
+    def wait(self, count=1, timeout=2):
+        for _ in range(int(timeout / 0.01)):
+            if len(self.received) >= count:
+                return True
+            self.event.wait(0.01)
+        return len(self.received) >= count
+
+
+class TestRealtime(unittest.TestCase):
+
+    def setUp(self):
+        self.channel = f'test-{uuid.uuid4().hex}'
+        self.workers = [FakeWorker(self.channel) for _ in range(2)]
+
+    def tearDown(self):
+        for worker in self.workers:
+            worker.server.manager.close()
+
+    def test_no_queue_uses_default_manager(self):
+        self.assertIsNone(create_client_manager(None))
+        self.assertIsNone(create_client_manager(''))
+
+    def test_redis_url_uses_redis_manager(self):
+        manager = create_client_manager('redis://localhost:6379/15', 'chan', write_only=True)
+        self.assertIsInstance(manager, socketio.RedisManager)
+        self.assertEqual(manager.channel, 'chan')
+
+    def test_room_emit_reaches_other_worker(self):
+        first, second = self.workers
+        first.connect('eio-a', 'conversation-1')
+        second.connect('eio-b', 'conversation-1')
+        second.connect('eio-c', 'conversation-2')
+
+        first.server.emit('message', {'message': 'hi'}, to='conversation-1')
+
+        self.assertTrue(first.wait(1))
+        self.assertTrue(second.wait(1))
+        self.assertEqual([sid for sid, _ in second.received], ['eio-b'])
+        # Worker gửi không nhận lại bản sao từ kênh pub/sub
+        self.assertFalse(first.wait(2, timeout=0.1))
+
+    def test_external_emitter(self):
+        for i, worker in enumerate(self.workers):
+            worker.connect(f'eio-{i}', 'user_1')
+        emitter = create_emitter('memory://', self.channel)
+        self.assertIsInstance(emitter, MemoryPubSubManager)
+        emitter.emit('notification', {'content': 'hello'}, room='user_1', namespace='/')
+        self.assertTrue(all(worker.wait(1) for worker in self.workers))
+
+    def test_emitter_requires_queue(self):
+        with self.assertRaises(ValueError):
+            create_emitter(None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import time
+import unittest
+import hashlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import db, dao
+from app.index import app
+from app.models import User, RoleEnum, Company, Job, JobStatusEnum, Notification
+from app.scheduler import Scheduler, create_scheduler
+
+
+class TestJobExpiration(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        password = hashlib.md5('password123'.encode()).hexdigest()
+        self.recruiters = [User(username=f'recruiter{i}', password=password, email=f'recruiter{i}@test.com',
+                                role=RoleEnum.RECRUITER) for i in range(2)]
+        db.session.add_all(self.recruiters)
+        db.session.commit()
+        self.companies = [Company(user_id=user.id, company_name=f'Company {i}')
+                          for i, user in enumerate(self.recruiters)]
+        db.session.add_all(self.companies)
+        db.session.commit()
+        self.recruiter_ids = [user.id for user in self.recruiters]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_job(self, company, days_left, status=JobStatusEnum.POSTED):
+        job = Job(title=f'Job {days_left}', status=status, company_id=company.id,
+                  expiration_date=datetime.now() + timedelta(days=days_left) if days_left is not None else None)
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+    def status_of(self, job_id):
+        return db.session.get(Job, job_id).status
+
+    def test_expires_only_overdue_posted_jobs(self):
+        overdue = [self.add_job(self.companies[i % 2], -i - 1) for i in range(5)]
+        future = self.add_job(self.companies[0], 3)
+        no_expiration = self.add_job(self.companies[0], None)
+        draft = self.add_job(self.companies[1], -1, status=JobStatusEnum.DRAFT)
+        self.assertEqual(dao.get_homepage_counters().jobs, 7)
+
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            self.assertEqual(dao.expire_jobs(batch_size=2), 5)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        db.session.expire_all()
+        self.assertTrue(all(self.status_of(job_id) == JobStatusEnum.EXPIRED for job_id in overdue))
+        self.assertEqual(self.status_of(future), JobStatusEnum.POSTED)
+        self.assertEqual(self.status_of(no_expiration), JobStatusEnum.POSTED)
+        self.assertEqual(self.status_of(draft), JobStatusEnum.DRAFT)
+
+        # 3 batch (2 + 2 + 1): mỗi batch một UPDATE job và một INSERT thông báo
+        self.assertEqual(len([st for st in statements if st.startswith('UPDATE job')]), 3)
+        self.assertEqual(len([st for st in statements if st.startswith('INSERT INTO notification')]), 3)
+        per_user = [Notification.query.filter_by(user_id=user_id).count() for user_id in self.recruiter_ids]
+        self.assertEqual(per_user, [3, 2])
+        self.assertEqual(dao.NotificationDAO.get_badge(self.recruiter_ids[0]).unread, 3)
+
+        self.assertEqual(dao.get_homepage_counters().jobs, 2)
+        self.assertEqual(dao.expire_jobs(), 0)
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_runs_due_tasks_and_survives_failures(self):
+        calls = []
+
+        def failing():
+            calls.append('failing')
+            raise RuntimeError('boom')
+
+        scheduler = Scheduler(app)
+        scheduler.add('every_time', 0, lambda: calls.append('every_time'))
+        scheduler.add('failing', 0, failing)
+        scheduler.add('later', 3600, lambda: calls.append('later'), delay=3600)
+
+        self.assertEqual(scheduler.run_pending(), ['every_time', 'failing'])
+        self.assertEqual(scheduler.run_pending(), ['every_time', 'failing'])
+        self.assertEqual(calls, ['every_time', 'failing'] * 2)
+        self.assertGreater(scheduler.seconds_until_next(), -1)
+        self.assertGreater(scheduler.tasks['later'].next_run, scheduler.tasks['every_time'].next_run)
+
+    def test_default_tasks(self):
+        scheduler = create_scheduler(app)
+        self.assertEqual(sorted(scheduler.tasks), ['expire_jobs', 'requeue_uploads'])
+        # Đẩy lại upload dang dở ngay khi worker/scheduler khởi động
+        self.assertLessEqual(scheduler.tasks['requeue_uploads'].next_run, time.monotonic())
+
+
+if __name__ == '__main__':
+    unittest.main()
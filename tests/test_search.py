@@ -0,0 +1,119 @@
+import unittest
+import hashlib
+
+from sqlalchemy import text
+from sqlalchemy.dialects import mysql
+
+from app import db, search
+from app.index import app
+from app.models import User, RoleEnum, Job, JobStatusEnum, Company, Category, Tag
+from app import dao
+
+
+class TestJobSearch(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        recruiter = User(username='recruiter', password=hashlib.md5('pw'.encode()).hexdigest(),
+                         email='recruiter@test.com', role=RoleEnum.RECRUITER)
+        db.session.add(recruiter)
+        db.session.commit()
+
+        self.company = Company(user_id=recruiter.id, company_name='SearchCorp')
+        self.category = Category(name='IT')
+        db.session.add_all([self.company, self.category])
+        db.session.commit()
+
+        self.python_job = Job(title='Python Developer', description='Build APIs with Flask',
+                              requirements='3 years of Python', status=JobStatusEnum.POSTED,
+                              company_id=self.company.id, category_id=self.category.id)
+        self.backend_job = Job(title='Backend Engineer', description='Maintain Python services',
+                               requirements='SQL', status=JobStatusEnum.POSTED,
+                               company_id=self.company.id, category_id=self.category.id)
+        self.frontend_job = Job(title='Frontend Engineer', description='React apps',
+                                requirements='JavaScript', status=JobStatusEnum.POSTED,
+                                company_id=self.company.id, category_id=self.category.id)
+        self.draft_job = Job(title='Python Intern', status=JobStatusEnum.DRAFT,
+                             company_id=self.company.id, category_id=self.category.id)
+        db.session.add_all([self.python_job, self.backend_job, self.frontend_job, self.draft_job])
+        db.session.commit()
+
+        self.frontend_job.tags.append(Tag(name='typescript'))
+        db.session.commit()
+
+    def tearDown(self):
+        app.config['SEARCH_BACKEND'] = 'auto'
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def assert_backend(self, name):
+        app.config['SEARCH_BACKEND'] = name
+
+        # Tìm trong description, xếp job có từ khóa ở title lên trước
+        jobs = dao.load_jobs(keyword='python', page=1, per_page=5)
+        self.assertEqual([j.id for j in jobs.items], [self.python_job.id, self.backend_job.id])
+        self.assertEqual(jobs.total, 2)
+
+        # Tìm theo tag
+        jobs = dao.load_jobs(keyword='typescript', page=1, per_page=5)
+        self.assertEqual([j.id for j in jobs.items], [self.frontend_job.id])
+
+        # Kết hợp với bộ lọc sẵn có
+        jobs = dao.load_jobs(keyword='python', status=JobStatusEnum.DRAFT, page=1, per_page=5)
+        self.assertEqual([j.id for j in jobs.items], [self.draft_job.id])
+
+        jobs = dao.load_jobs(keyword='ruby', page=1, per_page=5)
+        self.assertEqual(len(jobs.items), 0)
+
+    def test_sqlite_fts_backend(self):
+        self.assert_backend('sqlite_fts')
+
+    def test_memory_backend(self):
+        self.assert_backend('memory')
+
+    def test_like_backend(self):
+        app.config['SEARCH_BACKEND'] = 'like'
+        jobs = dao.load_jobs(keyword='python', page=1, per_page=5)
+        self.assertEqual({j.id for j in jobs.items}, {self.python_job.id, self.backend_job.id})
+
+    def test_index_follows_updates(self):
+        for name in ('sqlite_fts', 'memory'):
+            app.config['SEARCH_BACKEND'] = name
+            dao.load_jobs(keyword='python', page=1, per_page=5)
+
+            self.frontend_job.title = 'Golang Engineer'
+            db.session.commit()
+            jobs = dao.load_jobs(keyword='golang', page=1, per_page=5)
+            self.assertEqual([j.id for j in jobs.items], [self.frontend_job.id])
+            self.frontend_job.title = 'Frontend Engineer'
+            db.session.commit()
+
+    def test_mysql_fulltext_uses_union_of_matches(self):
+        query = search.MySQLFullTextSearchBackend().apply(Job.query, 'python')
+        sql = str(query.statement.compile(dialect=mysql.dialect()))
+        self.assertIn('UNION ALL', sql)
+        self.assertEqual(sql.count('MATCH ('), 4)  # mỗi nhánh: MATCH trong WHERE và làm score
+        self.assertNotIn(' OR ', sql)
+        self.assertNotIn(' IN (', sql)
+
+    def test_auto_backend_uses_dialect(self):
+        self.assertIsInstance(search.get_backend('auto'), search.SQLiteFTSSearchBackend)
+
+    def test_auto_backend_without_index(self):
+        # DB cũ chưa chạy migration: chưa có job_fts
+        db.session.execute(text("DROP TABLE job_fts"))
+        db.session.commit()
+        app.extensions['search'].auto_names.clear()
+        self.assertIsInstance(search.get_backend('auto'), search.LikeSearchBackend)
+        app.config['SEARCH_BACKEND'] = 'auto'
+        jobs = dao.load_jobs(keyword='python', page=1, per_page=5)
+        self.assertEqual({j.id for j in jobs.items}, {self.python_job.id, self.backend_job.id})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+import unittest
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app import db, dao, stats
+from app.index import app
+from app.models import User, RoleEnum, Company, Job, JobStatusEnum, Resume, CV, Application, \
+    ApplicationStatusEnum, CompanyMonthStat, JobStat
+
+
+class TestRecruiterStats(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        password = hashlib.md5('password123'.encode()).hexdigest()
+        self.recruiter = User(username='recruiter', password=password, email='recruiter@test.com',
+                              role=RoleEnum.RECRUITER)
+        self.jobseeker = User(username='jobseeker', password=password, email='jobseeker@test.com',
+                              role=RoleEnum.JOBSEEKER)
+        db.session.add_all([self.recruiter, self.jobseeker])
+        db.session.commit()
+
+        self.company = Company(user_id=self.recruiter.id, company_name='TestCorp')
+        self.resume = Resume(user_id=self.jobseeker.id)
+        db.session.add_all([self.company, self.resume])
+        db.session.commit()
+        self.cv = CV(title='CV', file_path='/cv.pdf', resume_id=self.resume.id)
+        db.session.add(self.cv)
+        db.session.commit()
+
+        self.company_id = self.company.id
+        self.year = datetime.now().year
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_job(self, title='Job', month=3):
+        job = Job(title=title, status=JobStatusEnum.POSTED, company_id=self.company_id,
+                  created_date=datetime(self.year, month, 1))
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    def apply(self, job, status=ApplicationStatusEnum.PENDING, month=4):
+        application = Application(cv_id=self.cv.id, job_id=job.id, status=status,
+                                  applied_date=datetime(self.year, month, 2))
+        db.session.add(application)
+        db.session.commit()
+        return application
+
+    def snapshot(self):
+        db.session.expire_all()
+        months = {(r.company_id, r.year, r.month): (r.jobs, r.applications, r.pending, r.confirmed,
+                                                    r.accepted, r.rejected)
+                  for r in CompanyMonthStat.query.all()}
+        jobs = {r.job_id: (r.applications, r.pending, r.confirmed, r.accepted, r.rejected)
+                for r in JobStat.query.all()}
+        # Bỏ các dòng đã về 0 (bộ đếm tăng dần không xóa dòng)
+        return ({k: v for k, v in months.items() if any(v)}, {k: v for k, v in jobs.items() if any(v)})
+
+    def test_writes_update_counters(self):
+        job = self.add_job(month=3)
+        first = self.apply(job, month=4)
+        second = self.apply(job, month=4)
+
+        months, jobs = self.snapshot()
+        self.assertEqual(months[(self.company_id, self.year, 3)], (1, 0, 0, 0, 0, 0))
+        self.assertEqual(months[(self.company_id, self.year, 4)], (0, 2, 2, 0, 0, 0))
+        self.assertEqual(jobs[job.id], (2, 2, 0, 0, 0))
+
+        first.status = ApplicationStatusEnum.ACCEPTED
+        db.session.commit()
+        db.session.delete(second)
+        db.session.commit()
+
+        months, jobs = self.snapshot()
+        self.assertEqual(months[(self.company_id, self.year, 4)], (0, 1, 0, 0, 1, 0))
+        self.assertEqual(jobs[job.id], (1, 0, 0, 1, 0))
+
+    def test_moving_application_moves_counters(self):
+        first, second = self.add_job('First'), self.add_job('Second')
+        application = self.apply(first)
+        db.session.expire_all()  # job_id chưa load lúc flush
+        application.job_id = second.id
+        application.applied_date = datetime(self.year, 6, 1)
+        db.session.commit()
+
+        months, jobs = self.snapshot()
+        self.assertNotIn(first.id, jobs)
+        self.assertEqual(jobs[second.id], (1, 1, 0, 0, 0))
+        self.assertNotIn((self.company_id, self.year, 4), months)
+        self.assertEqual(months[(self.company_id, self.year, 6)], (0, 1, 1, 0, 0, 0))
+
+    def test_rebuild_matches_incremental_counters(self):
+        jobs = [self.add_job(f'Job {i}', month=i + 1) for i in range(3)]
+        for i, status in enumerate(STATUSES * 2):
+            self.apply(jobs[i % 3], status=status, month=i % 12 + 1)
+        incremental = self.snapshot()
+
+        db.session.query(CompanyMonthStat).delete()
+        db.session.query(JobStat).delete()
+        db.session.commit()
+        stats.rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+
+        stats.rebuild(company_id=self.company_id)
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_dashboard_reads_rollups(self):
+        for i in range(3):
+            self.apply(self.add_job(f'Job {i}'), month=5)
+        self.add_job('No applications')
+
+        monthly = dao.stats_job_by_recruiter(self.company_id, year=self.year)
+        self.assertEqual([(s['month'], s['count'], s['applications']) for s in monthly], [(3, 4, 0), (5, 0, 3)])
+        per_job = dao.stats_application_by_recruiter(self.company_id, year=self.year)
+        self.assertEqual([(s['title'], s['count']) for s in per_job],
+                         [('Job 0', 1), ('Job 1', 1), ('Job 2', 1), ('No applications', 0)])
+
+    def test_one_upsert_per_rollup_row_per_flush(self):
+        job = self.add_job(month=3)
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            db.session.add_all([Application(cv_id=self.cv.id, job_id=job.id, status=status,
+                                            applied_date=datetime(self.year, 4, 2)) for status in STATUSES])
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        self.assertEqual(len([st for st in statements if st.startswith('INSERT INTO job_stat')]), 1)
+        self.assertEqual(len([st for st in statements if st.startswith('INSERT INTO company_month_stat')]), 1)
+        months, jobs = self.snapshot()
+        self.assertEqual(jobs[job.id], (5, 1, 1, 1, 1))
+        self.assertEqual(months[(self.company_id, self.year, 4)], (0, 5, 1, 1, 1, 1))
+
+    def test_failed_flush_discards_pending_deltas(self):
+        job = self.add_job(month=3)
+        db.session.add(Application(cv_id=self.cv.id, job_id=job.id, applied_date=datetime(self.year, 4, 2)))
+        db.session.add(User(username='recruiter', password='x', email='dup@test.com'))  # trùng username
+        with self.assertRaises(Exception):
+            db.session.commit()
+        db.session.rollback()
+        self.apply(job, month=4)
+
+        months, jobs = self.snapshot()
+        self.assertEqual(jobs[job.id], (1, 1, 0, 0, 0))
+        self.assertEqual(months[(self.company_id, self.year, 4)], (0, 1, 1, 0, 0, 0))
+
+    def test_dashboard_skips_rows_back_to_zero(self):
+        self.apply(self.add_job('Kept', month=3), month=3)
+        db.session.delete(self.add_job('Deleted', month=7))
+        db.session.commit()
+        self.assertIn((self.company_id, self.year, 7),
+                      {(r.company_id, r.year, r.month) for r in CompanyMonthStat.query.all()})
+
+        monthly = dao.stats_job_by_recruiter(self.company_id, year=self.year)
+        self.assertEqual([(s['month'], s['count'], s['applications']) for s in monthly], [(3, 1, 1)])
+
+    def test_dashboard_query_count_independent_of_job_count(self):
+        self.client.post('/login', data=dict(username='recruiter', password='password123'))
+        self.apply(self.add_job(month=datetime.now().month))
+
+        def render():
+            statements = []
+            record = lambda conn, cursor, statement, *args: statements.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', record)
+            try:
+                response = self.client.get('/stats-by-recruiter')
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record)
+            self.assertEqual(response.status_code, 200)
+            return len(statements)
+
+        render()  # nạp cache badge thông báo
+        one = render()
+        for i in range(20):
+            self.apply(self.add_job(f'Job {i}', month=datetime.now().month))
+        render()
+        self.assertEqual(render(), one)
+
+
+STATUSES = [ApplicationStatusEnum.PENDING, ApplicationStatusEnum.CONFIRMED, ApplicationStatusEnum.ACCEPTED,
+            ApplicationStatusEnum.REJECTED, ApplicationStatusEnum.DRAFT]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import hashlib
+from unittest.mock import patch
+
+from werkzeug.datastructures import FileStorage
+
+from app import db, dao, uploads
+from app.index import app
+from app.models import User, RoleEnum, Resume, CV, UploadStatusEnum
+
+
+class TestUploadPipeline(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.tmp = tempfile.mkdtemp()
+        self.original_config = {key: app.config.get(key) for key in
+                                ('UPLOAD_STORAGE', 'UPLOAD_STAGING_DIR', 'UPLOAD_LOCAL_ROOT', 'UPLOAD_LOCAL_URL',
+                                 'UPLOAD_RETRY_DELAY')}
+        app.config.update(UPLOAD_STORAGE='local',
+                          UPLOAD_STAGING_DIR=os.path.join(self.tmp, 'staging'),
+                          UPLOAD_LOCAL_ROOT=os.path.join(self.tmp, 'storage'),
+                          UPLOAD_LOCAL_URL='/static/uploads/',
+                          UPLOAD_RETRY_DELAY=0)
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user = User(username='jobseeker', password=hashlib.md5('password123'.encode()).hexdigest(),
+                         email='jobseeker@test.com', role=RoleEnum.JOBSEEKER)
+        db.session.add(self.user)
+        db.session.commit()
+        self.resume = Resume(user_id=self.user.id)
+        db.session.add(self.resume)
+        db.session.commit()
+        self.resume_id = self.resume.id
+
+    def tearDown(self):
+        uploads.wait_for_uploads()
+        app.config.update(self.original_config)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def pdf(self, content=b'%PDF-1.4 test', name='cv.pdf'):
+        return FileStorage(stream=io.BytesIO(content), filename=name, content_type='application/pdf')
+
+    def stored_file(self, url):
+        return os.path.join(app.config['UPLOAD_LOCAL_ROOT'], url[len(app.config['UPLOAD_LOCAL_URL']):])
+
+    def test_add_cv_pending_then_ready(self):
+        with patch.object(uploads, 'submit') as submit:
+            self.assertTrue(dao.add_cv('My CV', self.pdf(), is_default=True, resume_id=self.resume_id))
+        cv = CV.query.one()
+        self.assertEqual(cv.upload_status, UploadStatusEnum.PENDING)
+        self.assertIsNone(cv.file_path)
+        self.assertTrue(os.path.exists(uploads.staged_path(cv.upload_key)))
+
+        key = cv.upload_key
+        uploads.submit(*submit.call_args.args).result()
+        db.session.expire_all()
+        cv = CV.query.one()
+        self.assertEqual(cv.upload_status, UploadStatusEnum.READY)
+        self.assertIsNone(cv.upload_key)
+        with open(self.stored_file(cv.file_path), 'rb') as f:
+            self.assertEqual(f.read(), b'%PDF-1.4 test')
+        # File staging được dọn sau khi xong
+        self.assertFalse(os.path.exists(uploads.staged_path(key)))
+
+    def test_failed_upload_marks_cv_failed(self):
+        with patch('app.storage.LocalStorage.save', side_effect=OSError('storage down')) as save:
+            dao.add_cv('My CV', self.pdf(), is_default=False, resume_id=self.resume_id)
+            uploads.wait_for_uploads()
+        self.assertEqual(save.call_count, app.config['UPLOAD_MAX_ATTEMPTS'])
+        db.session.expire_all()
+        cv = CV.query.one()
+        self.assertEqual(cv.upload_status, UploadStatusEnum.FAILED)
+        self.assertIsNone(cv.file_path)
+
+    def test_update_cv_keeps_old_file_until_ready(self):
+        dao.add_cv('My CV', self.pdf(b'old'), is_default=False, resume_id=self.resume_id)
+        uploads.wait_for_uploads()
+        db.session.expire_all()
+        cv = CV.query.one()
+        old_path = cv.file_path
+
+        with patch.object(uploads, 'submit') as submit:
+            dao.update_cv(cv, 'Updated CV', self.pdf(b'new'), is_default=False, resume_id=self.resume_id)
+        self.assertEqual(cv.file_path, old_path)
+        self.assertEqual(cv.upload_status, UploadStatusEnum.PENDING)
+
+        uploads.submit(*submit.call_args.args).result()
+        db.session.expire_all()
+        cv = CV.query.one()
+        self.assertNotEqual(cv.file_path, old_path)
+        with open(self.stored_file(cv.file_path), 'rb') as f:
+            self.assertEqual(f.read(), b'new')
+
+    def test_stale_upload_does_not_overwrite_newer_one(self):
+        with patch.object(uploads, 'submit') as submit:
+            dao.add_cv('My CV', self.pdf(b'first'), is_default=False, resume_id=self.resume_id)
+            cv = CV.query.one()
+            dao.update_cv(cv, 'My CV', self.pdf(b'second'), is_default=False, resume_id=self.resume_id)
+        first, second = [call.args for call in submit.call_args_list]
+
+        uploads.submit(*second).result()
+        uploads.submit(*first).result()
+        db.session.expire_all()
+        cv = CV.query.one()
+        with open(self.stored_file(cv.file_path), 'rb') as f:
+            self.assertEqual(f.read(), b'second')
+
+    def test_requeue_pending_uploads(self):
+        with patch.object(uploads, 'submit'):
+            dao.add_cv('My CV', self.pdf(), is_default=False, resume_id=self.resume_id)
+        # File staging vừa ghi: có thể một worker khác đang upload, chưa đẩy lại
+        self.assertEqual(uploads.requeue_pending_uploads(), 0)
+
+        path = uploads.staged_path(CV.query.one().upload_key)
+        stale = os.path.getmtime(path) - app.config['UPLOAD_REQUEUE_AFTER_SECONDS'] - 1
+        os.utime(path, (stale, stale))
+        self.assertEqual(uploads.requeue_pending_uploads(), 1)
+        uploads.wait_for_uploads()
+        db.session.expire_all()
+        self.assertEqual(CV.query.one().upload_status, UploadStatusEnum.READY)
+        self.assertEqual(uploads.requeue_pending_uploads(older_than=0), 0)
+
+    def test_add_user_avatar_uploaded_in_background(self):
+        avatar = FileStorage(stream=io.BytesIO(b'png'), filename='me.png', content_type='image/png')
+        user = dao.add_user(avatar, username='newuser', password='password123', email='new@test.com',
+                            role='JOBSEEKER')
+        self.assertIsNotNone(user)
+        uploads.wait_for_uploads()
+        db.session.expire_all()
+        user = db.session.get(User, user.id)
+        self.assertTrue(user.avatar.startswith('/static/uploads/avatar/'))
+        self.assertTrue(user.avatar.endswith('.png'))
+        self.assertEqual(user.avatar_upload_status, UploadStatusEnum.READY)
+        self.assertIsNone(user.avatar_upload_key)
+
+    def test_requeue_pending_avatar(self):
+        avatar = FileStorage(stream=io.BytesIO(b'png'), filename='me.png', content_type='image/png')
+        with patch.object(uploads, 'submit'):
+            user_id = dao.add_user(avatar, username='newuser', password='password123', email='new@test.com',
+                                   role='JOBSEEKER').id
+        user = db.session.get(User, user_id)
+        self.assertEqual(user.avatar_upload_status, UploadStatusEnum.PENDING)
+        default_avatar = user.avatar
+
+        path = uploads.staged_path(user.avatar_upload_key)
+        stale = os.path.getmtime(path) - app.config['UPLOAD_REQUEUE_AFTER_SECONDS'] - 1
+        os.utime(path, (stale, stale))
+        self.assertEqual(uploads.requeue_pending_uploads(), 1)
+        uploads.wait_for_uploads()
+        db.session.expire_all()
+        user = db.session.get(User, user_id)
+        self.assertEqual(user.avatar_upload_status, UploadStatusEnum.READY)
+        self.assertNotEqual(user.avatar, default_avatar)
+        self.assertTrue(user.avatar.startswith('/static/uploads/avatar/'))
+        self.assertEqual(uploads.requeue_pending_uploads(older_than=0), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()